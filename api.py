@@ -1,7 +1,12 @@
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import sys
+import threading
+import struct
+import hashlib
+import unicodedata
+from array import array
 import joblib
-import requests
 import numpy as np
 from datetime import datetime, timedelta
 from fastapi import FastAPI, Request, HTTPException, Response
@@ -11,8 +16,11 @@ from pydantic import BaseModel
 from fuzzywuzzy import fuzz
 from cachetools import TTLCache
 from dotenv import load_dotenv
-import pandas as pd
 import logging
+import time
+import json
+import asyncio
+import aiohttp
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -51,6 +59,94 @@ class APIConfig:
         "base_url": "https://v3.football.api-sports.io",
         "headers": {"x-apisports-key": os.getenv("API_FOOTBALL_KEY")}
     }
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))  # 单个请求的总超时(秒)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # 建立连接的超时(秒)
+    HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", "5"))  # 每个上游主机的连接数上限
+    # 交互式查询自己的每分钟请求配额，与后台同步任务分开计算
+    RATE_LIMITS = {
+        "football-data": int(os.getenv("INTERACTIVE_RATE_LIMIT_FOOTBALL_DATA", "10")),
+        "api-football": int(os.getenv("INTERACTIVE_RATE_LIMIT_API_FOOTBALL", "10"))
+    }
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("INTERACTIVE_RATE_LIMIT_MAX_WAIT", "2"))  # 等待配额的最长时间(秒)，超过直接返回 429
+
+# ====================
+# 外部接口客户端
+# ====================
+class UpstreamResponse:
+    """已读取完毕的上游响应"""
+
+    __slots__ = ('status_code', 'text')
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+class UpstreamLimiter:
+    """每个数据源一个令牌桶：一分钟内最多 quota 个请求，等待超过 max_wait 秒的请求直接拒绝"""
+
+    def __init__(self, quota: int, max_wait: float):
+        # 突发量加上一分钟内补充的令牌不超过配额
+        self.capacity = max(min(quota // 2, quota - 1), 1)
+        self.rate = max(quota - self.capacity, 1) / 60.0
+        self.max_wait = max_wait
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self, provider: str):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        delay = (1 - self._tokens) / self.rate
+        if delay > self.max_wait:
+            logger.warning(f"{provider} 请求过于频繁，需要等待 {delay:.1f} 秒")
+            raise HTTPException(429, "外部数据源请求过于频繁，请稍后重试")
+        self._tokens -= 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class UpstreamClient:
+    """api.py 独立运行，不导入 app 包，自己维护一个带超时的 aiohttp 会话"""
+
+    def __init__(self):
+        self._session = None
+        self._loop = None
+        self._limiters = {
+            provider: UpstreamLimiter(quota, APIConfig.RATE_LIMIT_MAX_WAIT)
+            for provider, quota in APIConfig.RATE_LIMITS.items() if quota
+        }
+
+    def _get_session(self):
+        # 会话绑定在创建它的事件循环上
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=APIConfig.HTTP_LIMIT_PER_HOST),
+                timeout=aiohttp.ClientTimeout(total=APIConfig.HTTP_TIMEOUT, connect=APIConfig.HTTP_CONNECT_TIMEOUT)
+            )
+            self._loop = loop
+        return self._session
+
+    async def get(self, url: str, headers: dict = None, params: dict = None, provider: str = None) -> UpstreamResponse:
+        # 配额用完时最多等待 RATE_LIMIT_MAX_WAIT 秒，请求超时在拿到配额之后才开始计算
+        limiter = self._limiters.get(provider)
+        if limiter is not None:
+            await limiter.acquire(provider)
+        # aiohttp 不接受值为 None 的参数和请求头(例如未配置的 API 密钥)
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        headers = {key: value for key, value in (headers or {}).items() if value is not None}
+        async with self._get_session().get(url, headers=headers, params=params) as response:
+            return UpstreamResponse(response.status, await response.text())
+
+    async def close(self):
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+http_client = UpstreamClient()
 
 # ====================
 # 数据模型部分
@@ -71,9 +167,20 @@ except Exception as e:
     logger.error(f"❌ 模型加载失败: {str(e)}")
     model = None
 
+ALIAS_FILE = "data/team_aliases.csv"
+# 由别名表编译出的二进制索引，别名表内容变化后失效
+ALIAS_ARTIFACT = "data/team_aliases.idx"
+ALIAS_ARTIFACT_MAGIC = b"TALX"
+ALIAS_ARTIFACT_VERSION = 1
+# 魔数、格式版本、别名表 SHA-1、球队数、精确名称数、规范化名称数
+ALIAS_ARTIFACT_HEADER = struct.Struct("<4sH20sIII")
+# 检查别名表是否被修改的间隔(秒)
+ALIAS_RELOAD_INTERVAL = float(os.getenv("ALIAS_RELOAD_INTERVAL", "5"))
+
 # 加载中文别名
-def load_aliases():
-    file_path = "data/team_aliases.csv"
+def load_aliases(file_path=ALIAS_FILE):
+    # 只有需要解析 CSV 时才导入 pandas
+    import pandas as pd
     encodings = ['utf-8', 'utf-8-sig', 'latin1', 'gbk']
     for encoding in encodings:
         try:
@@ -99,26 +206,269 @@ def load_aliases():
             return {}
     raise ValueError(f"无法以任何编码读取 {file_path}，请检查文件内容和编码")
 
-ALIAS_MAPPING = load_aliases()
+# 球队名称中常见的繁体字 -> 简体字
+TRADITIONAL_TO_SIMPLIFIED = str.maketrans(dict(zip(
+    "聯體國爾馬羅維亞蘭薩華東龍門倫頓納魯蘇歐達騰喬貝紐車莊漢雲島韓義會隊瑪奧劍橋灣愛熱紅藍軍費夢賽衛錫鎮業廣鐵"
+    "電戰勝雙開關陽濟靈聖內遜諾區縣麥獅鷹蓮齊輝寧遼陸盧歷紀邁錦標興萊茲貢紳遠鳳鳴獵鋼際風戶讀賣廈澤濱橫須賀臺"
+    "鄭陳張劉黃楊趙吳孫偉傑勞場槍廠彎鋒誠銳",
+    "联体国尔马罗维亚兰萨华东龙门伦顿纳鲁苏欧达腾乔贝纽车庄汉云岛韩义会队玛奥剑桥湾爱热红蓝军费梦赛卫锡镇业广铁"
+    "电战胜双开关阳济灵圣内逊诺区县麦狮鹰莲齐辉宁辽陆卢历纪迈锦标兴莱兹贡绅远凤鸣猎钢际风户读卖厦泽滨横须贺台"
+    "郑陈张刘黄杨赵吴孙伟杰劳场枪厂弯锋诚锐"
+)))
+
+def normalize_team_key(name) -> str:
+    """生成查找用的规范化名称：全角转半角、繁体转简体、英文转小写、去除空白和标点"""
+    if not isinstance(name, str):
+        return ""
+    name = unicodedata.normalize('NFKC', name).translate(TRADITIONAL_TO_SIMPLIFIED).lower()
+    return ''.join(ch for ch in name if unicodedata.category(ch)[0] not in ('P', 'S', 'Z', 'C'))
+
+def _team_id(value) -> int:
+    """别名表中的球队 ID，缺失时记为 -1"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+def _bigrams(key: str):
+    """带首尾标记的字符二元组，单字名称也能产生候选"""
+    padded = f"^{key}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+class AliasIndex:
+    """中文名和别名的查找表，加载别名表时构建一次
+
+    exact 保持原有的精确匹配语义；normalized 让繁简、全半角、空格标点不同的写法也能直接命中；
+    模糊匹配只对与查询共享字符二元组的候选打分。
+    """
+
+    def __init__(self, mapping: dict, version: str = None):
+        # 球队 (ID, 英文名)，exact 和 forms 中的名称按球队下标引用
+        teams = []
+        team_positions = {}
+        exact = {}
+        forms = []
+        seen_keys = set()
+
+        for zh_name, info in mapping.items():
+            team = (_team_id(info.get('id')), info['en_name'])
+            if team not in team_positions:
+                team_positions[team] = len(teams)
+                teams.append(team)
+            position = team_positions[team]
+            for alias in [zh_name] + info['aliases']:
+                if not isinstance(alias, str) or not alias:
+                    continue
+                exact.setdefault(alias, position)
+                key = normalize_team_key(alias)
+                if not key or key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                forms.append((key, position))
+
+        self._build(teams, list(exact.items()), forms, version)
+
+    def _build(self, teams, exact, forms, version):
+        # 索引版本取自别名表内容的 SHA-1
+        self.version = version
+        self.teams = teams
+        self.exact = {alias: teams[position][1] for alias, position in exact}
+        self.normalized = {}
+        # 去重后的规范化名称，保持别名表中的顺序
+        self.forms = []
+        self.bigram_index = {}
+        self._exact_positions = exact
+        self._form_positions = forms
+
+        for key, position in forms:
+            en_name = teams[position][1]
+            self.normalized[key] = en_name
+            index = len(self.forms)
+            self.forms.append((key, en_name))
+            for gram in _bigrams(key):
+                self.bigram_index.setdefault(gram, []).append(index)
+
+    def to_bytes(self, source_digest: bytes) -> bytes:
+        """序列化为二进制索引：头部、ID 数组、名称下标数组和以 \\0 分隔的 UTF-8 字符串区"""
+        header = ALIAS_ARTIFACT_HEADER.pack(
+            ALIAS_ARTIFACT_MAGIC, ALIAS_ARTIFACT_VERSION, source_digest,
+            len(self.teams), len(self._exact_positions), len(self._form_positions)
+        )
+        ids = array('q', [team_id for team_id, _ in self.teams])
+        exact_positions = array('I', [position for _, position in self._exact_positions])
+        form_positions = array('I', [position for _, position in self._form_positions])
+        strings = [en_name for _, en_name in self.teams]
+        strings += [alias for alias, _ in self._exact_positions]
+        strings += [key for key, _ in self._form_positions]
+        return b"".join([
+            header, ids.tobytes(), exact_positions.tobytes(), form_positions.tobytes(),
+            "\0".join(strings).encode('utf-8')
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """从二进制索引恢复，返回 (索引, 别名表 SHA-1)；格式不符时抛出 ValueError"""
+        magic, version, source_digest, n_teams, n_exact, n_forms = ALIAS_ARTIFACT_HEADER.unpack_from(data)
+        if magic != ALIAS_ARTIFACT_MAGIC or version != ALIAS_ARTIFACT_VERSION:
+            raise ValueError(f"别名索引格式不匹配 (版本 {version})")
+        offset = ALIAS_ARTIFACT_HEADER.size
+        ids = array('q')
+        ids.frombytes(data[offset:offset + n_teams * ids.itemsize])
+        offset += n_teams * ids.itemsize
+        exact_positions = array('I')
+        exact_positions.frombytes(data[offset:offset + n_exact * exact_positions.itemsize])
+        offset += n_exact * exact_positions.itemsize
+        form_positions = array('I')
+        form_positions.frombytes(data[offset:offset + n_forms * form_positions.itemsize])
+        offset += n_forms * form_positions.itemsize
+        strings = data[offset:].decode('utf-8').split("\0") if n_teams + n_exact + n_forms else []
+        if len(strings) != n_teams + n_exact + n_forms:
+            raise ValueError("别名索引内容不完整")
+
+        index = cls.__new__(cls)
+        index._build(
+            list(zip(ids.tolist(), strings[:n_teams])),
+            list(zip(strings[n_teams:n_teams + n_exact], exact_positions.tolist())),
+            list(zip(strings[n_teams + n_exact:], form_positions.tolist())),
+            source_digest.hex()[:16]
+        )
+        return index, source_digest
+
+    def match(self, team_name: str):
+        """精确匹配，返回 (英文名, 是否经过规范化)；未命中返回 (None, False)"""
+        en_name = self.exact.get(team_name)
+        if en_name:
+            return en_name, False
+        en_name = self.normalized.get(normalize_team_key(team_name))
+        return en_name, en_name is not None
+
+    def fuzzy_match(self, team_name: str, threshold: int = 75):
+        """模糊匹配，返回 (英文名, 得分)；得分相同时取别名表中靠前的球队"""
+        key = normalize_team_key(team_name)
+        if not key:
+            return None, 0
+        candidates = set()
+        for gram in _bigrams(key):
+            candidates.update(self.bigram_index.get(gram, ()))
+
+        best_score = 0
+        best_match = None
+        for position in sorted(candidates):
+            alias_key, en_name = self.forms[position]
+            score = fuzz.ratio(key, alias_key)
+            if score > best_score and score > threshold:
+                best_score = score
+                best_match = en_name
+        return best_match, best_score
+
+def _file_digest(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()
+
+def build_alias_artifact(csv_path=ALIAS_FILE, artifact_path=ALIAS_ARTIFACT):
+    """把别名表编译为二进制索引，返回构建好的 AliasIndex"""
+    source_digest = _file_digest(csv_path)
+    index = AliasIndex(load_aliases(csv_path), source_digest.hex()[:16])
+    tmp_path = f"{artifact_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(index.to_bytes(source_digest))
+    os.replace(tmp_path, artifact_path)
+    logger.info(f"✅ 已编译别名索引 {artifact_path}: {len(index.teams)} 支球队, {len(index.forms)} 个规范化名称")
+    return index
+
+def load_alias_index(csv_path=ALIAS_FILE, artifact_path=ALIAS_ARTIFACT):
+    """优先读取二进制索引；索引缺失、损坏或与别名表内容不一致时回退到 CSV 并重新编译"""
+    source_digest = _file_digest(csv_path) if os.path.exists(csv_path) else None
+    if os.path.exists(artifact_path):
+        try:
+            with open(artifact_path, 'rb') as f:
+                index, built_from = AliasIndex.from_bytes(f.read())
+            if source_digest is None or built_from == source_digest:
+                logger.info(f"✅ 从 {artifact_path} 加载别名索引: {len(index.forms)} 个规范化名称")
+                return index
+            logger.info(f"别名表已更新，{artifact_path} 已过期")
+        except Exception as e:
+            logger.error(f"❌ 读取别名索引失败: {str(e)}")
+    if source_digest is None:
+        logger.error(f"❌ 未找到 {csv_path} 文件")
+        return AliasIndex({})
+    try:
+        return build_alias_artifact(csv_path, artifact_path)
+    except Exception as e:
+        # 数据目录只读等情况下仍可直接使用 CSV 构建的索引
+        logger.error(f"❌ 写入别名索引失败: {str(e)}")
+        return AliasIndex(load_aliases(csv_path), source_digest.hex()[:16])
+
+ALIAS_INDEX = load_alias_index()
+
+class AliasIndexWatcher:
+    """在后台监视别名表，文件变化后重建索引并替换 ALIAS_INDEX
+
+    重建在监视线程中完成，替换只是一次全局变量赋值，正在处理的请求继续使用旧索引。
+    """
+
+    def __init__(self, csv_path=ALIAS_FILE, interval=ALIAS_RELOAD_INTERVAL):
+        self.csv_path = csv_path
+        self.interval = interval
+        self.reloads = 0
+        self.last_reloaded = None
+        self._signature = self._file_signature()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.csv_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def check(self):
+        """别名表被修改时重建索引，返回是否替换了索引"""
+        global ALIAS_INDEX
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            index = load_alias_index(self.csv_path)
+        except Exception as e:
+            logger.error(f"❌ 重新加载别名表失败: {str(e)}")
+            return False
+        if index.version == ALIAS_INDEX.version:
+            return False
+        ALIAS_INDEX = index
+        self.reloads += 1
+        self.last_reloaded = datetime.now().isoformat()
+        logger.info(f"✅ 别名表已更新，切换到索引版本 {index.version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="alias-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+alias_watcher = AliasIndexWatcher()
 
 # 中文转换模块
 def chinese_to_en(team_name: str) -> str:
     team_name = team_name.strip()
     logger.info(f"尝试转换球队名称: {team_name}")
-    for zh_name, info in ALIAS_MAPPING.items():
-        if team_name == zh_name or team_name in info['aliases']:
-            logger.info(f"找到精确匹配: {team_name} -> {info['en_name']}")
-            return info['en_name']
+    # 取一次引用，别名表热更新时同一次转换始终使用同一个索引
+    alias_index = ALIAS_INDEX
+    en_name, normalized = alias_index.match(team_name)
+    if en_name:
+        logger.info(f"找到{'规范化' if normalized else '精确'}匹配: {team_name} -> {en_name}")
+        return en_name
     # 模糊匹配
-    best_score = 0
-    best_match = None
-    for zh_name, info in ALIAS_MAPPING.items():
-        aliases = [zh_name] + info['aliases']
-        for alias in aliases:
-            score = fuzz.ratio(team_name, alias)
-            if score > best_score and score > 75:
-                best_score = score
-                best_match = info['en_name']
+    best_match, best_score = alias_index.fuzzy_match(team_name)
     if best_match:
         logger.info(f"找到模糊匹配: {team_name} -> {best_match} (得分: {best_score})")
         return best_match
@@ -138,6 +488,7 @@ async def search_team(team_name: str) -> dict:
         return cache[cache_key]
 
     sources = [search_football_data, search_api_football]
+    rate_limited = None
     for source in sources:
         try:
             result = await source(en_name)
@@ -145,17 +496,24 @@ async def search_team(team_name: str) -> dict:
                 logger.info(f"从 {source.__name__} 获取球队信息成功: {en_name}")
                 cache[cache_key] = result
                 return result
+        except HTTPException as e:
+            # 数据源配额用完，换下一个数据源
+            rate_limited = e
+            continue
         except Exception as e:
             logger.error(f"从 {source.__name__} 获取球队信息失败: {str(e)}")
             continue
+    if rate_limited:
+        raise rate_limited
     raise HTTPException(404, f"未找到球队: {team_name}")
 
 async def search_football_data(name: str):
     url = f"{APIConfig.FOOTBALL_DATA['base_url']}/teams"
-    response = requests.get(
+    response = await http_client.get(
         url,
         headers=APIConfig.FOOTBALL_DATA['headers'],
-        params={'name': name}
+        params={'name': name},
+        provider='football-data'
     )
     if response.status_code == 200:
         teams = response.json().get('teams', [])
@@ -167,10 +525,11 @@ async def search_football_data(name: str):
 
 async def search_api_football(name: str):
     url = f"{APIConfig.API_FOOTBALL['base_url']}/teams"
-    response = requests.get(
+    response = await http_client.get(
         url,
         headers=APIConfig.API_FOOTBALL['headers'],
-        params={'search': name}
+        params={'search': name},
+        provider='api-football'
     )
     if response.status_code == 200:
         data = response.json().get('response', [])
@@ -226,10 +585,11 @@ async def get_recent_matches(team_id: int, days=365):
     end_date = datetime.now().strftime('%Y-%m-%d')
     start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
     try:
-        response = requests.get(
+        response = await http_client.get(
             f"{APIConfig.FOOTBALL_DATA['base_url']}/teams/{team_id}/matches",
             headers=APIConfig.FOOTBALL_DATA['headers'],
-            params={'dateFrom': start_date, 'dateTo': end_date, 'status': 'FINISHED', 'limit': 10}
+            params={'dateFrom': start_date, 'dateTo': end_date, 'status': 'FINISHED', 'limit': 10},
+            provider='football-data'
         )
         if response.status_code == 200:
             matches = response.json().get('matches', [])
@@ -243,6 +603,8 @@ async def get_recent_matches(team_id: int, days=365):
             return result
         logger.warning(f"获取比赛数据失败，状态码: {response.status_code}")
         return []
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取比赛数据失败: {str(e)}")
         return []
@@ -250,6 +612,26 @@ async def get_recent_matches(team_id: int, days=365):
 # ====================
 # 路由部分
 # ====================
+@app.on_event("startup")
+async def start_alias_watcher():
+    alias_watcher.start()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await http_client.close()
+
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "ok",
+        "alias_index": {
+            "version": ALIAS_INDEX.version,
+            "names": len(ALIAS_INDEX.forms),
+            "reloads": alias_watcher.reloads,
+            "last_reloaded": alias_watcher.last_reloaded
+        }
+    }
+
 @app.get("/")
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -309,5 +691,9 @@ async def predict_with_teams(data: TeamPredictionRequest, response: Response):
 # 运行部分
 # ====================
 if __name__ == "__main__":
+    # python api.py build-aliases: 只编译别名索引
+    if sys.argv[1:] == ["build-aliases"]:
+        build_alias_artifact()
+        sys.exit(0)
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
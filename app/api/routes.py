@@ -1,31 +1,62 @@
-from fastapi import APIRouter, Request, HTTPException, Response, Depends
+from fastapi import APIRouter, Request, HTTPException, Response, Depends, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from typing import List, Optional
 
 from app.data.database import get_db
-from app.services.prediction import get_prediction_service
+from app.services.prediction import get_prediction_service, get_micro_batcher, get_pair_matrices, get_prediction_cache, prediction_etag, get_stored_predictions, get_stored_prediction
+from app.core.config import settings
 from app.core.logging import logger
 
 router = APIRouter( )
 
 # 请求模型
 class TeamPredictionRequest(BaseModel):
-    home_team: str
-    away_team: str
+    # 每支球队可以用名称或球队ID指定，同时提供时以ID为准
+    home_team: Optional[str] = None
+    away_team: Optional[str] = None
+    home_team_id: Optional[int] = None
+    away_team_id: Optional[int] = None
+
+    def missing_team(self):
+        """缺少球队时返回错误信息，否则返回 None"""
+        if self.home_team_id is None and not self.home_team:
+            return "缺少主队名称或主队ID"
+        if self.away_team_id is None and not self.away_team:
+            return "缺少客队名称或客队ID"
+        return None
+
+    def check_teams(self):
+        error = self.missing_team()
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+class BatchPredictionRequest(BaseModel):
+    fixtures: List[TeamPredictionRequest]
+
+class BatchResolveRequest(BaseModel):
+    names: List[str]
+    # 可选提示：限定候选球队的数据来源和联赛
+    source: Optional[str] = None
+    league: Optional[str] = None
 
 @router.post("/predict/teams")
 async def predict_with_teams(data: TeamPredictionRequest, response: Response, db: Session = Depends(get_db)):
     """预测两支球队之间的比赛结果"""
     response.headers["Content-Type"] = "application/json; charset=utf-8"
     
+    data.check_teams()
+    
     try:
-        logger.info(f"收到预测请求: 主队={data.home_team}, 客队={data.away_team}")
+        logger.info(f"收到预测请求: 主队={data.home_team_id or data.home_team}, 客队={data.away_team_id or data.away_team}")
         
         # 获取预测服务
         prediction_service = get_prediction_service(db)
         
         # 执行预测
-        result = prediction_service.predict_match(data.home_team, data.away_team)
+        result = await prediction_service.predict_match_async(
+            data.home_team, data.away_team, data.home_team_id, data.away_team_id
+        )
         
         return result
     except ValueError as e:
@@ -35,34 +66,226 @@ async def predict_with_teams(data: TeamPredictionRequest, response: Response, db
         logger.error(f"预测失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"预测失败: {str(e)}")
 
+def _etag_matches(if_none_match: str, etag: str):
+    """判断 If-None-Match 是否包含当前 ETag"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag == etag or (tag.startswith('W/') and tag[2:] == etag):
+            return True
+    return False
+
+@router.get("/predict/teams/{home_team_id}/{away_team_id}")
+async def predict_with_team_ids(home_team_id: int, away_team_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """按球队ID预测比赛结果，支持 ETag 条件请求，可被浏览器和CDN缓存"""
+    etag = prediction_etag(home_team_id, away_team_id)
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.PREDICTION_HTTP_MAX_AGE}"
+    }
+    
+    # 球队、统计数据和模型都未变化，直接返回 304，不调用模型
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    try:
+        prediction_service = get_prediction_service(db)
+        result = prediction_service.predict_match_by_ids(home_team_id, away_team_id)
+    except ValueError as e:
+        logger.error(f"预测请求参数错误: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"预测失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"预测失败: {str(e)}")
+    
+    # 计算期间模型可能已更新，按实际使用的模型版本生成 ETag
+    cache_headers["ETag"] = prediction_etag(home_team_id, away_team_id, result.get("model_version"))
+    response.headers.update(cache_headers)
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    return result
+
+@router.post("/predict/batch")
+async def predict_batch(data: BatchPredictionRequest, response: Response, db: Session = Depends(get_db)):
+    """批量预测多场比赛，单场失败不影响其他比赛"""
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    
+    if len(data.fixtures) > settings.PREDICT_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"单次最多预测 {settings.PREDICT_BATCH_MAX_SIZE} 场比赛")
+    
+    # 缺少球队的比赛只在对应位置返回 error，其余比赛照常预测
+    results = [None] * len(data.fixtures)
+    positions = []
+    for i, fixture in enumerate(data.fixtures):
+        error = fixture.missing_team()
+        if error:
+            results[i] = {"home_team": fixture.home_team_id or fixture.home_team,
+                          "away_team": fixture.away_team_id or fixture.away_team, "error": error}
+        else:
+            positions.append(i)
+    
+    try:
+        prediction_service = get_prediction_service(db)
+        valid = [data.fixtures[i] for i in positions]
+        predicted = prediction_service.predict_batch([
+            (
+                fixture.home_team_id if fixture.home_team_id is not None else fixture.home_team,
+                fixture.away_team_id if fixture.away_team_id is not None else fixture.away_team
+            )
+            for fixture in valid
+        ]) if valid else []
+        for i, result in zip(positions, predicted):
+            results[i] = result
+        return {"results": results}
+    except ValueError as e:
+        logger.error(f"批量预测请求参数错误: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"批量预测失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量预测失败: {str(e)}")
+
+@router.get("/predict/metrics")
+async def prediction_metrics():
+    """推理微批处理统计"""
+    batcher = get_micro_batcher()
+    matrices = get_pair_matrices().get_stats()
+    cache = get_prediction_cache().get_stats()
+    if batcher is None:
+        return {"micro_batching": False, "pair_matrices": matrices, "result_cache": cache}
+    return {"micro_batching": True, **batcher.get_stats(), "pair_matrices": matrices, "result_cache": cache}
+
+@router.get("/competitions/{competition}/matrix")
+async def competition_matrix(competition: str):
+    """联赛内全部对阵的预测概率矩阵"""
+    matrix = get_pair_matrices().get(competition)
+    if matrix is None:
+        raise HTTPException(status_code=404, detail=f"联赛对阵矩阵不可用: {competition}")
+    return {
+        "competition": matrix.competition,
+        "teams": matrix.team_ids,
+        "matrix": matrix.to_dict()
+    }
+
+@router.get("/fixtures")
+async def upcoming_fixtures(days: int = 7, competition: str = None, db: Session = Depends(get_db)):
+    """未来比赛及同步后预先计算的预测结果"""
+    try:
+        return {"fixtures": get_stored_predictions(db, days=days, competition=competition)}
+    except Exception as e:
+        logger.error(f"获取赛程预测失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"获取赛程预测失败: {str(e)}")
+
+@router.get("/fixtures/{match_id}/prediction")
+async def fixture_prediction(match_id: str, db: Session = Depends(get_db)):
+    """按比赛ID读取预先计算的预测结果"""
+    result = get_stored_prediction(db, match_id)
+    if not result:
+        raise HTTPException(status_code=404, detail=f"未找到比赛预测: {match_id}")
+    return result
+
 @router.get("/teams/search")
-async def search_teams(q: str, db: Session = Depends(get_db)):
-    """搜索球队"""
-    from app.utils.team_matching import get_team_matcher
+async def search_teams(q: str, limit: int = Query(5, ge=1, le=50), offset: int = Query(0, ge=0)):
+    """搜索球队(自动补全)，在内存索引中做前缀和包含匹配"""
+    from app.utils.team_index import get_team_index
+    from app.utils.team_search import get_team_search_index
     
     try:
         if not q or len(q) < 2:
-            return {"teams": []}
+            return {"teams": [], "total": 0}
             
-        team_matcher = get_team_matcher(db)
-        teams = team_matcher.search_in_db(q)
+        search_index = get_team_search_index(get_team_index())
+        teams, total = search_index.search(q, limit=limit, offset=offset)
         
         result = [
             {
                 "id": team.id,
                 "name": team.name,
                 "zh_name": team.zh_name,
-                "country": team.country
+                "country": team.country,
+                "matched": matched
             }
-            for team in teams
+            for team, matched in teams
         ]
         
-        return {"teams": result}
+        return {"teams": result, "total": total}
     except Exception as e:
         logger.error(f"搜索球队失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
+@router.get("/teams/resolve")
+async def resolve_team(name: str, response: Response, fuzzy: bool = True, db: Session = Depends(get_db)):
+    """将球队名称解析为球队ID，客户端可缓存结果后直接按ID请求预测"""
+    from app.utils.team_matching import get_team_matcher
+    
+    if not name or not name.strip():
+        raise HTTPException(status_code=400, detail="球队名称不能为空")
+    
+    try:
+        team_matcher = get_team_matcher(db)
+        # 先在共享索引中精确查找，找不到时才走完整的匹配流程
+        team = team_matcher.match_exact(name)
+        match_type = "exact"
+        if not team and fuzzy:
+            team = team_matcher.match_team(name)
+            match_type = "fuzzy"
+    except Exception as e:
+        logger.error(f"解析球队名称失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    
+    if not team:
+        raise HTTPException(status_code=404, detail=f"未找到球队: {name}")
+    
+    response.headers["Cache-Control"] = f"public, max-age={settings.TEAM_RESOLVE_MAX_AGE}"
+    return {
+        "query": name,
+        "id": team.id,
+        "name": team.name,
+        "zh_name": team.zh_name,
+        "country": team.country,
+        "league": team.league,
+        "match": match_type
+    }
+
+@router.post("/teams/resolve/batch")
+async def resolve_teams_batch(data: BatchResolveRequest, db: Session = Depends(get_db)):
+    """批量将球队名称解析为球队ID，返回每个名称命中的名称形式和得分"""
+    from app.utils.team_matching import get_team_matcher
+    
+    if len(data.names) > settings.TEAM_RESOLVE_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"单次最多解析 {settings.TEAM_RESOLVE_BATCH_MAX_SIZE} 个名称")
+    
+    try:
+        team_matcher = get_team_matcher(db)
+        resolved = team_matcher.resolve_many(data.names, league=data.league, source=data.source)
+    except Exception as e:
+        logger.error(f"批量解析球队名称失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量解析失败: {str(e)}")
+    
+    results = []
+    for name in data.names:
+        team, matched, score, match_type = resolved[name]
+        results.append({
+            "query": name,
+            "id": team.id if team else None,
+            "name": team.name if team else None,
+            "matched": matched,
+            "score": score,
+            "match": match_type
+        })
+    return {
+        "results": results,
+        "resolved": sum(1 for result in results if result["id"] is not None)
+    }
+
 @router.get("/health")
 async def health_check():
     """健康检查端点"""
-    return {"status": "ok", "service": "football-prediction-api"}
\ No newline at end of file
+    from app.utils.team_index import team_index
+    return {
+        "status": "ok",
+        "service": "football-prediction-api",
+        "team_index": {
+            "generation": team_index.generation,
+            "version": team_index.version
+        }
+    }
\ No newline at end of file
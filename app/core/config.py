@@ -18,6 +18,17 @@ class Settings(BaseSettings):
     FOOTBALL_DATA_URL: str = "https://api.football-data.org/v4"
     API_FOOTBALL_URL: str = "https://v3.football.api-sports.io"
     
+    # 外部接口 HTTP 客户端设置
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "15"))  # 单个请求的总超时(秒)
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # 建立连接的超时(秒)
+    HTTP_MAX_CONCURRENCY: int = int(os.getenv("HTTP_MAX_CONCURRENCY", "20"))  # 同时进行的请求总数上限
+    HTTP_LIMIT_PER_HOST: int = int(os.getenv("HTTP_LIMIT_PER_HOST", "5"))  # 每个上游主机的连接数上限
+    
+    # 数据源请求配额(每分钟请求数，按各数据源公布的限制设置，0 表示不限速)
+    RATE_LIMIT_FOOTBALL_DATA: int = int(os.getenv("RATE_LIMIT_FOOTBALL_DATA", "10"))  # football-data.org 免费版每分钟10次
+    RATE_LIMIT_API_FOOTBALL: int = int(os.getenv("RATE_LIMIT_API_FOOTBALL", "10"))  # API-Football 免费版每分钟10次
+    RATE_LIMIT_JUHE: int = int(os.getenv("RATE_LIMIT_JUHE", "30"))  # 聚合数据
+    
     # 数据库设置
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./data/football.db")
     
@@ -25,9 +36,36 @@ class Settings(BaseSettings):
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 默认1小时
     CACHE_MAXSIZE: int = int(os.getenv("CACHE_MAXSIZE", "100"))
     
+    # 模型设置
+    MODEL_RELOAD_INTERVAL: float = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))  # 检查模型文件变化的间隔(秒)
+    
+    # 批量预测设置
+    PREDICT_BATCH_MAX_SIZE: int = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "500"))
+    
+    # 推理微批处理设置(合并并发的单场预测请求)
+    PREDICT_MICROBATCH_ENABLED: bool = os.getenv("PREDICT_MICROBATCH_ENABLED", "False").lower() in ("true", "1", "t")
+    PREDICT_MICROBATCH_WINDOW_MS: float = float(os.getenv("PREDICT_MICROBATCH_WINDOW_MS", "5"))  # 最长等待时间(毫秒)
+    PREDICT_MICROBATCH_MAX_SIZE: int = int(os.getenv("PREDICT_MICROBATCH_MAX_SIZE", "64"))
+    
+    # 预测结果缓存设置
+    PREDICTION_CACHE_MAXSIZE: int = int(os.getenv("PREDICTION_CACHE_MAXSIZE", "10000"))
+    PREDICTION_CACHE_TTL: int = int(os.getenv("PREDICTION_CACHE_TTL", "3600"))  # 默认1小时
+    PREDICTION_HTTP_MAX_AGE: int = int(os.getenv("PREDICTION_HTTP_MAX_AGE", "60"))  # GET 预测接口的浏览器/CDN缓存时间(秒)
+    STATS_CHECK_INTERVAL: float = float(os.getenv("STATS_CHECK_INTERVAL", "5"))  # 检查其他进程是否更新了统计数据的间隔(秒)
+    
+    # 对阵预测矩阵设置
+    PAIR_MATRIX_MAX_TEAMS: int = int(os.getenv("PAIR_MATRIX_MAX_TEAMS", "200"))  # 单个联赛最多球队数，超过则不构建矩阵
+    
+    # 球队索引设置
+    TEAM_INDEX_CHECK_INTERVAL: float = float(os.getenv("TEAM_INDEX_CHECK_INTERVAL", "300"))  # 检查球队表变化的间隔(秒)
+    ALIAS_WATCH_INTERVAL: float = float(os.getenv("ALIAS_WATCH_INTERVAL", "5"))  # 检查别名文件变化的间隔(秒)
+    TEAM_RESOLVE_MAX_AGE: int = int(os.getenv("TEAM_RESOLVE_MAX_AGE", "3600"))  # 名称解析结果的浏览器/CDN缓存时间(秒)
+    TEAM_RESOLVE_BATCH_MAX_SIZE: int = int(os.getenv("TEAM_RESOLVE_BATCH_MAX_SIZE", "5000"))
+    
     # 同步设置
     SYNC_CRON_HOUR: int = int(os.getenv("SYNC_CRON_HOUR", "3"))
     SYNC_CRON_MINUTE: int = int(os.getenv("SYNC_CRON_MINUTE", "0"))
+    SYNC_UPSERT_CHUNK_SIZE: int = int(os.getenv("SYNC_UPSERT_CHUNK_SIZE", "500"))  # 批量写入球队/比赛/统计数据时每条语句的行数
     
     # API 头信息
     @property
@@ -0,0 +1,84 @@
+import time
+import asyncio
+
+from app.core.config import settings
+from app.core.logging import logger
+
+class RateLimitExceeded(Exception):
+    """等待令牌的时间超过了调用方允许的上限"""
+
+    def __init__(self, delay: float):
+        super().__init__(f"限速中，需要等待 {delay:.1f} 秒")
+        self.delay = delay
+
+class TokenBucket:
+    """令牌桶限速器
+
+    桶满时允许 capacity 个请求立即发出，之后按 rate(个/秒)补充令牌。
+    令牌不足时预留下一个令牌并等待到它生成为止，等待的请求按到达顺序依次放行。
+    只在事件循环中使用，检查和扣减之间没有 await，不需要加锁。
+    指定 max_wait 时，需要等待更久的请求不预留令牌，直接抛出 RateLimitExceeded。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.rejected = 0
+
+    @classmethod
+    def for_quota(cls, requests_per_minute: int, burst: int = None):
+        """按数据源公布的每分钟配额创建：突发量加上一分钟内补充的令牌不超过配额"""
+        burst = max(1, requests_per_minute // 2 if burst is None else burst)
+        burst = min(burst, requests_per_minute - 1) if requests_per_minute > 1 else 1
+        return cls(rate=max(requests_per_minute - burst, 1) / 60.0, capacity=burst)
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: float = None):
+        self._refill(time.monotonic())
+        if max_wait is not None and (1 - self._tokens) / self.rate > max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded((1 - self._tokens) / self.rate)
+        self._tokens -= 1
+        if self._tokens < 0:
+            delay = -self._tokens / self.rate
+            self.waits += 1
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+    def get_stats(self):
+        self._refill(time.monotonic())
+        return {
+            'rate_per_minute': round(self.rate * 60, 2),
+            'capacity': self.capacity,
+            'tokens': round(self._tokens, 2),
+            'waits': self.waits,
+            'waited_seconds': round(self.waited_seconds, 2),
+            'rejected': self.rejected
+        }
+
+# 各数据源公布的每分钟请求配额
+PROVIDER_QUOTAS = {
+    'football-data': settings.RATE_LIMIT_FOOTBALL_DATA,
+    'api-football': settings.RATE_LIMIT_API_FOOTBALL,
+    'juhe': settings.RATE_LIMIT_JUHE
+}
+
+_limiters = {}
+
+def get_rate_limiter(provider: str):
+    """获取数据源的限速器；没有配置配额的数据源返回 None"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        quota = PROVIDER_QUOTAS.get(provider)
+        if not quota:
+            return None
+        limiter = _limiters.setdefault(provider, TokenBucket.for_quota(quota))
+        logger.info(f"数据源 {provider} 限速: 每分钟 {quota} 次请求")
+    return limiter
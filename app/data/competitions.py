@@ -0,0 +1,42 @@
+# 系统支持的联赛：以 football-data.org 的联赛代码作为统一的联赛标识，
+# 记录各数据源中对应的联赛ID和名称
+COMPETITIONS = {
+    'PL': {
+        'name': 'Premier League',
+        'country': 'England',
+        'api_football': '39'
+    },
+    'BL1': {
+        'name': 'Bundesliga',
+        'country': 'Germany',
+        'api_football': '78'
+    },
+    'SA': {
+        'name': 'Serie A',
+        'country': 'Italy',
+        'api_football': '135'
+    },
+    'PD': {
+        'name': 'Primera Division',
+        'country': 'Spain',
+        'api_football': '140'
+    },
+    'FL1': {
+        'name': 'Ligue 1',
+        'country': 'France',
+        'api_football': '61'
+    }
+}
+
+# 联赛代码、各数据源的联赛ID和名称(小写) -> 联赛代码
+_ALIASES = {}
+for _code, _info in COMPETITIONS.items():
+    for _value in (_code, _info['api_football'], _info['name']):
+        _ALIASES[_value.lower()] = _code
+
+def normalize_competition(value):
+    """把联赛代码、API Football 联赛ID或联赛名称统一为联赛代码；未知联赛原样返回字符串，空值返回 None"""
+    if value is None or value == '':
+        return None
+    value = str(value).strip()
+    return _ALIASES.get(value.lower(), value)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, create_engine, inspect
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, UniqueConstraint, Index, create_engine, inspect, select, delete, func, and_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
@@ -24,6 +24,10 @@ class Team(Base):
 
 class TeamStats(Base):
     __tablename__ = 'team_stats'
+    __table_args__ = (
+        # 每支球队一行，批量写入时按 team_id 冲突更新
+        Index('uq_team_stats_team_id', 'team_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     team_id = Column(Integer)
@@ -49,6 +53,28 @@ class Match(Base):
     source = Column(String(20))
     details = Column(JSON, nullable=True)
 
+class Prediction(Base):
+    """同步后预先计算的赛程预测，按比赛ID和模型版本存储"""
+    __tablename__ = 'predictions'
+    __table_args__ = (
+        UniqueConstraint('match_id', 'model_version', name='uq_predictions_match_model'),
+        Index('ix_predictions_model_date', 'model_version', 'match_date'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    match_id = Column(String(50))
+    model_version = Column(String(100))
+    home_team_id = Column(Integer)
+    away_team_id = Column(Integer)
+    home_team = Column(String(100))
+    away_team = Column(String(100))
+    competition = Column(String(50))
+    match_date = Column(DateTime)
+    prediction = Column(String(20))
+    probabilities = Column(JSON, nullable=True)
+    features = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 # 数据库连接和会话
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -64,10 +90,37 @@ def create_tables():
 # 检查表是否存在
 def check_tables_exist():
     inspector = inspect(engine)
-    tables = ['teams', 'team_stats', 'matches']
+    tables = ['teams', 'team_stats', 'matches', 'predictions']
     missing_tables = [table for table in tables if not inspector.has_table(table)]
     return len(missing_tables) == 0
 
+# 删除唯一索引列上重复的行，每组只保留 id 最大(最后写入)的一行
+def remove_duplicates(table, columns):
+    keep = select(func.max(table.c.id)).where(and_(*[c.isnot(None) for c in columns])).group_by(*columns)
+    stmt = delete(table).where(and_(*[c.isnot(None) for c in columns], table.c.id.not_in(keep)))
+    with engine.begin() as conn:
+        removed = conn.execute(stmt).rowcount
+    if removed:
+        logger.warning(f"{table.name} 中有 {removed} 行与 {', '.join(c.name for c in columns)} 重复，已删除")
+
+# 为已存在的表补建后来新增的索引
+# 唯一索引建不起来时，依赖它的 ON CONFLICT 写入都会失败，所以直接抛出异常让启动失败
+def ensure_indexes():
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                remove_duplicates(table, list(index.columns))
+            try:
+                index.create(bind=engine)
+            except Exception as e:
+                logger.error(f"创建索引 {index.name} 失败: {str(e)}")
+                raise
+            logger.info(f"已创建索引 {index.name}")
+
 # 确保所有表存在
 def init_db():
     try:
@@ -82,6 +135,8 @@ def init_db():
         logger.error(f"数据库初始化失败: {str(e)}")
         # 如果出错，尝试强制创建表
         create_tables()
+    # 不放在上面的 try 里：索引创建失败必须让启动失败
+    ensure_indexes()
 
 # 获取数据库会话
 def get_db():
@@ -0,0 +1,75 @@
+import time
+import hashlib
+import threading
+from sqlalchemy import select, func
+
+from app.data.database import TeamStats, SessionLocal
+from app.core.config import settings
+from app.core.logging import logger
+
+class StatsGeneration:
+    """球队统计数据的代数
+
+    本进程的 update_team_stats 提交后调用 bump() 立即加一；
+    其他进程(如定时同步任务)的修改通过 team_stats 表的行数和最后更新时间定期发现。
+    generation 只在本进程内递增，token 由表内容摘要生成，在所有进程中一致。
+    """
+
+    def __init__(self, check_interval: float = None):
+        self.check_interval = settings.STATS_CHECK_INTERVAL if check_interval is None else check_interval
+        self._generation = 0
+        self._fingerprint = None
+        self._last_checked = 0.0
+        self._lock = threading.Lock()
+
+    def _load_fingerprint(self):
+        db = SessionLocal()
+        try:
+            count, last_updated = db.execute(
+                select(func.count(TeamStats.id), func.max(TeamStats.last_updated))
+            ).one()
+            return f"{count}:{last_updated}"
+        finally:
+            db.close()
+
+    def check(self):
+        """检查统计表是否变化，变化时代数加一"""
+        with self._lock:
+            self._last_checked = time.monotonic()
+            try:
+                fingerprint = self._load_fingerprint()
+            except Exception as e:
+                logger.error(f"检查球队统计数据版本失败: {str(e)}")
+                return self._generation
+            if fingerprint != self._fingerprint:
+                self._fingerprint = fingerprint
+                self._generation += 1
+            return self._generation
+
+    def bump(self):
+        """统计数据提交后调用，使依赖统计数据的缓存立即失效"""
+        with self._lock:
+            self._generation += 1
+            self._last_checked = time.monotonic()
+            try:
+                self._fingerprint = self._load_fingerprint()
+            except Exception as e:
+                logger.error(f"检查球队统计数据版本失败: {str(e)}")
+                self._fingerprint = None
+            logger.info(f"球队统计数据代数更新为 {self._generation}")
+            return self._generation
+
+    @property
+    def generation(self):
+        if time.monotonic() - self._last_checked >= self.check_interval:
+            self.check()
+        return self._generation
+
+    @property
+    def token(self):
+        """跨进程一致的统计数据版本标识"""
+        self.generation
+        return hashlib.sha1(str(self._fingerprint).encode('utf-8')).hexdigest()[:12]
+
+# 进程级统计数据代数
+stats_generation = StatsGeneration()
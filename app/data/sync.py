@@ -1,60 +1,64 @@
-import requests
 import asyncio
 import datetime
 import json
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, insert
+from sqlalchemy import select, update, insert, func, case
 from sqlalchemy.exc import IntegrityError  # 新增导入
 
 from app.data.database import Team, TeamStats, Match, get_db
+from app.data.upsert import bulk_upsert, upsert_all
+from app.data.competitions import COMPETITIONS
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.http_client import http_client
+from app.utils.team_index import team_index
+from app.services.prediction import precompute_upcoming_predictions, get_pair_matrices
+from app.data.stats_generation import stats_generation
+
+# 球队统计数据取最近几场主场/客场比赛
+RECENT_MATCHES = 10
 
 # ======== 数据同步逻辑 ========
 async def sync_football_data_teams(db: Session):
     try:
-        url = f"{settings.FOOTBALL_DATA_URL}/teams"
-        response = requests.get(url, headers=settings.FOOTBALL_DATA_HEADERS)
+        # 按联赛获取球队，记录球队所属的联赛代码
+        competitions = list(COMPETITIONS)
+        responses = await asyncio.gather(*[
+            http_client.get(
+                f"{settings.FOOTBALL_DATA_URL}/competitions/{competition}/teams",
+                headers=settings.FOOTBALL_DATA_HEADERS,
+                provider='football-data'
+            )
+            for competition in competitions
+        ], return_exceptions=True)
         
-        if response.status_code != 200:
-            logger.error(f"Football Data API 请求失败: {response.status_code}")
-            return []
-            
-        teams_data = response.json().get('teams', [])
         result = []
-        
-        for team in teams_data:
-            team_data = {
-                'id': team['id'],
-                'name': team['name'],
-                'official_name': team.get('shortName', team['name']),
-                'country': team.get('area', {}).get('name', 'Unknown'),
-                'source': 'football-data',
-                'last_updated': datetime.datetime.utcnow()
-            }
+        for competition, response in zip(competitions, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Football Data API 请求失败 ({competition}): {str(response)}")
+                continue
             
-            # 修改: 使用SQLite兼容的upsert方法
-            try:
-                # 尝试查找现有记录
-                existing_team = db.execute(
-                    select(Team).where(Team.id == team_data['id'])
-                ).scalar_one_or_none()
+            if response.status_code != 200:
+                logger.error(f"Football Data API 请求失败 ({competition}): {response.status_code}")
+                continue
                 
-                if existing_team:
-                    # 如果存在，更新记录
-                    for key, value in team_data.items():
-                        setattr(existing_team, key, value)
-                else:
-                    # 如果不存在，创建新记录
-                    new_team = Team(**team_data)
-                    db.add(new_team)
+            for team in response.json().get('teams', []):
+                team_data = {
+                    'id': team['id'],
+                    'name': team['name'],
+                    'official_name': team.get('shortName', team['name']),
+                    'country': team.get('area', {}).get('name', 'Unknown'),
+                    'league': competition,
+                    'source': 'football-data',
+                    'last_updated': datetime.datetime.utcnow()
+                }
                 
                 result.append(team_data)
-            except Exception as e:
-                logger.error(f"处理球队 {team_data['name']} 时出错: {str(e)}")
             
+        counts = bulk_upsert(db, Team, result, 'id')
         db.commit()
-        logger.info(f"从 Football Data API 同步了 {len(result)} 支球队")
+        logger.info(f"从 Football Data API 同步了 {len(result)} 支球队 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return result
         
     except Exception as e:
@@ -65,15 +69,25 @@ async def sync_football_data_teams(db: Session):
 async def sync_api_football_teams(db: Session):
     try:
         url = f"{settings.API_FOOTBALL_URL}/teams"
-        leagues = ["39", "140", "78", "135", "61"]  # 英超、西甲、德甲、意甲、法甲
+        competitions = list(COMPETITIONS)
         
-        all_teams = []
-        for league in leagues:
-            response = requests.get(
+        # 各联赛的请求并发发出，由 API Football 的限速器控制请求节奏
+        responses = await asyncio.gather(*[
+            http_client.get(
                 url, 
                 headers=settings.API_FOOTBALL_HEADERS,
-                params={'league': league}
+                params={'league': COMPETITIONS[competition]['api_football']},
+                provider='api-football'
             )
+            for competition in competitions
+        ], return_exceptions=True)
+        
+        all_teams = []
+        for competition, response in zip(competitions, responses):
+            league = COMPETITIONS[competition]['api_football']
+            if isinstance(response, Exception):
+                logger.warning(f"API Football 请求失败 (联赛ID {league}): {str(response)}")
+                continue
             
             if response.status_code != 200:
                 logger.warning(f"API Football 请求失败 (联赛ID {league}): {response.status_code}")
@@ -89,36 +103,18 @@ async def sync_api_football_teams(db: Session):
                     'official_name': team.get('name', ''),
                     'country': team.get('country', 'Unknown'),
                     'logo_url': team.get('logo', ''),
-                    'league': str(league),
+                    # 与 football-data 的球队使用相同的联赛代码
+                    'league': competition,
                     'source': 'api-football',
                     'last_updated': datetime.datetime.utcnow()
                 }
                 
-                # 修改: 使用SQLite兼容的upsert方法
-                try:
-                    # 尝试查找现有记录
-                    existing_team = db.execute(
-                        select(Team).where(Team.id == team_data['id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_team:
-                        # 如果存在，更新记录
-                        for key, value in team_data.items():
-                            setattr(existing_team, key, value)
-                    else:
-                        # 如果不存在，创建新记录
-                        new_team = Team(**team_data)
-                        db.add(new_team)
-                    
-                    all_teams.append(team_data)
-                except Exception as e:
-                    logger.error(f"处理球队 {team_data['name']} 时出错: {str(e)}")
-            
-            # 避免API速率限制
-            await asyncio.sleep(1)
+                all_teams.append(team_data)
         
+        counts = bulk_upsert(db, Team, all_teams, 'id')
         db.commit()
-        logger.info(f"从 API Football 同步了 {len(all_teams)} 支球队")
+        logger.info(f"从 API Football 同步了 {len(all_teams)} 支球队 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return all_teams
         
     except Exception as e:
@@ -127,21 +123,22 @@ async def sync_api_football_teams(db: Session):
         return []
 
 async def sync_matches(db: Session):
-    """同步最近的比赛数据"""
+    """同步最近30天的比赛和未来30天的赛程"""
     try:
         # 设置日期范围
         today = datetime.datetime.now()
         start_date = (today - datetime.timedelta(days=30)).strftime('%Y-%m-%d')
-        end_date = today.strftime('%Y-%m-%d')
+        end_date = (today + datetime.timedelta(days=30)).strftime('%Y-%m-%d')
         
         url = f"{settings.FOOTBALL_DATA_URL}/matches"
-        response = requests.get(
+        response = await http_client.get(
             url, 
             headers=settings.FOOTBALL_DATA_HEADERS,
             params={
                 'dateFrom': start_date,
                 'dateTo': end_date
-            }
+            },
+            provider='football-data'
         )
         
         if response.status_code != 200:
@@ -149,8 +146,10 @@ async def sync_matches(db: Session):
             return
             
         matches_data = response.json().get('matches', [])
+        matches = []
         for match in matches_data:
-            if match['status'] != 'FINISHED':
+            # 已结束的比赛用于统计，未开始的比赛用于预先计算预测
+            if match['status'] not in ('FINISHED', 'SCHEDULED', 'TIMED'):
                 continue
                 
             match_data = {
@@ -169,95 +168,72 @@ async def sync_matches(db: Session):
                 })
             }
             
-            # 修改: 使用SQLite兼容的upsert方法
-            try:
-                # 尝试查找现有记录
-                existing_match = db.execute(
-                    select(Match).where(Match.match_id == match_data['match_id'])
-                ).scalar_one_or_none()
-                
-                if existing_match:
-                    # 如果存在，更新记录
-                    for key, value in match_data.items():
-                        setattr(existing_match, key, value)
-                else:
-                    # 如果不存在，创建新记录
-                    new_match = Match(**match_data)
-                    db.add(new_match)
-            except Exception as e:
-                logger.error(f"处理比赛 {match_data['match_id']} 时出错: {str(e)}")
+            matches.append(match_data)
             
+        counts = bulk_upsert(db, Match, matches, 'match_id')
         db.commit()
-        logger.info(f"同步了 {len(matches_data)} 场比赛")
+        logger.info(f"同步了 {len(matches)} 场比赛 (新增 {counts['inserted']}, 更新 {counts['updated']})")
         
     except Exception as e:
         db.rollback()
         logger.error(f"同步比赛数据时出错: {str(e)}")
 
+def _recent_results(team_column, goals_for, goals_against, recent):
+    """每支球队最近 recent 场已结束比赛(主场或客场)的场次、进球数和胜场数"""
+    ranked = select(
+        team_column.label('team_id'),
+        goals_for.label('goals'),
+        case((goals_for > goals_against, 1), else_=0).label('win'),
+        func.row_number().over(
+            partition_by=team_column,
+            order_by=(Match.date.desc(), Match.id.desc())
+        ).label('rn')
+    ).where(
+        Match.status == 'FINISHED',
+        team_column.isnot(None)
+    ).subquery()
+    return select(
+        ranked.c.team_id,
+        func.count().label('played'),
+        func.coalesce(func.sum(ranked.c.goals), 0).label('goals'),
+        func.sum(ranked.c.win).label('wins')
+    ).where(ranked.c.rn <= recent).group_by(ranked.c.team_id).subquery()
+
+def team_stats_query(recent: int = RECENT_MATCHES):
+    """所有球队统计数据的查询：按比赛日期倒序给每支球队的主客场比赛编号，汇总最近 recent 场"""
+    home = _recent_results(Match.home_team_id, Match.home_goals, Match.away_goals, recent)
+    away = _recent_results(Match.away_team_id, Match.away_goals, Match.home_goals, recent)
+    return select(
+        Team.id.label('team_id'),
+        func.coalesce(home.c.played, 0).label('home_played'),
+        func.coalesce(home.c.goals, 0).label('home_goals'),
+        func.coalesce(home.c.wins, 0).label('home_wins'),
+        func.coalesce(away.c.played, 0).label('away_played'),
+        func.coalesce(away.c.goals, 0).label('away_goals'),
+        func.coalesce(away.c.wins, 0).label('away_wins')
+    ).select_from(Team).outerjoin(home, home.c.team_id == Team.id).outerjoin(away, away.c.team_id == Team.id)
+
+def _rate(total, played):
+    # 在 Python 里取整：SQL 的 ROUND 把 .5 向上舍入，Python 的 round 舍入到偶数
+    return round(total / max(played, 1), 2)
+
 async def update_team_stats(db: Session):
-    """更新球队统计数据"""
+    """更新球队统计数据：一条查询算出所有球队最近的主客场数据，再用一条 INSERT ... ON CONFLICT 写回"""
     try:
-        # 获取所有球队
-        teams = db.execute(select(Team)).scalars().all()
-        
-        for team in teams:
-            # 主场比赛
-            home_matches = db.execute(
-                select(Match).where(
-                    Match.home_team_id == team.id,
-                    Match.status == 'FINISHED'
-                ).order_by(Match.date.desc()).limit(10)
-            ).scalars().all()
-            
-            # 客场比赛
-            away_matches = db.execute(
-                select(Match).where(
-                    Match.away_team_id == team.id,
-                    Match.status == 'FINISHED'
-                ).order_by(Match.date.desc()).limit(10)
-            ).scalars().all()
-            
-            # 计算统计数据
-            home_goals = sum([m.home_goals for m in home_matches if m.home_goals is not None])
-            away_goals = sum([m.away_goals for m in away_matches if m.away_goals is not None])
-            
-            home_wins = sum([1 for m in home_matches if m.home_goals is not None and m.away_goals is not None and m.home_goals > m.away_goals])
-            away_wins = sum([1 for m in away_matches if m.home_goals is not None and m.away_goals is not None and m.away_goals > m.home_goals])
-            
-            total_home = len(home_matches)
-            total_away = len(away_matches)
-            
-            # 准备数据
-            stats_data = {
-                'team_id': team.id,
-                'avg_goals_home': round(home_goals / max(total_home, 1), 2),
-                'avg_goals_away': round(away_goals / max(total_away, 1), 2),
-                'win_rate_home': round(home_wins / max(total_home, 1), 2),
-                'win_rate_away': round(away_wins / max(total_away, 1), 2),
-                'total_matches': total_home + total_away,
-                'last_updated': datetime.datetime.utcnow()
-            }
-            
-            # 修改: 使用SQLite兼容的upsert方法
-            try:
-                # 尝试查找现有记录
-                existing_stats = db.execute(
-                    select(TeamStats).where(TeamStats.team_id == stats_data['team_id'])
-                ).scalar_one_or_none()
-                
-                if existing_stats:
-                    # 如果存在，更新记录
-                    for key, value in stats_data.items():
-                        setattr(existing_stats, key, value)
-                else:
-                    # 如果不存在，创建新记录
-                    new_stats = TeamStats(**stats_data)
-                    db.add(new_stats)
-            except Exception as e:
-                logger.error(f"处理球队 {team.id} 统计数据时出错: {str(e)}")
-            
+        now = datetime.datetime.utcnow()
+        rows = [{
+            'team_id': row.team_id,
+            'avg_goals_home': _rate(row.home_goals, row.home_played),
+            'avg_goals_away': _rate(row.away_goals, row.away_played),
+            'win_rate_home': _rate(row.home_wins, row.home_played),
+            'win_rate_away': _rate(row.away_wins, row.away_played),
+            'total_matches': row.home_played + row.away_played,
+            'last_updated': now
+        } for row in db.execute(team_stats_query())]
+        upsert_all(db, TeamStats, rows, 'team_id')
         db.commit()
-        logger.info(f"更新了 {len(teams)} 支球队的统计数据")
+        stats_generation.bump()
+        logger.info(f"更新了 {len(rows)} 支球队的统计数据")
         
     except Exception as e:
         db.rollback()
@@ -327,11 +303,21 @@ async def run_sync():
         # 3. 更新统计数据
         await update_team_stats(db)
         
+        # 3.1 先重建球队索引，再批量预测所有未来比赛并存储结果
+        team_index.refresh(wait=True)
+        precompute_upcoming_predictions(db)
+        get_pair_matrices().refresh()
+        
         # 4. 更新别名
         await update_team_aliases(db)
         
+        # 5. 球队数据已提交，后台重建共享球队索引(表未变化时不会替换)
+        team_index.refresh()
+        
         logger.info("数据同步完成")
     except Exception as e:
         logger.error(f"数据同步过程中出错: {str(e)}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        # 同步结束后释放连接池，下次同步可能在新的事件循环中运行
+        await http_client.close()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import time
+import asyncio
+import threading
+import numpy as np
+
+from app.core.logging import logger
+
+class BatchMetrics:
+    """微批处理统计：批大小分布和排队延迟"""
+    # 批大小直方图的桶上限
+    SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.size_histogram = {bucket: 0 for bucket in self.SIZE_BUCKETS}
+        self.size_histogram['+Inf'] = 0
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+        self.errors = 0
+
+    def record(self, batch_size: int, delays):
+        with self._lock:
+            self.batches += 1
+            self.rows += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            for bucket in self.SIZE_BUCKETS:
+                if batch_size <= bucket:
+                    self.size_histogram[bucket] += 1
+                    break
+            else:
+                self.size_histogram['+Inf'] += 1
+            self.queue_delay_total += sum(delays)
+            self.queue_delay_max = max(self.queue_delay_max, max(delays))
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else 0,
+                'max_batch_size': self.max_batch_size,
+                'batch_size_histogram': {str(k): v for k, v in self.size_histogram.items()},
+                'avg_queue_delay_ms': round(self.queue_delay_total / self.rows * 1000, 3) if self.rows else 0,
+                'max_queue_delay_ms': round(self.queue_delay_max * 1000, 3),
+                'errors': self.errors
+            }
+
+class MicroBatcher:
+    """推理微批处理：收集并发请求的特征行，在时间窗口内或达到批大小时一次调用模型
+
+    同一批只包含同一模型版本的请求，保证每个请求使用它开始时的模型版本。
+    """
+
+    def __init__(self, score_fn, window_ms: float, max_batch_size: int):
+        # score_fn(model_version, features) -> (labels, proba)
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.metrics = BatchMetrics()
+        # 模型版本 -> [(特征行, future, 入队时间)]
+        self._pending = {}
+        self._timers = {}
+
+    async def submit(self, model_version, row):
+        """提交一行特征，等待批处理结果 (label, proba_row)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(model_version, [])
+        batch.append((row, future, time.perf_counter()))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(model_version)
+        elif len(batch) == 1:
+            self._timers[model_version] = loop.call_later(self.window, self._flush, model_version)
+
+        return await future
+
+    def _flush(self, model_version):
+        timer = self._timers.pop(model_version, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(model_version, None)
+        if batch:
+            asyncio.ensure_future(self._run(model_version, batch))
+
+    async def _run(self, model_version, batch):
+        start = time.perf_counter()
+        self.metrics.record(len(batch), [start - enqueued for _, _, enqueued in batch])
+        features = np.array([row for row, _, _ in batch], dtype=float)
+
+        try:
+            # 在线程池中执行模型调用，执行期间新到达的请求组成下一批
+            loop = asyncio.get_running_loop()
+            labels, proba = await loop.run_in_executor(None, self.score_fn, model_version, features)
+        except Exception as e:
+            self.metrics.record_error()
+            logger.error(f"微批预测失败 (批大小 {len(batch)}): {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result((labels[i], proba[i] if proba is not None else None))
+
+    def get_stats(self):
+        stats = self.metrics.snapshot()
+        stats['window_ms'] = self.window * 1000
+        stats['max_batch_size_config'] = self.max_batch_size
+        return stats
@@ -0,0 +1,153 @@
+import os
+import hashlib
+import threading
+import time
+import datetime
+import joblib
+
+from app.services.tree_ensemble import compile_tree_ensemble
+from app.core.config import settings
+from app.core.logging import logger
+
+class ModelVersion:
+    """已加载的模型版本(不可变)，请求在开始时拿到引用后一直使用同一个版本"""
+    __slots__ = ('name', 'version', 'model', 'evaluator', 'path', 'fingerprint', 'digest', 'loaded_at')
+
+    def __init__(self, name, version, model, path, fingerprint):
+        self.name = name
+        self.version = version
+        self.model = model
+        # 模型文件内容摘要，在多个进程之间稳定，可用于持久化的键
+        self.digest = self._digest(path)
+        # 支持的树集成模型预先编译为 numpy 数组，推理时不经过 sklearn
+        self.evaluator = self._compile(model)
+        self.path = path
+        self.fingerprint = fingerprint
+        self.loaded_at = datetime.datetime.utcnow()
+
+    @staticmethod
+    def _digest(path):
+        h = hashlib.sha1()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        except OSError:
+            return "unknown"
+        return h.hexdigest()[:12]
+
+    @staticmethod
+    def _compile(model):
+        try:
+            return compile_tree_ensemble(model)
+        except Exception as e:
+            logger.warning(f"编译树集成模型失败，使用原模型推理: {str(e)}")
+            return None
+
+    @property
+    def tag(self):
+        """对外展示的版本号，例如 football_model@3f2a9c1b7d4e，同一模型文件在所有进程中相同"""
+        return f"{self.name}@{self.digest}"
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'tag': self.tag,
+            'path': self.path,
+            'compiled': self.evaluator is not None,
+            'loaded_at': self.loaded_at.isoformat()
+        }
+
+class ModelRegistry:
+    """进程内模型注册表：每个模型文件只加载一次，文件变化时原子替换为新版本"""
+
+    def __init__(self, search_paths: dict, default_factory=None, check_interval: float = None):
+        # 模型名称 -> 候选路径列表
+        self.search_paths = search_paths
+        self.default_factory = default_factory
+        self.check_interval = settings.MODEL_RELOAD_INTERVAL if check_interval is None else check_interval
+        self._versions = {}
+        self._last_checked = {}
+        self._lock = threading.Lock()
+
+    def _resolve_path(self, name: str):
+        """返回第一个存在的模型路径"""
+        for path in self.search_paths.get(name, []):
+            if os.path.exists(path):
+                return os.path.abspath(path)
+        return None
+
+    def _fingerprint(self, path: str):
+        """根据修改时间和文件大小判断模型文件是否变化"""
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self, name: str, path: str, fingerprint, previous):
+        """加载模型文件并生成新版本"""
+        logger.info(f"找到模型文件: {path}")
+        model = joblib.load(path)
+        version = previous.version + 1 if previous else 1
+        logger.info(f"✅ 模型加载成功: {name}@{version}")
+        return ModelVersion(name, version, model, path, fingerprint)
+
+    def _create_default(self, name: str):
+        """所有路径都不可用时创建默认模型"""
+        if not self.default_factory:
+            raise FileNotFoundError(f"无法找到模型文件: {name}")
+
+        curr_dir = os.getcwd()
+        logger.error(f"无法找到模型文件，当前工作目录: {curr_dir}")
+        logger.warning("创建默认预测模型作为备选方案")
+        default_model_path = os.path.join(curr_dir, "models", f"{name}.pkl")
+        model = self.default_factory(default_model_path)
+        return ModelVersion(name, 1, model, default_model_path, self._fingerprint(default_model_path))
+
+    def get(self, name: str = "football_model") -> ModelVersion:
+        """获取当前模型版本，必要时检查文件变化并重新加载"""
+        current = self._versions.get(name)
+        now = time.monotonic()
+        if current is not None and now - self._last_checked.get(name, 0) < self.check_interval:
+            return current
+
+        with self._lock:
+            current = self._versions.get(name)
+            if current is not None and now - self._last_checked.get(name, 0) < self.check_interval:
+                return current
+            self._last_checked[name] = now
+
+            path = self._resolve_path(name)
+            if path is None:
+                if current is None:
+                    self._versions[name] = self._create_default(name)
+                return self._versions[name]
+
+            fingerprint = self._fingerprint(path)
+            if current is not None and current.path == path and current.fingerprint == fingerprint:
+                return current
+
+            try:
+                new_version = self._load(name, path, fingerprint, current)
+            except Exception as e:
+                logger.warning(f"尝试从 {path} 加载模型失败: {str(e)}")
+                if current is None:
+                    self._versions[name] = self._create_default(name)
+                return self._versions[name]
+
+            # 引用赋值是原子的，正在处理的请求继续持有旧版本
+            self._versions[name] = new_version
+            if current is not None:
+                logger.info(f"模型已热更新: {current.tag} (v{current.version}) -> {new_version.tag} (v{new_version.version})")
+            return new_version
+
+    def reload(self, name: str = "football_model") -> ModelVersion:
+        """强制立即检查模型文件"""
+        self._last_checked.pop(name, None)
+        return self.get(name)
+
+    def versions(self):
+        """返回所有已加载模型的版本信息"""
+        return {name: version.to_dict() for name, version in self._versions.items()}
@@ -0,0 +1,210 @@
+import time
+import threading
+import numpy as np
+from sqlalchemy import select
+
+from app.data.database import TeamStats, SessionLocal
+from app.data.stats_generation import stats_generation
+from app.data.competitions import normalize_competition
+from app.utils.team_index import team_index
+from app.core.config import settings
+from app.core.logging import logger
+
+class CompetitionMatrix:
+    """单个联赛所有球队两两对阵的预测矩阵，主队为行、客队为列"""
+
+    def __init__(self, competition, team_ids, home_features, away_features, labels, proba, classes):
+        self.competition = competition
+        self.team_ids = team_ids
+        self.position = {team_id: i for i, team_id in enumerate(team_ids)}
+        # home_features: (N, 2) 主场场均进球、主场胜率；away_features: (N, 2) 客场场均进球、客场胜率
+        self.home_features = home_features
+        self.away_features = away_features
+        # labels: (N, N) 预测标签；proba: (N, N, 类别数) 概率，模型不支持概率时为 None
+        self.labels = labels
+        self.proba = proba
+        self.classes_ = classes
+
+    def __len__(self):
+        return len(self.team_ids)
+
+    def lookup(self, home_id, away_id):
+        """返回 (预测标签, 概率行, 主队统计, 客队统计)，球队不在本联赛时返回 None"""
+        i = self.position.get(home_id)
+        j = self.position.get(away_id)
+        if i is None or j is None or i == j:
+            return None
+        home_stats = {'avg_goals': self.home_features[i, 0], 'win_rate': self.home_features[i, 1]}
+        away_stats = {'avg_goals': self.away_features[j, 0], 'win_rate': self.away_features[j, 1]}
+        return self.labels[i, j], self.proba[i, j] if self.proba is not None else None, home_stats, away_stats
+
+    def to_dict(self):
+        """以 球队ID -> 球队ID -> 各结果概率 的形式导出，供积分榜模拟等功能使用"""
+        matrix = {}
+        for i, home_id in enumerate(self.team_ids):
+            row = {}
+            for j, away_id in enumerate(self.team_ids):
+                if i == j:
+                    continue
+                if self.proba is not None:
+                    row[away_id] = {str(label): float(p) for label, p in zip(self.classes_, self.proba[i, j])}
+                else:
+                    row[away_id] = {str(self.labels[i, j]): 1.0}
+            matrix[home_id] = row
+        return matrix
+
+class PairMatrixStore:
+    """按联赛保存全部对阵的预测矩阵
+
+    统计数据、球队索引或模型版本变化后在后台整体重建，所有联赛的全部对阵只做一次模型调用；
+    重建完成前查询返回 None，调用方回退到逐场预测。
+    """
+
+    def __init__(self, score_fn, registry, max_teams: int = None):
+        # score_fn(model_version, features) -> (labels, proba)
+        self.score_fn = score_fn
+        self.registry = registry
+        self.max_teams = settings.PAIR_MATRIX_MAX_TEAMS if max_teams is None else max_teams
+        # (模型版本标识, 统计数据代数, 球队索引代数) 与对应的 {联赛: 矩阵}
+        self._key = None
+        self._matrices = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refreshing = False
+        self.built_at = None
+
+    def _current_key(self):
+        return (self.registry.get().tag, stats_generation.generation, team_index.generation)
+
+    def _load_stats(self, team_ids):
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(TeamStats).where(TeamStats.team_id.in_(team_ids))).scalars().all()
+            return {
+                stats.team_id: (stats.avg_goals_home, stats.win_rate_home, stats.avg_goals_away, stats.win_rate_away)
+                for stats in rows
+            }
+        finally:
+            db.close()
+
+    def _group_teams(self, index):
+        """按联赛代码分组球队ID，跳过没有联赛信息或球队过多的分组
+
+        不同数据源记录的联赛标识不同(联赛代码或 API Football 的联赛ID)，统一为联赛代码后分组。
+        """
+        groups = {}
+        for team in index.teams:
+            competition = normalize_competition(team.league)
+            if competition:
+                groups.setdefault(competition, []).append(team.id)
+        for competition, team_ids in list(groups.items()):
+            if len(team_ids) < 2 or len(team_ids) > self.max_teams:
+                if len(team_ids) > self.max_teams:
+                    logger.warning(f"联赛 {competition} 球队数 {len(team_ids)} 超过上限 {self.max_teams}，不构建对阵矩阵")
+                del groups[competition]
+        return groups
+
+    def _build(self):
+        start = time.perf_counter()
+        model_version = self.registry.get()
+        key = (model_version.tag, stats_generation.generation, team_index.generation)
+        groups = self._group_teams(team_index.get())
+        if not groups:
+            return key, {}
+
+        stats_map = self._load_stats([team_id for team_ids in groups.values() for team_id in team_ids])
+        missing = (0.0, 0.0, 0.0, 0.0)
+
+        # 拼接所有联赛的全部有序对阵(含对角线，查询时忽略)，只调用一次模型
+        blocks = []
+        prepared = []
+        for competition, team_ids in groups.items():
+            values = np.array([stats_map.get(team_id, missing) for team_id in team_ids], dtype=float)
+            home_features = values[:, :2]
+            away_features = values[:, 2:]
+            n = len(team_ids)
+            blocks.append(np.column_stack([
+                np.repeat(home_features[:, 0], n),
+                np.tile(away_features[:, 0], n),
+                np.repeat(home_features[:, 1], n)
+            ]))
+            prepared.append((competition, team_ids, home_features, away_features))
+
+        labels, proba = self.score_fn(model_version, np.concatenate(blocks))
+
+        matrices = {}
+        offset = 0
+        for competition, team_ids, home_features, away_features in prepared:
+            n = len(team_ids)
+            block = slice(offset, offset + n * n)
+            matrices[competition] = CompetitionMatrix(
+                competition, team_ids, home_features, away_features,
+                labels[block].reshape(n, n),
+                proba[block].reshape(n, n, -1) if proba is not None else None,
+                model_version.model.classes_
+            )
+            offset += n * n
+
+        logger.info(
+            f"构建对阵预测矩阵: {len(matrices)} 个联赛, {offset} 组对阵, "
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms (模型 {model_version.tag})"
+        )
+        return key, matrices
+
+    def _rebuild(self):
+        with self._build_lock:
+            try:
+                key, matrices = self._build()
+                # 先替换矩阵再替换版本键，查询方看到新键时矩阵一定已是新的
+                self._matrices = matrices
+                self._key = key
+                self.built_at = time.time()
+            except Exception as e:
+                logger.error(f"构建对阵预测矩阵失败: {str(e)}")
+
+    def _refresh(self):
+        try:
+            self._rebuild()
+        finally:
+            self._refreshing = False
+
+    def refresh(self, wait: bool = False):
+        """重建所有联赛的对阵矩阵；wait=True 时在当前线程完成重建"""
+        if wait:
+            self._rebuild()
+            return
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="pair-matrix-refresh", daemon=True).start()
+
+    def get(self, competition, model_tag: str = None):
+        """获取联赛的对阵矩阵；矩阵已过期时触发后台重建并返回 None"""
+        key = self._current_key()
+        if model_tag is not None and key[0] != model_tag:
+            return None
+        if self._key != key:
+            self.refresh()
+            return None
+        return self._matrices.get(normalize_competition(competition))
+
+    def lookup(self, home_team, away_team, model_tag: str = None):
+        """两队属于同一联赛时直接读取矩阵中的预测结果"""
+        competition = normalize_competition(home_team.league)
+        if not competition or competition != normalize_competition(away_team.league):
+            return None
+        matrix = self.get(competition, model_tag)
+        if matrix is None:
+            return None
+        return matrix.lookup(home_team.id, away_team.id)
+
+    def get_stats(self):
+        return {
+            'competitions': len(self._matrices),
+            'pairs': sum(len(m) * (len(m) - 1) for m in self._matrices.values()),
+            'model_version': self._key[0] if self._key else None,
+            'stale': self._key != self._current_key(),
+            'built_at': self.built_at
+        }
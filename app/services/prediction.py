@@ -1,13 +1,21 @@
-import joblib
 import os
+import datetime
+import hashlib
 import numpy as np
 import pickle
-from sqlalchemy import select
+from sqlalchemy import select, delete, insert
 from sqlalchemy.orm import Session
 from sklearn.ensemble import RandomForestClassifier
 
-from app.data.database import Team, TeamStats
+from app.data.database import Team, TeamStats, Match, Prediction
 from app.utils.team_matching import get_team_matcher
+from app.utils.team_index import get_team_index
+from app.services.model_registry import ModelRegistry
+from app.services.batching import MicroBatcher
+from app.services.pair_matrix import PairMatrixStore
+from app.services.result_cache import PredictionCache
+from app.data.stats_generation import stats_generation
+from app.core.config import settings
 from app.core.logging import logger
 
 def create_default_model(save_path=None):
@@ -29,49 +37,69 @@ def create_default_model(save_path=None):
     
     return model
 
+def score_rows(model_version, features):
+    """对特征矩阵做一次模型调用，返回(预测标签, 概率矩阵)"""
+    model = model_version.model
+    evaluator = model_version.evaluator
+    # 优先使用编译后的树集成(与 predict_proba 逐位一致)，含缺失值时交给原模型
+    if evaluator is not None and not np.isnan(features).any():
+        proba = evaluator.predict_proba(features)
+        return evaluator.classes_.take(np.argmax(proba, axis=1), axis=0), proba
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(features)
+        # 标签由概率推出，与 RandomForest.predict 的结果一致，无需再调用一次模型
+        labels = model.classes_.take(np.argmax(proba, axis=1), axis=0)
+        return labels, proba
+    return model.predict(features), None
+
+# 模型文件候选路径
+MODEL_SEARCH_PATHS = {
+    "football_model": [
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models", "football_model.pkl"),
+        "models/football_model.pkl",
+        "/opt/render/project/src/models/football_model.pkl"
+    ]
+}
+
+# 进程级模型注册表，所有请求共享
+model_registry = ModelRegistry(MODEL_SEARCH_PATHS, default_factory=create_default_model)
+
+def get_model_registry():
+    return model_registry
+
+# 推理微批处理(可选)，合并并发的单场预测请求
+micro_batcher = MicroBatcher(
+    score_rows,
+    window_ms=settings.PREDICT_MICROBATCH_WINDOW_MS,
+    max_batch_size=settings.PREDICT_MICROBATCH_MAX_SIZE
+) if settings.PREDICT_MICROBATCH_ENABLED else None
+
+def get_micro_batcher():
+    return micro_batcher
+
+# 按联赛预先计算的全部对阵预测矩阵，同联赛两队的预测直接查表
+pair_matrices = PairMatrixStore(score_rows, model_registry)
+
+def get_pair_matrices():
+    return pair_matrices
+
+# 进程级预测结果缓存
+prediction_cache = PredictionCache(
+    maxsize=settings.PREDICTION_CACHE_MAXSIZE,
+    ttl=settings.PREDICTION_CACHE_TTL
+)
+
+def get_prediction_cache():
+    return prediction_cache
+
 class PredictionService:
     def __init__(self, db: Session):
         self.db = db
-        self.model = self._load_model()
+        # 请求开始时固定模型版本，热更新不影响正在处理的请求
+        self.model_version = model_registry.get()
+        self.model = self.model_version.model
         self.team_matcher = get_team_matcher(db)
         
-    def _load_model(self):
-        """加载预测模型，尝试多个路径，如果失败则创建默认模型"""
-        # 尝试多个可能的路径
-        possible_paths = [
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models", "football_model.pkl"),
-            "models/football_model.pkl",
-            "/opt/render/project/src/models/football_model.pkl"
-        ]
-        
-        for path in possible_paths:
-            try:
-                if os.path.exists(path):
-                    logger.info(f"找到模型文件: {path}")
-                    model = joblib.load(path)
-                    logger.info("✅ 模型加载成功")
-                    return model
-            except Exception as e:
-                logger.warning(f"尝试从 {path} 加载模型失败: {str(e)}")
-        
-        # 如果所有路径都失败，记录目录信息
-        curr_dir = os.getcwd()
-        logger.error(f"无法找到模型文件，当前工作目录: {curr_dir}")
-        
-        try:
-            logger.error(f"目录内容: {os.listdir(curr_dir)}")
-            if os.path.exists('models'):
-                logger.error(f"models目录内容: {os.listdir('models')}")
-            else:
-                logger.error("models目录不存在!")
-        except Exception as e:
-            logger.error(f"列出目录内容时出错: {str(e)}")
-        
-        # 创建并返回默认模型
-        logger.warning("创建默认预测模型作为备选方案")
-        default_model_path = os.path.join(curr_dir, "models", "football_model.pkl")
-        return create_default_model(default_model_path)
-            
     def get_team_stats(self, team_id: int, is_home: bool):
         """获取球队统计数据"""
         try:
@@ -104,60 +132,58 @@ class PredictionService:
                 'win_rate': 0.0
             }
             
-    def predict_match(self, home_team_name: str, away_team_name: str):
-        """预测比赛结果"""
-        if not self.model:
-            logger.error("预测模型未加载")
-            raise ValueError("预测模型未加载，无法进行预测")
-            
-        logger.info(f"收到预测请求: 主队={home_team_name}, 客队={away_team_name}")
-        
-        # 匹配球队 - 先尝试直接匹配
-        home_team = self.team_matcher.match_team(home_team_name)
-        away_team = self.team_matcher.match_team(away_team_name)
-        
-        # 如果直接匹配失败，尝试使用数据库搜索
-        if not home_team:
-            logger.warning(f"常规匹配未找到主队，尝试数据库搜索: {home_team_name}")
-            search_results = self.team_matcher.search_in_db(home_team_name)
-            if search_results and len(search_results) > 0:
-                home_team = search_results[0]
-                logger.info(f"数据库搜索找到主队: {home_team_name} -> {home_team.name}")
+    def get_stats_map(self, team_ids):
+        """一次查询获取多支球队的统计数据"""
+        team_ids = list(set(team_ids))
+        if not team_ids:
+            return {}
+        try:
+            rows = self.db.execute(
+                select(TeamStats).where(TeamStats.team_id.in_(team_ids))
+            ).scalars().all()
+            return {stats.team_id: stats for stats in rows}
+        except Exception as e:
+            logger.error(f"批量获取球队统计数据失败: {str(e)}")
+            return {}
+
+    def _stats_features(self, stats, is_home: bool):
+        """将统计记录转换为特征字典"""
+        if not stats:
+            return {
+                'avg_goals': 0.0,
+                'win_rate': 0.0
+            }
+        if is_home:
+            return {
+                'avg_goals': stats.avg_goals_home,
+                'win_rate': stats.win_rate_home
+            }
+        return {
+            'avg_goals': stats.avg_goals_away,
+            'win_rate': stats.win_rate_away
+        }
+
+    def resolve_team(self, team_name: str, role: str = "球队"):
+        """匹配球队名称，先尝试常规匹配，失败后使用数据库搜索"""
+        team = self.team_matcher.match_team(team_name)
         
-        if not away_team:
-            logger.warning(f"常规匹配未找到客队，尝试数据库搜索: {away_team_name}")
-            search_results = self.team_matcher.search_in_db(away_team_name)
+        if not team:
+            logger.warning(f"常规匹配未找到{role}，尝试数据库搜索: {team_name}")
+            search_results = self.team_matcher.search_in_db(team_name)
             if search_results and len(search_results) > 0:
-                away_team = search_results[0]
-                logger.info(f"数据库搜索找到客队: {away_team_name} -> {away_team.name}")
+                team = search_results[0]
+                logger.info(f"数据库搜索找到{role}: {team_name} -> {team.name}")
         
-        if not home_team:
-            raise ValueError(f"未找到主队: {home_team_name}")
-        if not away_team:
-            raise ValueError(f"未找到客队: {away_team_name}")
-            
-        # 获取统计数据
-        home_stats = self.get_team_stats(home_team.id, True)
-        away_stats = self.get_team_stats(away_team.id, False)
-        
-        # 准备模型输入
-        features = np.array([[
-            home_stats['avg_goals'],
-            away_stats['avg_goals'],
-            home_stats['win_rate']
-        ]])
-        
-        # 预测
-        prediction = self.model.predict(features)[0]
-        
-        # 准备概率(如果模型支持)
-        probabilities = {}
-        if hasattr(self.model, 'predict_proba'):
-            proba = self.model.predict_proba(features)[0]
-            class_labels = self.model.classes_
-            probabilities = {str(label): float(prob) for label, prob in zip(class_labels, proba)}
-        
-        # 构建结果
+        if not team:
+            raise ValueError(f"未找到{role}: {team_name}")
+        return team
+
+    def _score(self, features):
+        """对特征矩阵做一次模型调用，返回(预测标签, 概率矩阵)"""
+        return score_rows(self.model_version, features)
+
+    def _build_result(self, home_team, away_team, home_stats, away_stats, prediction, proba=None):
+        """构建单场比赛的预测结果"""
         result = {
             "prediction": str(prediction),
             "features": {
@@ -170,12 +196,322 @@ class PredictionService:
             }
         }
         
-        if probabilities:
-            result["probabilities"] = probabilities
+        # 准备概率(如果模型支持)
+        if proba is not None:
+            class_labels = self.model.classes_
+            result["probabilities"] = {str(label): float(prob) for label, prob in zip(class_labels, proba)}
+        result["model_version"] = self.model_version.tag
+        return result
             
-        logger.info(f"预测结果: {home_team.name} vs {away_team.name} -> {prediction}")
+    def _resolve_match(self, home_team_name: str, away_team_name: str, home_team_id: int = None, away_team_id: int = None):
+        """匹配单场比赛的主客队，提供球队ID时直接按ID查找，不做名称匹配"""
+        if not self.model:
+            logger.error("预测模型未加载")
+            raise ValueError("预测模型未加载，无法进行预测")
+            
+        logger.info(
+            f"收到预测请求: 主队={home_team_name if home_team_id is None else f'ID {home_team_id}'}, "
+            f"客队={away_team_name if away_team_id is None else f'ID {away_team_id}'}"
+        )
+        
+        # 匹配球队
+        if home_team_id is not None:
+            home_team = self.get_team(home_team_id, "主队")
+        else:
+            home_team = self.resolve_team(home_team_name, "主队")
+        if away_team_id is not None:
+            away_team = self.get_team(away_team_id, "客队")
+        else:
+            away_team = self.resolve_team(away_team_name, "客队")
+        return home_team, away_team
+
+    def _prepare_match(self, home_team, away_team):
+        """准备单场比赛的模型输入"""
+        # 获取统计数据
+        home_stats = self.get_team_stats(home_team.id, True)
+        away_stats = self.get_team_stats(away_team.id, False)
+        
+        # 准备模型输入
+        row = [
+            home_stats['avg_goals'],
+            away_stats['avg_goals'],
+            home_stats['win_rate']
+        ]
+        return home_stats, away_stats, row
+
+    def _lookup_matrix(self, home_team, away_team):
+        """同一联赛的两队直接读取对阵矩阵，矩阵不可用时返回 None"""
+        hit = pair_matrices.lookup(home_team, away_team, self.model_version.tag)
+        if hit is None:
+            return None
+        prediction, proba, home_stats, away_stats = hit
+        return self._build_result(home_team, away_team, home_stats, away_stats, prediction, proba)
+            
+    def _cache_key(self, home_team, away_team):
+        return PredictionCache.make_key(
+            home_team.id, away_team.id, stats_generation.token, get_team_index().version, self.model_version.tag
+        )
+            
+    def get_team(self, team_id: int, role: str = "球队"):
+        """按球队ID获取球队，不经过名称匹配"""
+        team = self.team_matcher.index.get(team_id) or self.db.get(Team, team_id)
+        if not team:
+            raise ValueError(f"未找到{role}: ID {team_id}")
+        return team
+
+    def _predict_teams_cached(self, home_team, away_team):
+        """预测已匹配的两队：依次查结果缓存、对阵矩阵，最后调用模型"""
+        cache_key = self._cache_key(home_team, away_team)
+        result = prediction_cache.get(cache_key)
+        if result is None:
+            result = self._lookup_matrix(home_team, away_team)
+            if result is None:
+                home_stats, away_stats, row = self._prepare_match(home_team, away_team)
+                
+                # 预测
+                labels, proba = self._score(np.array([row], dtype=float))
+                result = self._build_result(
+                    home_team, away_team, home_stats, away_stats, labels[0],
+                    proba[0] if proba is not None else None
+                )
+            prediction_cache.set(cache_key, result)
+            
+        logger.info(f"预测结果: {home_team.name} vs {away_team.name} -> {result['prediction']}")
+        return result
+            
+    def predict_match(self, home_team_name: str = None, away_team_name: str = None, home_team_id: int = None, away_team_id: int = None):
+        """预测比赛结果，球队可以用名称或ID指定"""
+        home_team, away_team = self._resolve_match(home_team_name, away_team_name, home_team_id, away_team_id)
+        return self._predict_teams_cached(home_team, away_team)
+
+    def predict_match_by_ids(self, home_team_id: int, away_team_id: int):
+        """按球队ID预测比赛结果"""
+        return self.predict_match(home_team_id=home_team_id, away_team_id=away_team_id)
+
+    async def predict_match_async(self, home_team_name: str = None, away_team_name: str = None, home_team_id: int = None, away_team_id: int = None):
+        """预测比赛结果；启用微批处理时与其他并发请求合并为一次模型调用"""
+        if micro_batcher is None:
+            return self.predict_match(home_team_name, away_team_name, home_team_id, away_team_id)
+            
+        home_team, away_team = self._resolve_match(home_team_name, away_team_name, home_team_id, away_team_id)
+        
+        cache_key = self._cache_key(home_team, away_team)
+        result = prediction_cache.get(cache_key)
+        if result is None:
+            result = self._lookup_matrix(home_team, away_team)
+            if result is None:
+                home_stats, away_stats, row = self._prepare_match(home_team, away_team)
+                # 等待合并批次之前归还数据库连接：并发请求数超过连接池大小时，
+                # 持有连接等待的请求会让其他请求在事件循环线程里阻塞在连接池上
+                self.db.close()
+                prediction, proba = await micro_batcher.submit(self.model_version, row)
+                result = self._build_result(home_team, away_team, home_stats, away_stats, prediction, proba)
+            prediction_cache.set(cache_key, result)
+        
+        logger.info(f"预测结果: {home_team.name} vs {away_team.name} -> {result['prediction']}")
         return result
 
+    def predict_batch(self, fixtures):
+        """批量预测多场比赛：统一匹配球队、一次查询统计数据、一次模型调用
+
+        fixtures 为 (主队, 客队) 列表，球队可以是名称或球队ID(整数，跳过名称匹配)。
+        返回与输入顺序一致的结果列表，单场比赛出错时在对应位置返回 error，不影响其他比赛。
+        """
+        if not self.model:
+            logger.error("预测模型未加载")
+            raise ValueError("预测模型未加载，无法进行预测")
+            
+        logger.info(f"收到批量预测请求: {len(fixtures)} 场比赛")
+        
+        # 1. 每个不同的名称只匹配一次，球队ID直接查找
+        resolved = {}
+        errors = {}
+        for home_name, away_name in fixtures:
+            for name, role in ((home_name, "主队"), (away_name, "客队")):
+                if name in resolved or name in errors:
+                    continue
+                try:
+                    if isinstance(name, int):
+                        resolved[name] = self.get_team(name, role)
+                    else:
+                        resolved[name] = self.resolve_team(name, role)
+                except Exception as e:
+                    errors[name] = str(e)
+        
+        # 2. 对匹配成功的比赛统一预测
+        results = [None] * len(fixtures)
+        pairs = []
+        positions = []
+        for i, (home_name, away_name) in enumerate(fixtures):
+            home_team = resolved.get(home_name)
+            away_team = resolved.get(away_name)
+            if not home_team or not away_team:
+                error = errors.get(home_name) if not home_team else errors.get(away_name)
+                results[i] = {"home_team": home_name, "away_team": away_name, "error": error}
+                continue
+            pairs.append((home_team, away_team))
+            positions.append(i)
+        
+        for i, result in zip(positions, self.predict_teams(pairs)):
+            results[i] = result
+        
+        logger.info(f"批量预测完成: {len(pairs)}/{len(fixtures)} 场成功")
+        return results
+
+    def predict_teams(self, pairs):
+        """对已匹配的 (主队, 客队) 列表做批量预测：一次查询统计数据、一次模型调用"""
+        if not pairs:
+            return []
+        
+        # 一次查询获取所有统计数据
+        stats_map = self.get_stats_map(
+            [home_team.id for home_team, _ in pairs] + [away_team.id for _, away_team in pairs]
+        )
+        
+        # 构建特征矩阵
+        rows = []
+        prepared = []
+        for home_team, away_team in pairs:
+            home_stats = self._stats_features(stats_map.get(home_team.id), True)
+            away_stats = self._stats_features(stats_map.get(away_team.id), False)
+            rows.append([home_stats['avg_goals'], away_stats['avg_goals'], home_stats['win_rate']])
+            prepared.append((home_team, away_team, home_stats, away_stats))
+        
+        # 一次模型调用
+        try:
+            labels, proba = self._score(np.array(rows, dtype=float))
+        except Exception as e:
+            logger.error(f"批量预测失败: {str(e)}")
+            return [
+                {"home_team": home_team.name, "away_team": away_team.name, "error": f"预测失败: {str(e)}"}
+                for home_team, away_team in pairs
+            ]
+        
+        return [
+            self._build_result(
+                home_team, away_team, home_stats, away_stats, labels[j],
+                proba[j] if proba is not None else None
+            )
+            for j, (home_team, away_team, home_stats, away_stats) in enumerate(prepared)
+        ]
+
 # 创建预测服务实例
 def get_prediction_service(db: Session):
-    return PredictionService(db)
\ No newline at end of file
+    return PredictionService(db)
+
+def prediction_etag(home_team_id: int, away_team_id: int, model_tag: str = None):
+    """由球队ID、统计数据版本、球队索引版本和模型版本生成强 ETag，都不变时预测结果不变"""
+    model_tag = model_tag or model_registry.get().tag
+    raw = f"{home_team_id}:{away_team_id}:{stats_generation.token}:{get_team_index().version}:{model_tag}"
+    return '"' + hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20] + '"'
+
+# 需要预先计算预测的赛程状态
+UPCOMING_STATUSES = ('SCHEDULED', 'TIMED')
+
+def precompute_upcoming_predictions(db: Session):
+    """对所有未开始的比赛做一次批量预测，按比赛ID和模型版本写入 predictions 表"""
+    try:
+        now = datetime.datetime.utcnow()
+        matches = db.execute(
+            select(Match).where(
+                Match.status.in_(UPCOMING_STATUSES),
+                Match.date >= now,
+                Match.home_team_id.isnot(None),
+                Match.away_team_id.isnot(None)
+            )
+        ).scalars().all()
+        
+        if not matches:
+            logger.info("没有需要预测的未来比赛")
+            return 0
+        
+        service = get_prediction_service(db)
+        index = service.team_matcher.index
+        
+        scheduled = []
+        pairs = []
+        for match in matches:
+            home_team = index.get(match.home_team_id)
+            away_team = index.get(match.away_team_id)
+            if home_team and away_team:
+                scheduled.append(match)
+                pairs.append((home_team, away_team))
+        
+        results = service.predict_teams(pairs)
+        model_version = service.model_version.tag
+        
+        rows = []
+        for match, result in zip(scheduled, results):
+            if 'error' in result:
+                continue
+            rows.append({
+                'match_id': match.match_id,
+                'model_version': model_version,
+                'home_team_id': match.home_team_id,
+                'away_team_id': match.away_team_id,
+                'home_team': result['features']['home_team'],
+                'away_team': result['features']['away_team'],
+                'competition': match.competition,
+                'match_date': match.date,
+                'prediction': result['prediction'],
+                'probabilities': result.get('probabilities'),
+                'features': result['features'],
+                'created_at': now
+            })
+        
+        # 同一模型版本的旧结果整体替换
+        if rows:
+            db.execute(
+                delete(Prediction).where(
+                    Prediction.model_version == model_version,
+                    Prediction.match_id.in_([row['match_id'] for row in rows])
+                )
+            )
+            db.execute(insert(Prediction), rows)
+        db.commit()
+        
+        logger.info(f"预先计算了 {len(rows)}/{len(matches)} 场未来比赛的预测 (模型 {model_version})")
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"预先计算比赛预测时出错: {str(e)}")
+        return 0
+
+def prediction_to_dict(prediction: Prediction):
+    """将存储的预测记录转换为接口返回格式"""
+    return {
+        "match_id": prediction.match_id,
+        "date": prediction.match_date.isoformat() if prediction.match_date else None,
+        "competition": prediction.competition,
+        "home_team_id": prediction.home_team_id,
+        "away_team_id": prediction.away_team_id,
+        "home_team": prediction.home_team,
+        "away_team": prediction.away_team,
+        "prediction": prediction.prediction,
+        "probabilities": prediction.probabilities,
+        "features": prediction.features,
+        "model_version": prediction.model_version
+    }
+
+def get_stored_predictions(db: Session, days: int = 7, competition: str = None):
+    """读取当前模型版本下未来若干天的预先计算结果"""
+    now = datetime.datetime.utcnow()
+    stmt = select(Prediction).where(
+        Prediction.model_version == model_registry.get().tag,
+        Prediction.match_date >= now,
+        Prediction.match_date <= now + datetime.timedelta(days=days)
+    )
+    if competition:
+        stmt = stmt.where(Prediction.competition == competition)
+    stmt = stmt.order_by(Prediction.match_date)
+    return [prediction_to_dict(p) for p in db.execute(stmt).scalars().all()]
+
+def get_stored_prediction(db: Session, match_id: str):
+    """按比赛ID读取当前模型版本的预先计算结果"""
+    prediction = db.execute(
+        select(Prediction).where(
+            Prediction.match_id == match_id,
+            Prediction.model_version == model_registry.get().tag
+        )
+    ).scalar_one_or_none()
+    return prediction_to_dict(prediction) if prediction else None
\ No newline at end of file
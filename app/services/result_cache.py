@@ -0,0 +1,72 @@
+import copy
+import threading
+from cachetools import TTLCache
+
+class _CountingTTLCache(TTLCache):
+    """记录容量淘汰和过期清理次数的 TTLCache"""
+
+    def __init__(self, maxsize, ttl, owner):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._owner = owner
+
+    def popitem(self):
+        # 容量已满时由 TTLCache 调用，淘汰最近最少使用的条目
+        item = super().popitem()
+        self._owner.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._owner.expirations += len(expired)
+        return expired
+
+class PredictionCache:
+    """预测结果缓存，按 (主队ID, 客队ID, 统计数据版本, 球队索引版本, 模型版本) 存储最终结果
+
+    统计数据更新(包括其他进程的同步)、球队改名或别名变化、模型重新加载后键自然变化，旧条目不会再被命中，随 LRU/TTL 淘汰。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._cache = _CountingTTLCache(maxsize, ttl, self)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(home_team_id, away_team_id, stats_token, index_version, model_tag):
+        return (home_team_id, away_team_id, stats_token, index_version, model_tag)
+
+    def get(self, key):
+        """命中时返回结果的副本，未命中返回 None"""
+        with self._lock:
+            result = self._cache.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(result)
+
+    def set(self, key, result):
+        with self._lock:
+            self._cache[key] = copy.deepcopy(result)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / requests, 4) if requests else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
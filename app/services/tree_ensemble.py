@@ -0,0 +1,124 @@
+import numpy as np
+
+from app.core.logging import logger
+
+# 支持编译的树集成模型(按类名判断，避免导入 sklearn 私有模块)
+SUPPORTED_ENSEMBLES = ('RandomForestClassifier', 'ExtraTreesClassifier')
+
+class CompiledTreeEnsemble:
+    """将已训练的随机森林展开为连续的 numpy 数组，对整批样本同时遍历所有树
+
+    结果与 sklearn 的 predict_proba 逐位一致：输入同样转换为 float32，
+    叶子概率与原模型相同，并按树的顺序依次累加后取平均。
+    不处理缺失值(NaN)，含缺失值的输入应交给原模型。
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_values, roots, max_depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features = n_features
+        self.n_trees = len(roots)
+
+    def apply(self, X):
+        """返回每棵树中每个样本所在的叶子节点，形状 (n_trees, n_samples)"""
+        n_samples = X.shape[0]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+        rows = np.arange(n_samples)[np.newaxis, :]
+        # 叶子节点的左右子节点都指向自己，遍历 max_depth 层后所有样本都停在叶子上
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"特征数量不匹配: 期望 {self.n_features}, 实际 {X.shape[-1]}")
+
+        leaf_proba = self.leaf_values[self.apply(X)]
+        # 按树的顺序依次累加，保证浮点结果与 sklearn 完全一致
+        proba = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for tree_proba in leaf_proba:
+            proba += tree_proba
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def _probe_samples(compiled, n_samples: int = 256):
+    """根据各特征的分裂阈值生成校验样本，覆盖阈值两侧和阈值本身"""
+    rng = np.random.default_rng(0)
+    columns = []
+    for j in range(compiled.n_features):
+        thresholds = compiled.threshold[(compiled.feature == j) & np.isfinite(compiled.threshold)]
+        if len(thresholds) == 0:
+            thresholds = np.zeros(1)
+        low, high = thresholds.min() - 1.0, thresholds.max() + 1.0
+        column = rng.uniform(low, high, n_samples)
+        column[:min(len(thresholds), n_samples // 4)] = rng.choice(thresholds, min(len(thresholds), n_samples // 4))
+        columns.append(column)
+    return np.column_stack(columns)
+
+def compile_tree_ensemble(model):
+    """把支持的树集成模型编译为 CompiledTreeEnsemble，不支持或校验失败时返回 None"""
+    if type(model).__name__ not in SUPPORTED_ENSEMBLES:
+        return None
+    if getattr(model, 'n_outputs_', 1) != 1 or not getattr(model, 'estimators_', None):
+        return None
+
+    n_classes = len(model.classes_)
+    features, thresholds, lefts, rights, raw_values, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.intp))
+        rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.intp))
+        raw_values.append(tree.value[:, 0, :n_classes].astype(np.float64))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    arrays = dict(
+        feature=np.ascontiguousarray(np.concatenate(features)),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+        left=np.ascontiguousarray(np.concatenate(lefts)),
+        right=np.ascontiguousarray(np.concatenate(rights)),
+        roots=np.array(roots, dtype=np.intp),
+        max_depth=max_depth,
+        classes=model.classes_,
+        n_features=model.n_features_in_
+    )
+
+    # 新版 sklearn 的 tree_.value 已是类别比例，直接使用；
+    # 旧版存储样本计数，predict_proba 中会再按行归一化。两种方式都试，取与原模型逐位一致的一种
+    for normalize in (False, True):
+        values = []
+        for value in raw_values:
+            if normalize:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+        compiled = CompiledTreeEnsemble(leaf_values=np.ascontiguousarray(np.concatenate(values)), **arrays)
+
+        probe = _probe_samples(compiled)
+        if np.array_equal(compiled.predict_proba(probe), model.predict_proba(probe)):
+            logger.info(f"已编译树集成模型: {compiled.n_trees} 棵树, {offset} 个节点, 最大深度 {max_depth}")
+            return compiled
+
+    logger.warning("编译后的树集成模型与原模型结果不一致，继续使用原模型")
+    return None
@@ -1,52 +1,42 @@
 from fuzzywuzzy import fuzz
 from sqlalchemy import select, or_
-import pandas as pd
 from sqlalchemy.orm import Session
-import json
 
 from app.data.database import Team
+from app.data.competitions import normalize_competition
+from app.utils.team_index import get_team_index, parse_aliases
+from app.utils.team_search import get_team_search_index
 from app.core.logging import logger
 
+# 批量解析时每个名称最多对多少个候选名称形式做模糊打分
+CANDIDATE_LIMIT = 20
+
 class TeamMatcher:
     def __init__(self, db: Session):
         self.db = db
         self.load_teams()
         
     def load_teams(self):
-        try:
-            # 从数据库加载所有球队
-            teams = self.db.execute(select(Team)).scalars().all()
-            self.teams = teams
-            logger.info(f"加载了 {len(teams)} 支球队信息")
-        except Exception as e:
-            logger.error(f"从数据库加载球队信息失败: {str(e)}")
-            self.teams = []
+        # 使用进程级共享的球队索引，不再每个请求都查询整张表
+        self.index = get_team_index()
+        self.teams = self.index.teams
     
     def _get_aliases_list(self, aliases_data):
         """将别名数据转换为列表，无论其原始格式如何"""
-        if not aliases_data:
-            return []
-            
-        if isinstance(aliases_data, list):
-            return aliases_data
+        return parse_aliases(aliases_data)
             
-        if isinstance(aliases_data, str):
-            # 尝试解析JSON
-            try:
-                parsed = json.loads(aliases_data)
-                if isinstance(parsed, list):
-                    return parsed
-                return [aliases_data]  # 如果不是列表，就当作单一字符串
-            except json.JSONDecodeError:
-                # 不是JSON，尝试按顿号分割
-                return aliases_data.split('、')
-                
-        # 其他情况，尝试转换为字符串后按顿号分割
-        try:
-            return str(aliases_data).split('、')
-        except:
-            logger.warning(f"无法处理的别名格式: {type(aliases_data)} - {aliases_data}")
-            return []
+    def match_exact(self, query_name: str):
+        """只在共享索引中精确查找(名称、中文名、别名、正式名称)，不访问数据库也不做模糊匹配"""
+        query_name = query_name.strip()
+        team = (
+            self.index.by_name.get(query_name.lower())
+            or self.index.by_zh_name.get(query_name)
+            or self.index.by_alias.get(query_name)
+        )
+        if team:
+            return team
+        team_id = self.index.name_to_id.get(query_name.lower())
+        return self.index.get(team_id) if team_id is not None else None
             
     def match_team(self, query_name: str, threshold: int = 65):
         """根据查询名称匹配最佳球队"""
@@ -57,25 +47,21 @@ class TeamMatcher:
         
         logger.debug(f"尝试匹配球队名称: {query_name}")
         
-        # 首先尝试精确匹配
-        for team in self.teams:
-            # 检查名称匹配 (英文用小写比较)
-            if team.name and team.name.lower() == query_name_lower:
-                logger.info(f"精确匹配到球队名称: {query_name} -> {team.name}")
-                return team
-                
-            # 检查中文名匹配 (中文直接比较，不转小写)
-            if team.zh_name and (team.zh_name == query_name):
-                logger.info(f"精确匹配到中文名称: {query_name} -> {team.name} (中文名: {team.zh_name})")
-                return team
-                
-            # 检查别名匹配
-            if team.aliases:
-                aliases_list = self._get_aliases_list(team.aliases)
-                for alias in aliases_list:
-                    if isinstance(alias, str) and (alias == query_name):
-                        logger.info(f"精确匹配到别名: {query_name} -> {team.name} (别名: {alias})")
-                        return team
+        # 首先尝试精确匹配 (索引查找)
+        team = self.index.by_name.get(query_name_lower)
+        if team:
+            logger.info(f"精确匹配到球队名称: {query_name} -> {team.name}")
+            return team
+            
+        team = self.index.by_zh_name.get(query_name)
+        if team:
+            logger.info(f"精确匹配到中文名称: {query_name} -> {team.name} (中文名: {team.zh_name})")
+            return team
+            
+        team = self.index.by_alias.get(query_name)
+        if team:
+            logger.info(f"精确匹配到别名: {query_name} -> {team.name} (别名: {query_name})")
+            return team
         
         # 尝试退回到搜索API使用的数据库搜索方法
         logger.info(f"精确匹配失败，尝试数据库搜索: {original_query}")
@@ -98,8 +84,7 @@ class TeamMatcher:
                 name_forms.append(team.zh_name)
             if team.official_name:
                 name_forms.append(team.official_name)
-            if team.aliases:
-                name_forms.extend(self._get_aliases_list(team.aliases))
+            name_forms.extend(self.index.aliases(team))
                 
             # 计算每种形式的匹配分数
             for name in name_forms:
@@ -118,6 +103,75 @@ class TeamMatcher:
         logger.warning(f"未找到匹配球队: {query_name}")
         return None
         
+    def resolve_many(self, names, league: str = None, source: str = None, threshold: int = 65):
+        """批量解析球队名称，全部在内存索引中完成
+
+        先对整批名称做精确查找，剩余名称做包含匹配(与 search_in_db 语义相同)，
+        仍未匹配的名称用字符二元组倒排表取少量候选再做模糊打分，不与全部名称比较。
+        league/source 用于限定候选球队(league 可以是联赛代码、数据源联赛ID或名称)，限定后没有候选时忽略。
+        返回 {名称: (球队, 命中的名称形式(原始拼写), 得分, 匹配方式)}。
+        """
+        results = {}
+        leftovers = []
+        
+        # 1. 精确匹配
+        for name in dict.fromkeys(names):
+            query = name.strip() if isinstance(name, str) else ""
+            if not query:
+                results[name] = (None, None, 0, None)
+                continue
+            team = self.match_exact(query)
+            if team:
+                results[name] = (team, query, 100, "exact")
+            else:
+                leftovers.append(name)
+        
+        if not leftovers:
+            return results
+        
+        # 按提示限定候选球队，没有提示或限定后为空时不限定
+        candidate_ids = None
+        if league or source:
+            league = normalize_competition(league)
+            candidate_ids = {
+                team.id for team in self.teams
+                if (not league or normalize_competition(team.league) == league)
+                and (not source or team.source == source)
+            } or None
+        
+        # 2. 包含匹配
+        search_index = get_team_search_index(self.index)
+        remaining = []
+        for name in leftovers:
+            query = name.strip()
+            hits, _ = search_index.search(query, limit=1, team_ids=candidate_ids)
+            if hits:
+                team, form = hits[0]
+                results[name] = (team, form, fuzz.ratio(query.lower(), form.lower()), "search")
+            else:
+                remaining.append(name)
+        
+        # 3. 模糊匹配：只对二元组最相近的候选打分
+        for name in remaining:
+            query = name.strip().lower()
+            best_score = 0
+            best = None
+            for team_id, form, display_name in search_index.similar(query, CANDIDATE_LIMIT, candidate_ids):
+                score = fuzz.ratio(query, form)
+                if score > best_score and score >= threshold:
+                    best_score = score
+                    best = (team_id, display_name)
+            if best:
+                results[name] = (self.index.get(best[0]), best[1], best_score, "fuzzy")
+            else:
+                results[name] = (None, None, 0, None)
+        
+        logger.info(
+            f"批量解析球队名称: {len(results)} 个名称, 精确匹配 {len(results) - len(leftovers)}, "
+            f"模糊匹配 {len(remaining)}"
+        )
+        return results
+        
     def search_in_db(self, query_name: str):
         """直接在数据库中搜索"""
         try:
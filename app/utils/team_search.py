@@ -0,0 +1,150 @@
+import bisect
+import heapq
+import threading
+
+from app.core.logging import logger
+
+# 名称字段的排序优先级：名称 > 中文名 > 正式名称 > 别名
+FIELD_NAME, FIELD_ZH_NAME, FIELD_OFFICIAL_NAME, FIELD_ALIAS = range(4)
+
+# 匹配类型的排序优先级：完全相同 > 前缀 > 单词前缀 > 包含
+MATCH_EXACT, MATCH_PREFIX, MATCH_WORD_PREFIX, MATCH_INFIX = range(4)
+
+class TeamSearchIndex:
+    """球队自动补全索引，支持前缀和包含查询
+
+    所有名称形式转小写后排序保存，单字符的前缀查询用二分查找；
+    包含查询先用字符二元组倒排表求交集得到候选，再逐个确认。
+    """
+
+    def __init__(self, index):
+        self.index = index
+        # 名称形式(小写)、原始名称、球队ID、字段优先级
+        self.forms = []
+        self.form_names = []
+        self.form_team_ids = []
+        self.form_fields = []
+        self.grams = {}
+
+        for team in index.teams:
+            fields = [(team.name, FIELD_NAME), (team.zh_name, FIELD_ZH_NAME), (team.official_name, FIELD_OFFICIAL_NAME)]
+            fields.extend((alias, FIELD_ALIAS) for alias in index.aliases(team))
+            seen = set()
+            for name, field in fields:
+                if not name or not isinstance(name, str):
+                    continue
+                form = name.strip().lower()
+                if not form or form in seen:
+                    continue
+                seen.add(form)
+                position = len(self.forms)
+                self.forms.append(form)
+                self.form_names.append(name.strip())
+                self.form_team_ids.append(team.id)
+                self.form_fields.append(field)
+                for gram in self._grams(form):
+                    self.grams.setdefault(gram, set()).add(position)
+
+        self.sorted_forms = sorted((form, position) for position, form in enumerate(self.forms))
+        self.sorted_keys = [form for form, _ in self.sorted_forms]
+
+    def __len__(self):
+        return len(self.forms)
+
+    @staticmethod
+    def _grams(text: str):
+        if len(text) == 1:
+            return {text}
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def _prefix_positions(self, query: str):
+        start = bisect.bisect_left(self.sorted_keys, query)
+        end = bisect.bisect_left(self.sorted_keys, query + '\uffff')
+        return {position for _, position in self.sorted_forms[start:end]}
+
+    def _infix_positions(self, query: str):
+        postings = [self.grams.get(gram) for gram in self._grams(query)]
+        if not postings or any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return set()
+        return {position for position in candidates if query in self.forms[position]}
+
+    def similar(self, query: str, limit: int = 20, team_ids=None):
+        """按共有的字符二元组取最相近的若干名称形式，返回 [(球队ID, 名称形式(小写), 原始名称)]
+
+        只遍历查询中各二元组的倒排表，用 Dice 系数排序，供模糊匹配只对少量候选打分。
+        team_ids 不为空时只返回这些球队的名称形式。
+        """
+        query = query.strip().lower()
+        query_grams = self._grams(query) if query else set()
+        counts = {}
+        for gram in query_grams:
+            for position in self.grams.get(gram, ()):
+                counts[position] = counts.get(position, 0) + 1
+        if team_ids is not None:
+            counts = {p: c for p, c in counts.items() if self.form_team_ids[p] in team_ids}
+
+        def dice(position):
+            form_grams = max(len(self.forms[position]) - 1, 1)
+            return (2.0 * counts[position] / (len(query_grams) + form_grams), -position)
+
+        top = heapq.nlargest(limit, counts, key=dice)
+        return [(self.form_team_ids[p], self.forms[p], self.form_names[p]) for p in top]
+
+    def _match_type(self, form: str, query: str):
+        if form == query:
+            return MATCH_EXACT
+        if form.startswith(query):
+            return MATCH_PREFIX
+        if f" {query}" in form:
+            return MATCH_WORD_PREFIX
+        return MATCH_INFIX
+
+    def search(self, query: str, limit: int = 5, offset: int = 0, team_ids=None):
+        """返回 (排序后的 [(球队, 命中的名称形式(原始拼写))], 匹配的球队总数)；team_ids 不为空时只在这些球队中查找"""
+        query = query.strip().lower()
+        if not query:
+            return [], 0
+
+        # 单个字符只做前缀查询，两个字符以上做包含查询(包含前缀)
+        if len(query) == 1:
+            positions = self._prefix_positions(query)
+        else:
+            positions = self._infix_positions(query)
+
+        # 每支球队只保留排序最靠前的名称形式
+        best = {}
+        for position in positions:
+            if team_ids is not None and self.form_team_ids[position] not in team_ids:
+                continue
+            form = self.forms[position]
+            rank = (self._match_type(form, query), self.form_fields[position], len(form), form)
+            team_id = self.form_team_ids[position]
+            if team_id not in best or rank < best[team_id][0]:
+                best[team_id] = (rank, position)
+
+        ranked = sorted(best.items(), key=lambda item: (item[1][0], item[0]))
+        page = ranked[offset:offset + limit]
+        return [(self.index.get(team_id), self.form_names[position]) for team_id, (_, position) in page], len(ranked)
+
+_lock = threading.Lock()
+_latest = (None, None)
+
+def get_team_search_index(index):
+    """获取球队索引对应的自动补全索引，球队数据变化后首次使用时重建"""
+    global _latest
+    source, search_index = _latest
+    if source is index:
+        return search_index
+    with _lock:
+        source, search_index = _latest
+        if source is not index:
+            search_index = TeamSearchIndex(index)
+            _latest = (index, search_index)
+            logger.info(f"构建球队搜索索引 (第 {index.generation} 代): {len(search_index)} 个名称形式")
+    return search_index
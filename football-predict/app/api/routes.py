@@ -1,21 +1,22 @@
 # app/api/routes.py
-from flask import Blueprint, request, jsonify
+from typing import Optional
+from fastapi import APIRouter, Body
+from fastapi.responses import JSONResponse
 from app.services.prediction import PredictionService
 import logging
 
 logger = logging.getLogger(__name__)
-api_bp = Blueprint('api', __name__)
+# app/__init__.py 以 /api 前缀注册
+router = APIRouter()
 prediction_service = PredictionService()
 
-@api_bp.route('/predict', methods=['POST'])
-def predict_match():
+@router.post('/predict')
+def predict_match(data: Optional[dict] = Body(None)):
     """预测比赛结果API"""
-    data = request.json
-    
     if not data or 'home_team' not in data or 'away_team' not in data:
-        return jsonify({
+        return JSONResponse({
             'error': 'Missing required parameters: home_team, away_team'
-        }), 400
+        }, status_code=400)
     
     home_team = data['home_team']
     away_team = data['away_team']
@@ -24,12 +25,12 @@ def predict_match():
     result = prediction_service.predict_match(home_team, away_team)
     
     if 'error' in result:
-        return jsonify(result), 400
+        return JSONResponse(result, status_code=400)
         
-    return jsonify(result)
+    return result
 
-@api_bp.route('/matches', methods=['GET'])
-def get_upcoming_matches():
+@router.get('/matches')
+def get_upcoming_matches(days: int = 7):
     """获取即将到来的比赛"""
     from app.data.database import get_db_connection
     import datetime
@@ -37,7 +38,6 @@ def get_upcoming_matches():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    days = request.args.get('days', 7, type=int)
     today = datetime.datetime.now().strftime('%Y-%m-%d')
     future = (datetime.datetime.now() + datetime.timedelta(days=days)).strftime('%Y-%m-%d')
     
@@ -60,4 +60,4 @@ def get_upcoming_matches():
         'competition': row['competition']
     } for row in cursor.fetchall()]
     
-    return jsonify({'matches': matches})
\ No newline at end of file
+    return {'matches': matches}
\ No newline at end of file
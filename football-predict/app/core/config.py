@@ -6,6 +6,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings:
+    # 应用信息
+    APP_NAME = "智能足球预测系统"
+    APP_VERSION = "1.0.0"
+    DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
+    
     # 原有API密钥
     FOOTBALL_DATA_API_KEY = os.getenv("FOOTBALL_DATA_API_KEY")
     JUHE_API_KEY = os.getenv("JUHE_API_KEY")
@@ -13,15 +18,57 @@ class Settings:
     # 数据库路径
     DB_PATH = os.getenv("DB_PATH", "data/football.db")
     
+    # 同步任务和球队名称匹配使用的 SQLAlchemy 数据库，与 DB_PATH 分开存放
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/football_sync.db")
+    
     # 日志设置
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     
     # 爬虫设置
     USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     
+    # 外部接口 HTTP 客户端：请求超时、连接超时(秒)，同时进行的请求数上限和每个主机的连接数上限
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "20"))
+    HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", "5"))
+    
+    # 数据源每分钟请求配额，按各数据源公布的限制设置(football-data.org 和 API-Football 免费版为每分钟10次)，0 表示不限速
+    RATE_LIMIT_FOOTBALL_DATA = int(os.getenv("RATE_LIMIT_FOOTBALL_DATA", "10"))
+    RATE_LIMIT_API_FOOTBALL = int(os.getenv("RATE_LIMIT_API_FOOTBALL", "10"))
+    RATE_LIMIT_JUHE = int(os.getenv("RATE_LIMIT_JUHE", "30"))
+    
     # 是否开启数据抓取功能
     ENABLE_SCRAPING = os.getenv("ENABLE_SCRAPING", "True").lower() in ("true", "1", "t")
     
+    # 检查球队表变化的间隔(秒)
+    TEAM_INDEX_CHECK_INTERVAL = float(os.getenv("TEAM_INDEX_CHECK_INTERVAL", "300"))
+    
+    # 检查别名文件变化的间隔(秒)
+    ALIAS_WATCH_INTERVAL = float(os.getenv("ALIAS_WATCH_INTERVAL", "5"))
+    
+    # 球队名称匹配缓存：容量、成功结果和未匹配结果的有效期(秒)，缓存文件为空时不持久化
+    TEAM_MATCH_CACHE_MAXSIZE = int(os.getenv("TEAM_MATCH_CACHE_MAXSIZE", "10000"))
+    TEAM_MATCH_CACHE_TTL = float(os.getenv("TEAM_MATCH_CACHE_TTL", "86400"))
+    TEAM_MATCH_NEGATIVE_TTL = float(os.getenv("TEAM_MATCH_NEGATIVE_TTL", "3600"))
+    TEAM_MATCH_CACHE_FILE = os.getenv("TEAM_MATCH_CACHE_FILE", "")
+    
+    # 同步比赛数据时球队名称模糊匹配的阈值
+    SYNC_TEAM_MATCH_THRESHOLD = int(os.getenv("SYNC_TEAM_MATCH_THRESHOLD", "75"))
+    
+    # 同步时批量写入球队、比赛和统计数据，每条语句写入的行数
+    SYNC_UPSERT_CHUNK_SIZE = int(os.getenv("SYNC_UPSERT_CHUNK_SIZE", "500"))
+    
+    # 批量匹配新数据源名称：自动写入别名和进入人工审核的最低得分、每个分片的名称数、进程数(0 表示 CPU 核数)
+    BULK_MATCH_ACCEPT_THRESHOLD = int(os.getenv("BULK_MATCH_ACCEPT_THRESHOLD", "90"))
+    BULK_MATCH_REVIEW_THRESHOLD = int(os.getenv("BULK_MATCH_REVIEW_THRESHOLD", "60"))
+    BULK_MATCH_SHARD_SIZE = int(os.getenv("BULK_MATCH_SHARD_SIZE", "2000"))
+    BULK_MATCH_WORKERS = int(os.getenv("BULK_MATCH_WORKERS", "0"))
+    
+    # 别名学习日志：批量写出的间隔和合并进快照文件的间隔(秒)
+    ALIAS_JOURNAL_FLUSH_INTERVAL = float(os.getenv("ALIAS_JOURNAL_FLUSH_INTERVAL", "10"))
+    ALIAS_JOURNAL_COMPACT_INTERVAL = float(os.getenv("ALIAS_JOURNAL_COMPACT_INTERVAL", "3600"))
+    
     # 数据更新频率(小时)
     DATA_UPDATE_INTERVAL = int(os.getenv("DATA_UPDATE_INTERVAL", "12"))
 
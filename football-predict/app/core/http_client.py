@@ -0,0 +1,106 @@
+import json
+import asyncio
+import aiohttp
+
+from app.core.config import settings
+from app.core.rate_limiter import get_rate_limiter
+from app.core.logging import logger
+
+class HTTPError(Exception):
+    """上游接口返回了错误状态码"""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"HTTP {status_code}: {url}")
+        self.status_code = status_code
+        self.url = url
+
+class HTTPResponse:
+    """已读取完毕的响应，接口与 requests.Response 的常用部分一致"""
+
+    __slots__ = ('status_code', 'url', 'text')
+
+    def __init__(self, status_code: int, url: str, text: str):
+        self.status_code = status_code
+        self.url = url
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(self.status_code, self.url)
+
+class HTTPClient:
+    """所有数据源共享的异步 HTTP 客户端
+
+    同一事件循环内复用一个 aiohttp 会话，连接按主机保持长连接并限制每个主机的连接数；
+    每个请求都有超时，同时进行的请求总数有上限，慢的上游接口不会阻塞事件循环。
+    """
+
+    def __init__(self, timeout: float, connect_timeout: float, max_concurrency: int, limit_per_host: int):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+    def _get_session(self):
+        # 会话和信号量绑定在创建它们的事件循环上，每次 asyncio.run 都会换新的循环
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def get(self, url: str, headers: dict = None, params: dict = None, timeout: float = None,
+                  provider: str = None, max_wait: float = None) -> HTTPResponse:
+        """发送 GET 请求并读取完整响应；超时和连接错误直接抛出
+
+        指定 provider 时先从该数据源的限速器取得令牌，等待令牌期间不占用并发名额；
+        交互式请求用 max_wait 限制等待时间，超过时抛出 RateLimitExceeded。
+        """
+        limiter = get_rate_limiter(provider) if provider else None
+        if limiter is not None:
+            await limiter.acquire(max_wait)
+        session = self._get_session()
+        # requests 会忽略值为 None 的参数和请求头(例如未配置的 API 密钥)，aiohttp 不会
+        if params:
+            params = {key: str(value) for key, value in params.items() if value is not None}
+        if headers:
+            headers = {key: value for key, value in headers.items() if value is not None}
+        kwargs = {}
+        if timeout:
+            # 显式传入 None 会关闭超时，只有指定了超时时才覆盖会话的默认值
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout, connect=self.connect_timeout)
+        async with self._semaphore:
+            async with session.get(url, headers=headers, params=params, **kwargs) as response:
+                text = await response.text()
+                if response.status >= 400:
+                    logger.debug(f"请求 {url} 返回状态码 {response.status}")
+                return HTTPResponse(response.status, str(response.url), text)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+# 进程级 HTTP 客户端
+http_client = HTTPClient(
+    timeout=settings.HTTP_TIMEOUT,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+    max_concurrency=settings.HTTP_MAX_CONCURRENCY,
+    limit_per_host=settings.HTTP_LIMIT_PER_HOST
+)
+
+def get_http_client():
+    return http_client
@@ -1,29 +1,30 @@
+import asyncio
 import logging
 import pandas as pd
 from datetime import datetime
 from .database import get_db_connection
-from .sources.football_data_org import FootballDataOrgAPI
-from .sources.juhe_api import JuheFootballAPI
+from .sources.football_data_org import FootballDataAPI
+from .sources.juhe_football import JuheFootballAPI
 from .sources.scrapers.soccerstats_scraper import run_soccerstats_scraper
 from .sources.scrapers.fbref_scraper import run_fbref_scraper
 
 class DataManager:
     def __init__(self, db_connection):
-        self.football_data_api = FootballDataOrgAPI()
+        self.football_data_api = FootballDataAPI()
         self.juhe_api = JuheFootballAPI()
         self.db_connection = db_connection
         self.logger = logging.getLogger(__name__)
         self.logger.info("数据管理器初始化完成")
     
-    def get_official_api_data(self, competition_id, date_from=None, date_to=None):
+    async def get_official_api_data(self, competition_id, date_from=None, date_to=None):
         """获取官方API数据"""
         self.logger.info(f"开始获取官方API数据: 比赛ID={competition_id}, 日期范围={date_from}至{date_to}")
         
-        # 获取football-data.org数据
-        data1 = self.football_data_api.get_matches(competition_id, date_from, date_to)
-        
-        # 获取聚合数据API数据
-        data2 = self.juhe_api.get_matches(league_id=competition_id, date=date_from)
+        # 同时获取football-data.org和聚合数据API数据
+        data1, data2 = await asyncio.gather(
+            self.football_data_api.get_matches(competition_id, date_from, date_to),
+            self.juhe_api.get_matches(league_id=competition_id, date=date_from)
+        )
         
         # 处理football-data.org数据
         processed_data1 = []
@@ -155,7 +156,7 @@ class DataManager:
             self.logger.error(f"更新数据库失败: {str(e)}")
             return False
     
-    def sync_all_data(self, league_mappings, date_from=None, date_to=None):
+    async def sync_all_data(self, league_mappings, date_from=None, date_to=None):
         """同步所有数据源的数据"""
         all_data = []
         
@@ -164,7 +165,7 @@ class DataManager:
             
             # 1. 获取官方API数据
             if 'football_data' in ids:
-                api_data = self.get_official_api_data(ids['football_data'], date_from, date_to)
+                api_data = await self.get_official_api_data(ids['football_data'], date_from, date_to)
                 if api_data:
                     for match in api_data:
                         match['competition'] = league_key  # 确保统一的联赛标识
@@ -2,10 +2,81 @@
 import sqlite3
 import os
 import logging
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, Index, create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 同步任务、球队名称匹配使用的 SQLAlchemy 模型，存放在 DATABASE_URL 指向的数据库中。
+# 其中 matches、team_stats 与下面 sqlite3 建的表同名但结构不同，所以不与 DB_PATH 共用一个数据库文件
+Base = declarative_base()
+
+class Team(Base):
+    __tablename__ = 'teams'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True)
+    official_name = Column(String(100))
+    zh_name = Column(String(100))
+    aliases = Column(JSON)
+    league = Column(String(50))
+    country = Column(String(50))
+    logo_url = Column(String(255))
+    source = Column(String(20))
+    last_updated = Column(DateTime, default=datetime.datetime.utcnow)
+
+class TeamStats(Base):
+    __tablename__ = 'team_stats'
+    __table_args__ = (
+        # 每支球队一行，批量写入时按 team_id 冲突更新
+        Index('uq_team_stats_team_id', 'team_id', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    team_id = Column(Integer)
+    avg_goals_home = Column(Float, default=0.0)
+    avg_goals_away = Column(Float, default=0.0)
+    win_rate_home = Column(Float, default=0.0)
+    win_rate_away = Column(Float, default=0.0)
+    total_matches = Column(Integer, default=0)
+    last_updated = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Match(Base):
+    __tablename__ = 'matches'
+    
+    id = Column(Integer, primary_key=True)
+    match_id = Column(String(50), unique=True)
+    home_team_id = Column(Integer)
+    away_team_id = Column(Integer)
+    home_goals = Column(Integer)
+    away_goals = Column(Integer)
+    status = Column(String(20))
+    date = Column(DateTime)
+    competition = Column(String(50))
+    source = Column(String(20))
+    details = Column(JSON, nullable=True)
+
+engine = create_engine(settings.DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_db():
+    """获取 SQLAlchemy 会话"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def init_models():
+    """创建 SQLAlchemy 模型对应的表"""
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        os.makedirs(os.path.dirname(url.database) or '.', exist_ok=True)
+    Base.metadata.create_all(bind=engine)
+
 def get_db_connection():
     """获取数据库连接"""
     db_path = settings.DB_PATH
@@ -51,7 +122,7 @@ def init_db():
     CREATE TABLE IF NOT EXISTS team_stats (
         team_id INTEGER,
         team_name TEXT NOT NULL,
-        stats_data TEXT,  # 将存储为JSON字符串
+        stats_data TEXT,  -- 将存储为JSON字符串
         updated_at TEXT,
         PRIMARY KEY (team_id, team_name)
     )
@@ -74,4 +145,7 @@ def init_db():
     
     conn.commit()
     conn.close()
+    
+    # 同步任务使用的表
+    init_models()
     logger.info("Database initialized successfully")
\ No newline at end of file
@@ -1,7 +1,7 @@
 # app/data/sources/football_data.py
-import requests
 import logging
 from app.core.config import settings
+from app.core.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,17 +12,17 @@ class FootballDataAPI:
             "X-Auth-Token": settings.FOOTBALL_DATA_API_KEY
         }
     
-    def get_competitions(self):
+    async def get_competitions(self):
         """获取所有比赛"""
         try:
-            response = requests.get(f"{self.base_url}/competitions", headers=self.headers)
+            response = await http_client.get(f"{self.base_url}/competitions", headers=self.headers, provider='football-data')
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"Error fetching competitions: {e}")
             return None
     
-    def get_matches(self, competition_id, date_from=None, date_to=None):
+    async def get_matches(self, competition_id, date_from=None, date_to=None):
         """获取指定比赛的赛程"""
         params = {}
         if date_from:
@@ -31,10 +31,11 @@ class FootballDataAPI:
             params['dateTo'] = date_to
             
         try:
-            response = requests.get(
+            response = await http_client.get(
                 f"{self.base_url}/competitions/{competition_id}/matches", 
                 headers=self.headers,
-                params=params
+                params=params,
+                provider='football-data'
             )
             response.raise_for_status()
             return response.json()
@@ -42,10 +43,10 @@ class FootballDataAPI:
             logger.error(f"Error fetching matches: {e}")
             return None
     
-    def get_team_stats(self, team_id):
+    async def get_team_stats(self, team_id):
         """获取球队统计数据"""
         try:
-            response = requests.get(f"{self.base_url}/teams/{team_id}", headers=self.headers)
+            response = await http_client.get(f"{self.base_url}/teams/{team_id}", headers=self.headers, provider='football-data')
             response.raise_for_status()
             return response.json()
         except Exception as e:
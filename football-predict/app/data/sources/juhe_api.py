@@ -1,7 +1,7 @@
 # app/data/sources/juhe.py
-import requests
 import logging
 from app.core.config import settings
+from app.core.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +10,7 @@ class JuheAPI:
         self.base_url = "http://apis.juhe.cn/fapig/football/query"
         self.key = settings.JUHE_API_KEY
     
-    def get_matches(self, league=None, date=None):
+    async def get_matches(self, league=None, date=None):
         """获取比赛数据"""
         params = {
             "key": self.key
@@ -22,14 +22,14 @@ class JuheAPI:
             params['date'] = date
             
         try:
-            response = requests.get(self.base_url, params=params)
+            response = await http_client.get(self.base_url, params=params, provider='juhe')
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"Error fetching matches from Juhe: {e}")
             return None
     
-    def get_standings(self, league):
+    async def get_standings(self, league):
         """获取联赛积分榜"""
         standings_url = "http://apis.juhe.cn/fapig/football/standings"
         params = {
@@ -38,7 +38,7 @@ class JuheAPI:
         }
         
         try:
-            response = requests.get(standings_url, params=params)
+            response = await http_client.get(standings_url, params=params, provider='juhe')
             response.raise_for_status()
             return response.json()
         except Exception as e:
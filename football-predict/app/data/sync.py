@@ -1,46 +1,54 @@
-import requests
 import asyncio
 import datetime
 import json
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, insert
+from sqlalchemy import select, update, insert, func, case
 from sqlalchemy.exc import IntegrityError
 
 from app.data.database import Team, TeamStats, Match, get_db
+from app.data.upsert import bulk_upsert, upsert_all
 from app.core.config import settings
 from app.core.logging import logger
-from app.data.sources.football_data_org import FootballDataOrgAPI
-from app.data.sources.juhe_api import JuheFootballAPI
-from app.data.sources.scrapers.soccerstats_scraper import run_soccerstats_scraper
-from app.data.sources.scrapers.fbref_scraper import run_fbref_scraper
+from app.core.http_client import http_client
+from app.utils.team_index import team_index
+from app.utils.team_matching import TeamNameResolver
+from app.utils.alias_journal import alias_journal
+from app.utils.bulk_resolution import resolve_unmatched_names
+from app.data.sources.football_data_org import FootballDataAPI
+from app.data.sources.juhe_football import JuheFootballAPI
 
 # 定义联赛ID映射(需要根据各数据源的实际ID进行调整)
 LEAGUE_MAPPINGS = {
     'PL': {
+        'country': 'England',
         'football_data': 'PL', 
         'juhe': '2', 
         'soccerstats': 'england',
         'fbref': '9'  # FBref的英超ID
     },
     'BL1': {
+        'country': 'Germany',
         'football_data': 'BL1', 
         'juhe': '4', 
         'soccerstats': 'germany',
         'fbref': '20'  # FBref的德甲ID
     },
     'SA': {
+        'country': 'Italy',
         'football_data': 'SA', 
         'juhe': '7', 
         'soccerstats': 'italy',
         'fbref': '11'  # FBref的意甲ID
     },
     'PD': {
+        'country': 'Spain',
         'football_data': 'PD', 
         'juhe': '5', 
         'soccerstats': 'spain',
         'fbref': '12'  # FBref的西甲ID
     },
     'FL1': {
+        'country': 'France',
         'football_data': 'FL1', 
         'juhe': '3', 
         'soccerstats': 'france',
@@ -48,21 +56,32 @@ LEAGUE_MAPPINGS = {
     }
 }
 
+# 球队统计数据取最近几场主场/客场比赛
+RECENT_MATCHES = 10
+
 # ======== 数据同步逻辑 ========
 async def sync_football_data_teams(db: Session):
     try:
         # 创建football-data.org API客户端
-        api = FootballDataOrgAPI()
+        api = FootballDataAPI()
+        
+        # 各联赛的球队请求并发发出，由 football-data.org 的限速器控制请求节奏
+        leagues = list(LEAGUE_MAPPINGS.items())
+        logger.info(f"从football-data.org获取 {len(leagues)} 个联赛的球队数据")
+        responses = await asyncio.gather(*[
+            http_client.get(
+                f"{api.base_url}/competitions/{ids['football_data']}/teams",
+                headers=api.headers,
+                provider='football-data'
+            )
+            for _, ids in leagues
+        ], return_exceptions=True)
         
-        # 获取每个联赛的球队
         all_teams = []
-        for league_key, ids in LEAGUE_MAPPINGS.items():
-            # 获取每个联赛ID对应的球队
-            competition_id = ids['football_data']
-            url = f"{api.base_url}/competitions/{competition_id}/teams"
-            
-            logger.info(f"从football-data.org获取 {league_key} 联赛球队数据")
-            response = requests.get(url, headers=api.headers)
+        for (league_key, ids), response in zip(leagues, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Football Data API 请求失败 ({league_key}): {str(response)}")
+                continue
             
             if response.status_code != 200:
                 logger.error(f"Football Data API 请求失败: {response.status_code}")
@@ -82,31 +101,12 @@ async def sync_football_data_teams(db: Session):
                     'league': league_key
                 }
                 
-                # 使用SQLite兼容的upsert方法
-                try:
-                    # 尝试查找现有记录
-                    existing_team = db.execute(
-                        select(Team).where(Team.id == team_data['id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_team:
-                        # 如果存在，更新记录
-                        for key, value in team_data.items():
-                            setattr(existing_team, key, value)
-                    else:
-                        # 如果不存在，创建新记录
-                        new_team = Team(**team_data)
-                        db.add(new_team)
-                    
-                    all_teams.append(team_data)
-                except Exception as e:
-                    logger.error(f"处理球队 {team_data['name']} 时出错: {str(e)}")
-            
-            # 避免API速率限制
-            await asyncio.sleep(1)
+                all_teams.append(team_data)
         
+        counts = bulk_upsert(db, Team, all_teams, 'id')
         db.commit()
-        logger.info(f"从 Football Data API 同步了 {len(all_teams)} 支球队")
+        logger.info(f"从 Football Data API 同步了 {len(all_teams)} 支球队 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return all_teams
         
     except Exception as e:
@@ -119,22 +119,30 @@ async def sync_juhe_football_teams(db: Session):
         # 创建聚合数据API客户端
         api = JuheFootballAPI()
         
-        # 获取每个联赛的球队
-        all_teams = []
-        for league_key, ids in LEAGUE_MAPPINGS.items():
-            juhe_league_id = ids['juhe']
-            
-            logger.info(f"从聚合数据获取 {league_key} 联赛球队数据")
-            
-            # 注意：聚合数据API可能需要特定参数获取球队信息
-            # 下面代码假设有获取球队列表的接口，实际需根据API文档调整
-            response = requests.get(
+        # 各联赛的球队请求并发发出，由聚合数据的限速器控制请求节奏
+        leagues = list(LEAGUE_MAPPINGS.items())
+        logger.info(f"从聚合数据获取 {len(leagues)} 个联赛的球队数据")
+        
+        # 注意：聚合数据API可能需要特定参数获取球队信息
+        # 下面代码假设有获取球队列表的接口，实际需根据API文档调整
+        responses = await asyncio.gather(*[
+            http_client.get(
                 api.base_url.replace("query", "teams"),  # 假设的球队列表API
                 params={
                     "key": api.api_key,
-                    "league_id": juhe_league_id
-                }
+                    "league_id": ids['juhe']
+                },
+                provider='juhe'
             )
+            for _, ids in leagues
+        ], return_exceptions=True)
+        
+        all_teams = []
+        for (league_key, ids), response in zip(leagues, responses):
+            juhe_league_id = ids['juhe']
+            if isinstance(response, Exception):
+                logger.warning(f"聚合数据API请求失败 (联赛ID {juhe_league_id}): {str(response)}")
+                continue
             
             if response.status_code != 200:
                 logger.warning(f"聚合数据API请求失败 (联赛ID {juhe_league_id}): {response.status_code}")
@@ -160,31 +168,12 @@ async def sync_juhe_football_teams(db: Session):
                     'last_updated': datetime.datetime.utcnow()
                 }
                 
-                # 使用SQLite兼容的upsert方法
-                try:
-                    # 尝试查找现有记录
-                    existing_team = db.execute(
-                        select(Team).where(Team.id == team_data['id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_team:
-                        # 如果存在，更新记录
-                        for key, value in team_data.items():
-                            setattr(existing_team, key, value)
-                    else:
-                        # 如果不存在，创建新记录
-                        new_team = Team(**team_data)
-                        db.add(new_team)
-                    
-                    all_teams.append(team_data)
-                except Exception as e:
-                    logger.error(f"处理球队 {team_data['name']} 时出错: {str(e)}")
-            
-            # 避免API速率限制
-            await asyncio.sleep(1)
+                all_teams.append(team_data)
         
+        counts = bulk_upsert(db, Team, all_teams, 'id')
         db.commit()
-        logger.info(f"从聚合数据API同步了 {len(all_teams)} 支球队")
+        logger.info(f"从聚合数据API同步了 {len(all_teams)} 支球队 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return all_teams
         
     except Exception as e:
@@ -192,11 +181,12 @@ async def sync_juhe_football_teams(db: Session):
         logger.error(f"同步聚合数据球队时出错: {str(e)}")
         return []
 
-async def sync_matches_from_apis(db: Session):
+async def sync_matches_from_apis(db: Session, resolver: TeamNameResolver = None):
     """从官方API同步最近的比赛数据"""
+    resolver = resolver or TeamNameResolver(db)
     try:
         # 创建API客户端
-        football_data_api = FootballDataOrgAPI()
+        football_data_api = FootballDataAPI()
         juhe_api = JuheFootballAPI()
         
         # 设置日期范围
@@ -204,15 +194,24 @@ async def sync_matches_from_apis(db: Session):
         start_date = (today - datetime.timedelta(days=30)).strftime('%Y-%m-%d')
         end_date = (today + datetime.timedelta(days=30)).strftime('%Y-%m-%d')
         
+        # 两个数据源各联赛的请求并发发出，由各自的限速器控制请求节奏
+        leagues = list(LEAGUE_MAPPINGS.items())
+        logger.info(f"从football-data.org和聚合数据获取 {len(leagues)} 个联赛的比赛数据")
+        football_data_results, juhe_results = await asyncio.gather(
+            asyncio.gather(*[
+                football_data_api.get_matches(ids['football_data'], start_date, end_date)
+                for _, ids in leagues
+            ]),
+            asyncio.gather(*[
+                juhe_api.get_matches(league_id=ids['juhe'], date=start_date)
+                for _, ids in leagues
+            ])
+        )
+        
         all_matches = []
         
-        # 从football-data.org获取比赛数据
-        for league_key, ids in LEAGUE_MAPPINGS.items():
-            competition_id = ids['football_data']
-            logger.info(f"从football-data.org获取 {league_key} 联赛比赛数据")
-            
-            data = football_data_api.get_matches(competition_id, start_date, end_date)
-            
+        # football-data.org的比赛数据
+        for (league_key, ids), data in zip(leagues, football_data_results):
             if not data or 'matches' not in data:
                 logger.warning(f"获取 {league_key} 联赛比赛数据失败")
                 continue
@@ -237,35 +236,10 @@ async def sync_matches_from_apis(db: Session):
                     })
                 }
                 
-                try:
-                    # 尝试查找现有记录
-                    existing_match = db.execute(
-                        select(Match).where(Match.match_id == match_data['match_id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_match:
-                        # 如果存在，更新记录
-                        for key, value in match_data.items():
-                            setattr(existing_match, key, value)
-                    else:
-                        # 如果不存在，创建新记录
-                        new_match = Match(**match_data)
-                        db.add(new_match)
-                        
-                    all_matches.append(match_data)
-                except Exception as e:
-                    logger.error(f"处理比赛 {match_data['match_id']} 时出错: {str(e)}")
-            
-            # 避免API速率限制
-            await asyncio.sleep(1)
-            
-        # 从聚合数据API获取比赛数据
-        for league_key, ids in LEAGUE_MAPPINGS.items():
-            juhe_league_id = ids['juhe']
-            logger.info(f"从聚合数据获取 {league_key} 联赛比赛数据")
-            
-            data = juhe_api.get_matches(league_id=juhe_league_id, date=start_date)
+                all_matches.append(match_data)
             
+        # 聚合数据API的比赛数据
+        for (league_key, ids), data in zip(leagues, juhe_results):
             if not data:
                 logger.warning(f"获取 {league_key} 联赛比赛数据失败")
                 continue
@@ -292,48 +266,24 @@ async def sync_matches_from_apis(db: Session):
                     })
                 }
                 
-                # 查找球队ID
-                home_team = db.execute(
-                    select(Team).where(Team.name == match_data['home_team_name'])
-                ).scalar_one_or_none()
+                # 查找球队ID(同一名称在本次同步中只匹配一次)
+                home_team_id = resolver.resolve(match_data['home_team_name'], 'juhe', ids['country'], league_key)
+                away_team_id = resolver.resolve(match_data['away_team_name'], 'juhe', ids['country'], league_key)
                 
-                away_team = db.execute(
-                    select(Team).where(Team.name == match_data['away_team_name'])
-                ).scalar_one_or_none()
+                if home_team_id:
+                    match_data['home_team_id'] = home_team_id
+                if away_team_id:
+                    match_data['away_team_id'] = away_team_id
                 
-                if home_team:
-                    match_data['home_team_id'] = home_team.id
-                if away_team:
-                    match_data['away_team_id'] = away_team.id
-                
-                try:
-                    # 尝试查找现有记录
-                    existing_match = db.execute(
-                        select(Match).where(Match.match_id == match_data['match_id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_match:
-                        # 如果存在，更新记录
-                        for key, value in match_data.items():
-                            if key not in ('home_team_name', 'away_team_name'):  # 跳过临时字段
-                                setattr(existing_match, key, value)
-                    else:
-                        # 删除临时字段
-                        match_data.pop('home_team_name', None)
-                        match_data.pop('away_team_name', None)
-                        # 如果不存在，创建新记录
-                        new_match = Match(**match_data)
-                        db.add(new_match)
-                        
-                    all_matches.append(match_data)
-                except Exception as e:
-                    logger.error(f"处理比赛 {match_data['match_id']} 时出错: {str(e)}")
-            
-            # 避免API速率限制
-            await asyncio.sleep(1)
+                # 临时字段不写入数据库
+                match_data.pop('home_team_name', None)
+                match_data.pop('away_team_name', None)
+                all_matches.append(match_data)
         
+        counts = bulk_upsert(db, Match, all_matches, 'match_id')
         db.commit()
-        logger.info(f"从API同步了 {len(all_matches)} 场比赛")
+        logger.info(f"从API同步了 {len(all_matches)} 场比赛 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return all_matches
         
     except Exception as e:
@@ -341,8 +291,20 @@ async def sync_matches_from_apis(db: Session):
         logger.error(f"同步API比赛数据时出错: {str(e)}")
         return []
 
-async def sync_matches_from_scrapers(db: Session):
+async def sync_matches_from_scrapers(db: Session, resolver: TeamNameResolver = None):
     """从爬虫同步比赛数据"""
+    if not settings.ENABLE_SCRAPING:
+        logger.info("未开启数据抓取，跳过爬虫比赛数据")
+        return []
+    try:
+        # 爬虫依赖 scrapy、bs4 等，只在开启抓取时导入
+        from app.data.sources.scrapers.soccerstats_scraper import run_soccerstats_scraper
+        from app.data.sources.scrapers.fbref_scraper import run_fbref_scraper
+    except ImportError as e:
+        logger.warning(f"爬虫模块不可用，跳过爬虫比赛数据: {str(e)}")
+        return []
+    
+    resolver = resolver or TeamNameResolver(db)
     try:
         all_matches = []
         
@@ -380,42 +342,19 @@ async def sync_matches_from_scrapers(db: Session):
                     'details': json.dumps({})
                 }
                 
-                # 查找球队ID
-                home_team = db.execute(
-                    select(Team).where(Team.name == match_data['home_team_name'])
-                ).scalar_one_or_none()
-                
-                away_team = db.execute(
-                    select(Team).where(Team.name == match_data['away_team_name'])
-                ).scalar_one_or_none()
+                # 查找球队ID(同一名称在本次同步中只匹配一次)
+                home_team_id = resolver.resolve(match_data['home_team_name'], 'soccerstats', ids['country'], league_key)
+                away_team_id = resolver.resolve(match_data['away_team_name'], 'soccerstats', ids['country'], league_key)
                 
-                if home_team:
-                    match_data['home_team_id'] = home_team.id
-                if away_team:
-                    match_data['away_team_id'] = away_team.id
+                if home_team_id:
+                    match_data['home_team_id'] = home_team_id
+                if away_team_id:
+                    match_data['away_team_id'] = away_team_id
                 
-                try:
-                    # 尝试查找现有记录
-                    existing_match = db.execute(
-                        select(Match).where(Match.match_id == match_data['match_id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_match:
-                        # 如果存在，更新记录
-                        for key, value in match_data.items():
-                            if key not in ('home_team_name', 'away_team_name'):  # 跳过临时字段
-                                setattr(existing_match, key, value)
-                    else:
-                        # 删除临时字段
-                        match_data.pop('home_team_name', None)
-                        match_data.pop('away_team_name', None)
-                        # 如果不存在，创建新记录
-                        new_match = Match(**match_data)
-                        db.add(new_match)
-                        
-                    all_matches.append(match_data)
-                except Exception as e:
-                    logger.error(f"处理比赛 {match_data['match_id']} 时出错: {str(e)}")
+                # 临时字段不写入数据库
+                match_data.pop('home_team_name', None)
+                match_data.pop('away_team_name', None)
+                all_matches.append(match_data)
         
         # 从FBref获取比赛数据
         for league_key, ids in LEAGUE_MAPPINGS.items():
@@ -453,45 +392,24 @@ async def sync_matches_from_scrapers(db: Session):
                     'details': json.dumps({})
                 }
                 
-                # 查找球队ID
-                home_team = db.execute(
-                    select(Team).where(Team.name == match_data['home_team_name'])
-                ).scalar_one_or_none()
-                
-                away_team = db.execute(
-                    select(Team).where(Team.name == match_data['away_team_name'])
-                ).scalar_one_or_none()
+                # 查找球队ID(同一名称在本次同步中只匹配一次)
+                home_team_id = resolver.resolve(match_data['home_team_name'], 'fbref', ids['country'], league_key)
+                away_team_id = resolver.resolve(match_data['away_team_name'], 'fbref', ids['country'], league_key)
                 
-                if home_team:
-                    match_data['home_team_id'] = home_team.id
-                if away_team:
-                    match_data['away_team_id'] = away_team.id
+                if home_team_id:
+                    match_data['home_team_id'] = home_team_id
+                if away_team_id:
+                    match_data['away_team_id'] = away_team_id
                 
-                try:
-                    # 尝试查找现有记录
-                    existing_match = db.execute(
-                        select(Match).where(Match.match_id == match_data['match_id'])
-                    ).scalar_one_or_none()
-                    
-                    if existing_match:
-                        # 如果存在，更新记录
-                        for key, value in match_data.items():
-                            if key not in ('home_team_name', 'away_team_name'):  # 跳过临时字段
-                                setattr(existing_match, key, value)
-                    else:
-                        # 删除临时字段
-                        match_data.pop('home_team_name', None)
-                        match_data.pop('away_team_name', None)
-                        # 如果不存在，创建新记录
-                        new_match = Match(**match_data)
-                        db.add(new_match)
-                        
-                    all_matches.append(match_data)
-                except Exception as e:
-                    logger.error(f"处理比赛 {match_data['match_id']} 时出错: {str(e)}")
+                # 临时字段不写入数据库
+                match_data.pop('home_team_name', None)
+                match_data.pop('away_team_name', None)
+                all_matches.append(match_data)
         
+        counts = bulk_upsert(db, Match, all_matches, 'match_id')
         db.commit()
-        logger.info(f"从爬虫同步了 {len(all_matches)} 场比赛")
+        logger.info(f"从爬虫同步了 {len(all_matches)} 场比赛 "
+                    f"(新增 {counts['inserted']}, 更新 {counts['updated']})")
         return all_matches
         
     except Exception as e:
@@ -499,70 +417,61 @@ async def sync_matches_from_scrapers(db: Session):
         logger.error(f"同步爬虫比赛数据时出错: {str(e)}")
         return []
 
+def _recent_results(team_column, goals_for, goals_against, recent):
+    """每支球队最近 recent 场已结束比赛(主场或客场)的场次、进球数和胜场数"""
+    ranked = select(
+        team_column.label('team_id'),
+        goals_for.label('goals'),
+        case((goals_for > goals_against, 1), else_=0).label('win'),
+        func.row_number().over(
+            partition_by=team_column,
+            order_by=(Match.date.desc(), Match.id.desc())
+        ).label('rn')
+    ).where(
+        Match.status == 'FINISHED',
+        team_column.isnot(None)
+    ).subquery()
+    return select(
+        ranked.c.team_id,
+        func.count().label('played'),
+        func.coalesce(func.sum(ranked.c.goals), 0).label('goals'),
+        func.sum(ranked.c.win).label('wins')
+    ).where(ranked.c.rn <= recent).group_by(ranked.c.team_id).subquery()
+
+def team_stats_query(recent: int = RECENT_MATCHES):
+    """所有球队统计数据的查询：按比赛日期倒序给每支球队的主客场比赛编号，汇总最近 recent 场"""
+    home = _recent_results(Match.home_team_id, Match.home_goals, Match.away_goals, recent)
+    away = _recent_results(Match.away_team_id, Match.away_goals, Match.home_goals, recent)
+    return select(
+        Team.id.label('team_id'),
+        func.coalesce(home.c.played, 0).label('home_played'),
+        func.coalesce(home.c.goals, 0).label('home_goals'),
+        func.coalesce(home.c.wins, 0).label('home_wins'),
+        func.coalesce(away.c.played, 0).label('away_played'),
+        func.coalesce(away.c.goals, 0).label('away_goals'),
+        func.coalesce(away.c.wins, 0).label('away_wins')
+    ).select_from(Team).outerjoin(home, home.c.team_id == Team.id).outerjoin(away, away.c.team_id == Team.id)
+
+def _rate(total, played):
+    # 在 Python 里取整：SQL 的 ROUND 把 .5 向上舍入，Python 的 round 舍入到偶数
+    return round(total / max(played, 1), 2)
+
 async def update_team_stats(db: Session):
-    """更新球队统计数据"""
+    """更新球队统计数据：一条查询算出所有球队最近的主客场数据，再用一条 INSERT ... ON CONFLICT 写回"""
     try:
-        # 获取所有球队
-        teams = db.execute(select(Team)).scalars().all()
-        
-        for team in teams:
-            # 主场比赛
-            home_matches = db.execute(
-                select(Match).where(
-                    Match.home_team_id == team.id,
-                    Match.status == 'FINISHED'
-                ).order_by(Match.date.desc()).limit(10)
-            ).scalars().all()
-            
-            # 客场比赛
-            away_matches = db.execute(
-                select(Match).where(
-                    Match.away_team_id == team.id,
-                    Match.status == 'FINISHED'
-                ).order_by(Match.date.desc()).limit(10)
-            ).scalars().all()
-            
-            # 计算统计数据
-            home_goals = sum([m.home_goals for m in home_matches if m.home_goals is not None])
-            away_goals = sum([m.away_goals for m in away_matches if m.away_goals is not None])
-            
-            home_wins = sum([1 for m in home_matches if m.home_goals is not None and m.away_goals is not None and m.home_goals > m.away_goals])
-            away_wins = sum([1 for m in away_matches if m.home_goals is not None and m.away_goals is not None and m.away_goals > m.home_goals])
-            
-            total_home = len(home_matches)
-            total_away = len(away_matches)
-            
-            # 准备数据
-            stats_data = {
-                'team_id': team.id,
-                'avg_goals_home': round(home_goals / max(total_home, 1), 2),
-                'avg_goals_away': round(away_goals / max(total_away, 1), 2),
-                'win_rate_home': round(home_wins / max(total_home, 1), 2),
-                'win_rate_away': round(away_wins / max(total_away, 1), 2),
-                'total_matches': total_home + total_away,
-                'last_updated': datetime.datetime.utcnow()
-            }
-            
-            # 使用SQLite兼容的upsert方法
-            try:
-                # 尝试查找现有记录
-                existing_stats = db.execute(
-                    select(TeamStats).where(TeamStats.team_id == stats_data['team_id'])
-                ).scalar_one_or_none()
-                
-                if existing_stats:
-                    # 如果存在，更新记录
-                    for key, value in stats_data.items():
-                        setattr(existing_stats, key, value)
-                else:
-                    # 如果不存在，创建新记录
-                    new_stats = TeamStats(**stats_data)
-                    db.add(new_stats)
-            except Exception as e:
-                logger.error(f"处理球队 {team.id} 统计数据时出错: {str(e)}")
-            
+        now = datetime.datetime.utcnow()
+        rows = [{
+            'team_id': row.team_id,
+            'avg_goals_home': _rate(row.home_goals, row.home_played),
+            'avg_goals_away': _rate(row.away_goals, row.away_played),
+            'win_rate_home': _rate(row.home_wins, row.home_played),
+            'win_rate_away': _rate(row.away_wins, row.away_played),
+            'total_matches': row.home_played + row.away_played,
+            'last_updated': now
+        } for row in db.execute(team_stats_query())]
+        upsert_all(db, TeamStats, rows, 'team_id')
         db.commit()
-        logger.info(f"更新了 {len(teams)} 支球队的统计数据")
+        logger.info(f"更新了 {len(rows)} 支球队的统计数据")
         
     except Exception as e:
         db.rollback()
@@ -627,18 +536,33 @@ async def run_sync():
         await sync_football_data_teams(db)
         await sync_juhe_football_teams(db)
         
-        # 2. 同步比赛数据
-        await sync_matches_from_apis(db)
-        await sync_matches_from_scrapers(db)
+        # 2. 同步比赛数据：先让球队索引包含刚同步的球队，整个同步过程共用一个名称解析器
+        team_index.refresh(wait=True)
+        resolver = TeamNameResolver(db)
+        await sync_matches_from_apis(db, resolver)
+        await sync_matches_from_scrapers(db, resolver)
+        logger.info(f"比赛数据球队名称解析: {resolver.get_stats()}")
+        
+        # 2.1 仍未匹配的名称写出后按国家/联赛分块批量匹配，高置信度结果写回别名，其余写入审核文件
+        alias_journal.flush()
+        resolve_unmatched_names(db)
         
         # 3. 更新统计数据
         await update_team_stats(db)
+        # 未来赛程的批量预测只在主应用(根目录 app)的同步中进行：本项目的 PredictionService
+        # 按球队名称读取 sqlite3 表 team_stats.stats_data 的特征，不能对这里写入的统计数据打分
         
         # 4. 更新别名
         await update_team_aliases(db)
         
+        # 5. 球队数据已提交，后台重建共享球队索引(表未变化时不会替换)
+        team_index.refresh()
+        
         logger.info("数据同步完成")
         return True
     except Exception as e:
         logger.error(f"数据同步过程失败: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+    finally:
+        # 同步结束后释放连接池，下次同步可能在新的事件循环中运行
+        await http_client.close()
\ No newline at end of file
@@ -0,0 +1,101 @@
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import sqlite, postgresql
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的数据库方言
+ON_CONFLICT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _existing_keys(db: Session, table, key, keys):
+    """一次查询出一批键中已存在的键"""
+    return set(db.execute(select(table.c[key]).where(table.c[key].in_(keys))).scalars())
+
+def _upsert_chunk(db: Session, table, key, columns, chunk, existing, dialect_insert):
+    update_columns = [c for c in columns if c != key]
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(chunk)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={c: stmt.excluded[c] for c in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+        db.execute(stmt)
+        return
+
+    # 其他数据库：已存在的行用一条带绑定参数的 UPDATE 批量执行，其余批量 INSERT
+    new_rows = [row for row in chunk if row[key] not in existing]
+    # 绑定参数不能与 SET 中的列同名，加下划线前缀
+    old_rows = [{f'_{c}': value for c, value in row.items()} for row in chunk if row[key] in existing]
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    if old_rows and update_columns:
+        stmt = update(table).where(table.c[key] == bindparam(f'_{key}')).values(
+            {c: bindparam(f'_{c}') for c in update_columns}
+        )
+        db.execute(stmt, old_rows)
+
+def bulk_upsert(db: Session, model, rows, key: str, chunk_size: int = None):
+    """按唯一键批量插入或更新数据，返回 {'inserted': 插入行数, 'updated': 更新行数}
+
+    SQLite 和 PostgreSQL 使用 INSERT ... ON CONFLICT DO UPDATE，每批一条语句；
+    其他数据库先查出已存在的键，再分别批量插入和更新。只更新行中给出的列，
+    没有给出的列(例如球队的中文名和别名)保持原值。同一批中重复的键只保留最后一行。
+    不提交事务，由调用方提交。
+    """
+    chunk_size = chunk_size or settings.SYNC_UPSERT_CHUNK_SIZE
+    table = model.__table__
+
+    # 同一条 INSERT 里同一个键出现两次会报错，保留最后一行
+    unique_rows = {}
+    for row in rows:
+        unique_rows[row[key]] = row
+    # 多行 VALUES 要求每行的列相同，按列集合分组
+    groups = {}
+    for row in unique_rows.values():
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    dialect_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    inserted = updated = 0
+    for columns, group in groups.items():
+        for chunk in _chunks(group, chunk_size):
+            # 插入和更新的行数：写入前查询这一批中已存在的键
+            existing = _existing_keys(db, table, key, [row[key] for row in chunk])
+            _upsert_chunk(db, table, key, columns, chunk, existing, dialect_insert)
+            inserted += len(chunk) - len(existing)
+            updated += len(existing)
+
+    logger.debug(f"批量写入 {table.name}: 插入 {inserted} 行, 更新 {updated} 行")
+    return {'inserted': inserted, 'updated': updated}
+
+def upsert_all(db: Session, model, rows, key: str):
+    """用一条 INSERT ... ON CONFLICT DO UPDATE 语句(executemany)写入所有行，返回写入的行数
+
+    不查询已存在的键，因此不区分插入和更新；所有行的列必须相同。
+    不支持 ON CONFLICT 的数据库退回 bulk_upsert。不提交事务，由调用方提交。
+    """
+    if not rows:
+        return 0
+    dialect_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        counts = bulk_upsert(db, model, rows, key)
+        return counts['inserted'] + counts['updated']
+
+    stmt = dialect_insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={c: stmt.excluded[c] for c in rows[0] if c != key}
+    )
+    db.execute(stmt, rows)
+    logger.debug(f"批量写入 {model.__table__.name}: {len(rows)} 行")
+    return len(rows)
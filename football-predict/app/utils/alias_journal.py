@@ -0,0 +1,239 @@
+import os
+import csv
+import time
+import atexit
+import threading
+from datetime import datetime
+from sqlalchemy import select
+
+from app.data.database import Team, SessionLocal
+from app.utils.team_index import (
+    team_index, parse_aliases, load_learned_aliases, rotated_journals, read_journal,
+    LEARNED_ALIASES_FILE, LEARNED_ALIASES_JOURNAL
+)
+from app.core.config import settings
+from app.core.logging import logger
+
+UNMATCHED_TEAMS_FILE = "data/unmatched_teams.csv"
+
+def _ensure_dir(filename):
+    dir_name = os.path.dirname(filename)
+    if dir_name and not os.path.exists(dir_name):
+        os.makedirs(dir_name)
+
+class AliasJournal:
+    """学习别名和未匹配名称的缓冲日志
+
+    本进程新学习的别名保存在写时复制的字典中，读取不加锁，也不修改共享球队索引；
+    请求中只把记录放入内存缓冲区，由后台线程定期批量写出：
+    新别名追加到日志文件，并在一个事务中写入球队的别名列表；
+    未匹配名称按 (名称, 来源) 去重计数，并记下最近一次出现时的国家和联赛，供批量匹配分块。日志文件定期压缩进学习别名快照文件。
+    """
+
+    def __init__(self, flush_interval: float, compact_interval: float):
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending_aliases = []
+        # 别名(小写) -> 球队ID，只整体替换，不原地修改
+        self._learned = {}
+        # (名称, 来源) -> [次数, 首次出现时间, 最近出现时间, 国家, 联赛]
+        self._unmatched = None
+        self._unmatched_dirty = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_compacted = datetime.now()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="alias-journal", daemon=True)
+            self._thread.start()
+
+    def learn(self, alias: str, team_id: int):
+        """记录新学习的别名，稍后批量写出；本进程已学习过时返回 False"""
+        alias_lower = alias.lower()
+        with self._lock:
+            if alias_lower in self._learned:
+                return False
+            learned = dict(self._learned)
+            learned[alias_lower] = team_id
+            self._learned = learned
+            self._pending_aliases.append((alias, team_id))
+            self._ensure_started()
+        return True
+
+    def learned_alias(self, alias_lower: str):
+        """本进程新学习的别名对应的球队ID，没有时返回 None"""
+        return self._learned.get(alias_lower)
+
+    def record_unmatched(self, name: str, source: str = None, country: str = None, league: str = None):
+        """记录未匹配的名称，同一名称只累加次数"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            if self._unmatched is None:
+                self._unmatched = self._load_unmatched()
+            entry = self._unmatched.get((name, source or ''))
+            if entry:
+                entry[0] += 1
+                entry[2] = now
+                entry[3] = country or entry[3]
+                entry[4] = league or entry[4]
+            else:
+                self._unmatched[(name, source or '')] = [1, now, now, country or '', league or '']
+            self._unmatched_dirty = True
+            self._ensure_started()
+
+    def _load_unmatched(self):
+        """读取已有的未匹配名称统计，兼容旧的逐条追加格式 (name, source, timestamp) 和没有国家/联赛列的格式"""
+        unmatched = {}
+        if not os.path.exists(UNMATCHED_TEAMS_FILE):
+            return unmatched
+        try:
+            with open(UNMATCHED_TEAMS_FILE, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None) or []
+                counted = 'count' in header
+                for row in reader:
+                    if counted and len(row) >= 5:
+                        unmatched[(row[0], row[1])] = [int(row[2]), row[3], row[4],
+                                                       row[5] if len(row) > 5 else '',
+                                                       row[6] if len(row) > 6 else '']
+                    elif not counted and len(row) >= 3:
+                        entry = unmatched.get((row[0], row[1]))
+                        if entry:
+                            entry[0] += 1
+                            entry[2] = row[2]
+                        else:
+                            unmatched[(row[0], row[1])] = [1, row[2], row[2], '', '']
+        except Exception as e:
+            logger.error(f"读取未匹配名称记录失败: {str(e)}")
+        return unmatched
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if (datetime.now() - self._last_compacted).total_seconds() >= self.compact_interval:
+                self.compact()
+
+    def flush(self):
+        """把缓冲区写出：别名追加到日志并一次性更新数据库，未匹配统计整体重写"""
+        with self._flush_lock:
+            with self._lock:
+                aliases, self._pending_aliases = self._pending_aliases, []
+                unmatched = dict(self._unmatched) if self._unmatched_dirty else None
+                if unmatched is not None:
+                    unmatched = {key: list(value) for key, value in unmatched.items()}
+                self._unmatched_dirty = False
+
+            if aliases:
+                self._write_journal(aliases)
+                self._update_team_aliases(aliases)
+            if unmatched is not None:
+                self._write_unmatched(unmatched)
+
+    def _write_journal(self, aliases):
+        try:
+            _ensure_dir(LEARNED_ALIASES_JOURNAL)
+            with open(LEARNED_ALIASES_JOURNAL, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                for alias, team_id in aliases:
+                    writer.writerow([alias.lower(), team_id])
+            logger.debug(f"追加了 {len(aliases)} 个学习别名到日志")
+        except Exception as e:
+            logger.error(f"保存学习别名失败: {str(e)}")
+
+    def _update_team_aliases(self, aliases):
+        """在一个事务中把新别名合并进对应球队的别名列表"""
+        by_team = {}
+        for alias, team_id in aliases:
+            by_team.setdefault(team_id, []).append(alias)
+
+        db = SessionLocal()
+        try:
+            teams = db.execute(select(Team).where(Team.id.in_(list(by_team)))).scalars().all()
+            updated = 0
+            for team in teams:
+                aliases_list = list(parse_aliases(team.aliases))
+                new_aliases = [a for a in by_team[team.id] if a not in aliases_list]
+                if new_aliases:
+                    # aliases 是 JSON 列，直接赋列表，由列类型负责编码
+                    team.aliases = aliases_list + new_aliases
+                    updated += 1
+            db.commit()
+            if updated:
+                logger.info(f"已将 {len(aliases)} 个新别名写入 {updated} 支球队的别名列表")
+                # 球队表已变化，后台重建共享索引
+                team_index.refresh()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"更新球队别名失败: {str(e)}")
+        finally:
+            db.close()
+
+    def _write_unmatched(self, unmatched):
+        try:
+            _ensure_dir(UNMATCHED_TEAMS_FILE)
+            tmp_path = f"{UNMATCHED_TEAMS_FILE}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'source', 'count', 'first_seen', 'last_seen', 'country', 'league'])
+                for (name, source), (count, first_seen, last_seen, country, league) in sorted(
+                    unmatched.items(), key=lambda item: -item[1][0]
+                ):
+                    writer.writerow([name, source, count, first_seen, last_seen, country, league])
+            os.replace(tmp_path, UNMATCHED_TEAMS_FILE)
+        except Exception as e:
+            logger.error(f"记录未匹配名称失败: {str(e)}")
+
+    def compact(self):
+        """把日志合并进学习别名快照文件
+
+        先把日志改名，之后的追加(包括其他进程)都写入新的日志文件，再把改名后的日志合并进快照并删除；
+        上次压缩中断时留下的已改名日志一并合并。
+        """
+        with self._flush_lock:
+            self._last_compacted = datetime.now()
+            if os.path.exists(LEARNED_ALIASES_JOURNAL):
+                try:
+                    os.replace(LEARNED_ALIASES_JOURNAL,
+                               f"{LEARNED_ALIASES_JOURNAL}.{time.time_ns()}-{os.getpid()}")
+                except FileNotFoundError:
+                    # 其他进程刚刚改名
+                    pass
+            journals = rotated_journals()
+            if not journals:
+                return
+            try:
+                learned_aliases = load_learned_aliases(journal=None)
+                for journal in journals:
+                    read_journal(journal, learned_aliases)
+                _ensure_dir(LEARNED_ALIASES_FILE)
+                tmp_path = f"{LEARNED_ALIASES_FILE}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['alias', 'team_id'])
+                    for alias, team_id in learned_aliases.items():
+                        writer.writerow([alias, team_id])
+                os.replace(tmp_path, LEARNED_ALIASES_FILE)
+                for journal in journals:
+                    os.remove(journal)
+                logger.info(f"压缩学习别名日志: 共 {len(learned_aliases)} 个学习别名")
+            except Exception as e:
+                logger.error(f"压缩学习别名日志失败: {str(e)}")
+
+    def close(self):
+        """进程退出前写出缓冲区并压缩日志"""
+        self._stop.set()
+        self.flush()
+        self.compact()
+
+# 进程级别名日志
+alias_journal = AliasJournal(
+    flush_interval=settings.ALIAS_JOURNAL_FLUSH_INTERVAL,
+    compact_interval=settings.ALIAS_JOURNAL_COMPACT_INTERVAL
+)
+
+def get_alias_journal():
+    return alias_journal
@@ -0,0 +1,269 @@
+import os
+import csv
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from fuzzywuzzy import fuzz
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.data.database import Team
+from app.utils.team_index import team_index, get_team_index, parse_aliases
+from app.utils.fuzzy_index import get_fuzzy_index, token_sort_key
+from app.utils.alias_journal import UNMATCHED_TEAMS_FILE
+from app.core.config import settings
+from app.core.logging import logger
+
+ALIAS_REVIEW_FILE = "data/alias_review.csv"
+
+# 每个待匹配名称按相似度矩阵取前几个候选名称形式做精确打分
+TOP_CANDIDATES = 5
+
+def _score_shard(vectorizer, names, candidate_forms, candidate_sorted):
+    """对一批名称计算相似度矩阵，返回每个名称得分最高的若干 (候选下标, 得分)
+
+    先用字符 n-gram TF-IDF 的余弦相似度矩阵筛出候选，再用与 TeamMatcher 相同的
+    fuzz 得分精确打分。定义在模块顶层，以便在进程池中执行。
+    """
+    if not names or not candidate_forms:
+        return [[] for _ in names]
+    query_lower = [name.lower() for name in names]
+    similarity = (vectorizer.transform(query_lower) @ vectorizer.transform(candidate_forms).T).toarray()
+    k = min(TOP_CANDIDATES, len(candidate_forms))
+    top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+
+    results = []
+    for row, query in enumerate(query_lower):
+        query_sorted = token_sort_key(query)
+        scored = []
+        for column in top[row]:
+            score = max(
+                fuzz.ratio(query, candidate_forms[column]),
+                fuzz.ratio(query_sorted, candidate_sorted[column])
+            )
+            scored.append((int(column), score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        results.append(scored)
+    return results
+
+class BulkTeamResolver:
+    """批量匹配新数据源的球队名称
+
+    名称先按国家/联赛分块，只与同一块内的球队比较；每块计算一次相似度矩阵，
+    名称很多时分片交给进程池。高置信度的结果在一个事务中写入球队别名，
+    其余结果写入人工审核文件。
+    """
+
+    def __init__(self, db: Session, accept_threshold: int = None, review_threshold: int = None,
+                 shard_size: int = None, workers: int = None):
+        self.db = db
+        self.accept_threshold = settings.BULK_MATCH_ACCEPT_THRESHOLD if accept_threshold is None else accept_threshold
+        self.review_threshold = settings.BULK_MATCH_REVIEW_THRESHOLD if review_threshold is None else review_threshold
+        self.shard_size = settings.BULK_MATCH_SHARD_SIZE if shard_size is None else shard_size
+        self.workers = (settings.BULK_MATCH_WORKERS or os.cpu_count() or 1) if workers is None else workers
+
+        self.index = get_team_index()
+        fuzzy_index = get_fuzzy_index(self.index)
+        self.form_team = fuzzy_index.form_team
+        self.form_names = fuzzy_index.form_names
+        self.form_lower = fuzzy_index.form_lower
+        self.form_sorted = fuzzy_index.form_sorted
+
+        # 分块：联赛 -> 名称形式下标，国家 -> 名称形式下标
+        self.by_league = {}
+        self.by_country = {}
+        for position, team in enumerate(self.form_team):
+            if team.league:
+                self.by_league.setdefault(str(team.league).lower(), []).append(position)
+            if team.country:
+                self.by_country.setdefault(str(team.country).lower(), []).append(position)
+
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(1, 3))
+        if self.form_lower:
+            self.vectorizer.fit(self.form_lower)
+
+    def _block(self, country=None, league=None):
+        """名称所属的候选块，没有国家/联赛信息或块为空时与所有球队比较"""
+        if league and str(league).lower() in self.by_league:
+            return ('league', str(league).lower()), self.by_league[str(league).lower()]
+        if country and str(country).lower() in self.by_country:
+            return ('country', str(country).lower()), self.by_country[str(country).lower()]
+        return ('all', ''), list(range(len(self.form_lower)))
+
+    def _exact_match(self, name):
+        """已经能精确匹配的名称不需要再打分"""
+        name_lower = name.lower()
+        team_id = self.index.learned_aliases.get(name_lower)
+        if team_id is not None:
+            return self.index.get(team_id)
+        return (self.index.by_name.get(name_lower) or self.index.by_zh_name.get(name)
+                or self.index.by_alias.get(name_lower))
+
+    def resolve(self, entries):
+        """匹配 (名称, 来源, 国家, 联赛) 列表，返回每个 (名称, 来源) 的匹配结果
+
+        结果的 status 为 exact、accepted、review 或 unmatched。
+        """
+        results = {}
+        blocks = {}
+        for name, source, country, league in entries:
+            name = (name or '').strip()
+            key = (name, source or '')
+            if not name or key in results:
+                continue
+            team = self._exact_match(name)
+            if team:
+                results[key] = self._result(name, source, country, league, 'exact', team, team.name, 100)
+                continue
+            results[key] = None
+            key, positions = self._block(country, league)
+            blocks.setdefault(key, (positions, []))[1].append((name, source, country, league))
+
+        pending = sum(len(items) for _, items in blocks.values())
+        logger.info(f"批量匹配 {len(results)} 个 (名称, 来源): {len(results) - pending} 个精确匹配, "
+                    f"{pending} 个分到 {len(blocks)} 个候选块")
+
+        jobs = []
+        for positions, items in blocks.values():
+            forms = [self.form_lower[p] for p in positions]
+            sorted_forms = [self.form_sorted[p] for p in positions]
+            for start in range(0, len(items), self.shard_size):
+                shard = items[start:start + self.shard_size]
+                jobs.append((positions, shard, (self.vectorizer, [item[0] for item in shard], forms, sorted_forms)))
+
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+                futures = [executor.submit(_score_shard, *args) for _, _, args in jobs]
+                scored_shards = [future.result() for future in futures]
+        else:
+            scored_shards = [_score_shard(*args) for _, _, args in jobs]
+
+        for (positions, shard, _), scored in zip(jobs, scored_shards):
+            for (name, source, country, league), candidates in zip(shard, scored):
+                results[(name, source or '')] = self._decide(name, source, country, league, positions, candidates)
+        return list(results.values())
+
+    def _decide(self, name, source, country, league, positions, candidates):
+        if not candidates:
+            return self._result(name, source, country, league, 'unmatched', None, None, 0)
+        column, score = candidates[0]
+        team = self.form_team[positions[column]]
+        matched_name = self.form_names[positions[column]]
+        # 另一支球队得分相同时无法自动确定
+        ambiguous = any(
+            s == score and self.form_team[positions[c]].id != team.id for c, s in candidates[1:]
+        )
+        if score >= self.accept_threshold and not ambiguous:
+            status = 'accepted'
+        elif score >= self.review_threshold:
+            status = 'review'
+        else:
+            status = 'unmatched'
+        return self._result(name, source, country, league, status, team, matched_name, score)
+
+    @staticmethod
+    def _result(name, source, country, league, status, team, matched_name, score):
+        return {
+            'name': name,
+            'source': source or '',
+            'country': country or '',
+            'league': league or '',
+            'status': status,
+            'team_id': team.id if team else None,
+            'team_name': team.name if team else None,
+            'matched_name': matched_name,
+            'score': score
+        }
+
+    def apply(self, results):
+        """在一个事务中把高置信度结果写入球队别名，返回写入的别名数"""
+        by_team = {}
+        for result in results:
+            if result['status'] == 'accepted':
+                by_team.setdefault(result['team_id'], []).append(result['name'])
+        if not by_team:
+            return 0
+
+        added = 0
+        try:
+            teams = self.db.execute(select(Team).where(Team.id.in_(list(by_team)))).scalars().all()
+            for team in teams:
+                aliases_list = list(parse_aliases(team.aliases))
+                new_aliases = [a for a in dict.fromkeys(by_team[team.id]) if a not in aliases_list]
+                if new_aliases:
+                    # aliases 是 JSON 列，直接赋列表，由列类型负责编码
+                    team.aliases = aliases_list + new_aliases
+                    added += len(new_aliases)
+            self.db.commit()
+            logger.info(f"批量匹配写入了 {added} 个新别名 ({len(teams)} 支球队)")
+            # 球队表已变化，后台重建共享索引
+            team_index.refresh()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量写入球队别名失败: {str(e)}")
+            return 0
+        return added
+
+    def write_review_file(self, results, filename=ALIAS_REVIEW_FILE):
+        """把需要人工确认和未匹配的名称写入审核文件，返回写入的行数"""
+        rows = [r for r in results if r['status'] in ('review', 'unmatched')]
+        rows.sort(key=lambda r: (r['status'] != 'review', -r['score'], r['name']))
+        dir_name = os.path.dirname(filename)
+        if dir_name and not os.path.exists(dir_name):
+            os.makedirs(dir_name)
+        try:
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'source', 'country', 'league', 'status',
+                                 'team_id', 'team_name', 'matched_name', 'score', 'generated_at'])
+                generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                for r in rows:
+                    writer.writerow([r['name'], r['source'], r['country'], r['league'], r['status'],
+                                     r['team_id'] or '', r['team_name'] or '', r['matched_name'] or '',
+                                     r['score'], generated_at])
+            logger.info(f"已写入 {len(rows)} 个待审核名称到 {filename}")
+        except Exception as e:
+            logger.error(f"写入审核文件失败: {str(e)}")
+        return len(rows)
+
+def load_unmatched_names(filename=UNMATCHED_TEAMS_FILE):
+    """读取未匹配名称统计，返回 (名称, 来源, 国家, 联赛) 列表，没有国家/联赛列的旧文件按空值处理"""
+    entries = []
+    if not os.path.exists(filename):
+        return entries
+    with open(filename, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        country_column = header.index('country') if 'country' in header else None
+        league_column = header.index('league') if 'league' in header else None
+        for row in reader:
+            if not row:
+                continue
+            country = row[country_column] if country_column is not None and len(row) > country_column else ''
+            league = row[league_column] if league_column is not None and len(row) > league_column else ''
+            entries.append((row[0], row[1] if len(row) > 1 else '', country or None, league or None))
+    return entries
+
+def resolve_unmatched_names(db: Session, entries=None):
+    """批量匹配未匹配名称：写回高置信度别名，其余写入审核文件"""
+    resolver = BulkTeamResolver(db)
+    results = resolver.resolve(load_unmatched_names() if entries is None else entries)
+    added = resolver.apply(results)
+    reviewed = resolver.write_review_file(results)
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    summary['aliases_added'] = added
+    summary['review_rows'] = reviewed
+    logger.info(f"批量匹配未匹配名称: {summary}")
+    return summary
+
+if __name__ == "__main__":
+    # 手动运行: python -m app.utils.bulk_resolution
+    from app.data.database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(resolve_unmatched_names(db))
+    finally:
+        db.close()
@@ -0,0 +1,176 @@
+import threading
+from collections import Counter
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+
+from app.core.logging import logger
+
+def normalize_team_name(name):
+    """规范化球队名称"""
+    if not name or not isinstance(name, str):
+        return ""
+
+    # 基本清理
+    normalized = name.strip()
+
+    # 常见数据源差异处理
+    replacements = {
+        # 英文名称常见变体
+        "FC": "",
+        "Football Club": "",
+        "United": "Utd",
+        # 中英文混合情况
+        "足球俱乐部": "",
+        "联": ""
+    }
+
+    for old, new in replacements.items():
+        normalized = normalized.replace(old, new)
+
+    # 移除多余空格
+    normalized = " ".join(normalized.split())
+
+    return normalized
+
+def token_sort_key(name):
+    """与 fuzz.token_sort_ratio 相同的预处理：清理、转小写后按词排序"""
+    tokens = utils.full_process(name, force_ascii=True).split()
+    return " ".join(sorted(tokens)).strip()
+
+class _CharPostings:
+    """字符倒排表：字符 -> (名称形式下标数组, 该字符在各名称形式中的出现次数)"""
+
+    def __init__(self, strings):
+        self.lengths = np.array([len(s) for s in strings], dtype=np.float64)
+        postings = {}
+        for i, s in enumerate(strings):
+            for char, count in Counter(s).items():
+                postings.setdefault(char, ([], []))
+                postings[char][0].append(i)
+                postings[char][1].append(count)
+        self.postings = {
+            char: (np.array(ids, dtype=np.intp), np.array(counts, dtype=np.int32))
+            for char, (ids, counts) in postings.items()
+        }
+
+    def upper_bounds(self, query):
+        """每个名称形式与 query 的 fuzz.ratio 上界
+
+        ratio = 2 * 公共子序列长度 / 总长度，公共子序列长度不超过两者的公共字符数，
+        因此用字符多重集的交集大小得到不会漏掉候选的上界。
+        """
+        common = np.zeros(len(self.lengths), dtype=np.float64)
+        for char, count in Counter(query).items():
+            posting = self.postings.get(char)
+            if posting is not None:
+                ids, counts = posting
+                common[ids] += np.minimum(counts, count)
+        total = self.lengths + len(query)
+        both_empty = total == 0
+        total[both_empty] = 1.0
+        # fuzz.ratio 结果四舍五入为整数，上界加 0.5
+        bounds = 200.0 * common / total + 0.5
+        # 两个空字符串被 fuzz.ratio 视为相同，得分 100
+        bounds[both_empty] = 100.5
+        return bounds
+
+class FuzzyNameIndex:
+    """模糊匹配候选索引：名称形式和规范化结果只在构建时计算一次
+
+    查询时先用字符倒排表计算每个名称形式的得分上界，按上界从高到低精确打分，
+    上界低于当前最高分后停止。得分和并列时的先后顺序与逐个遍历所有球队完全一致。
+    """
+
+    def __init__(self, teams, aliases_of):
+        # 与原有遍历顺序一致的名称形式及其预处理结果
+        self.form_team = []
+        self.form_names = []
+        self.form_lower = []
+        self.form_sorted = []
+        # 规范化名称(小写) -> 第一支匹配的球队
+        self.by_normalized_name = {}
+
+        for team in teams:
+            name_forms = []
+            if team.name:
+                name_forms.append(team.name)
+                name_forms.append(normalize_team_name(team.name))
+                self.by_normalized_name.setdefault(normalize_team_name(team.name).lower(), team)
+            if team.zh_name:
+                name_forms.append(team.zh_name)
+            if team.official_name:
+                name_forms.append(team.official_name)
+                name_forms.append(normalize_team_name(team.official_name))
+            name_forms.extend(aliases_of(team))
+
+            for name in name_forms:
+                if not name or not isinstance(name, str):
+                    continue
+                self.form_team.append(team)
+                self.form_names.append(name)
+                self.form_lower.append(name.lower())
+                self.form_sorted.append(token_sort_key(name.lower()))
+
+        self.by_normalized_name.pop("", None)
+        self._lower_postings = _CharPostings(self.form_lower)
+        self._sorted_postings = _CharPostings(self.form_sorted)
+
+    def __len__(self):
+        return len(self.form_names)
+
+    def match_normalized(self, normalized_query_lower):
+        """规范化名称精确匹配"""
+        return self.by_normalized_name.get(normalized_query_lower)
+
+    def best_match(self, query_lower, threshold):
+        """返回 (球队, 得分, 命中的名称形式)，没有达到阈值的候选时返回 (None, 0, None)"""
+        if not self.form_names:
+            return None, 0, None
+
+        query_sorted = token_sort_key(query_lower)
+        bounds = np.maximum(
+            self._lower_postings.upper_bounds(query_lower),
+            self._sorted_postings.upper_bounds(query_sorted)
+        )
+        # 原有逻辑要求得分严格大于 0
+        min_score = max(threshold, 1)
+        candidates = np.flatnonzero(bounds >= min_score)
+        # 上界从高到低，上界相同时保持原有顺序
+        candidates = candidates[np.argsort(-bounds[candidates], kind='stable')]
+
+        best_score = 0
+        best_position = None
+        for i in candidates:
+            if bounds[i] < max(best_score, min_score):
+                break
+            score = max(
+                fuzz.ratio(query_lower, self.form_lower[i]),
+                fuzz.ratio(query_sorted, self.form_sorted[i])
+            )
+            if score < min_score:
+                continue
+            # 原有逻辑只在得分更高时替换，分数相同时保留遍历顺序靠前的名称形式
+            if best_position is None or score > best_score or (score == best_score and i < best_position):
+                best_score = score
+                best_position = i
+
+        if best_position is None:
+            return None, 0, None
+        return self.form_team[best_position], best_score, self.form_names[best_position]
+
+_lock = threading.Lock()
+_latest = (None, None)
+
+def get_fuzzy_index(index):
+    """获取球队索引对应的模糊匹配索引，球队索引更新后首次使用时重建"""
+    global _latest
+    source, fuzzy_index = _latest
+    if source is index:
+        return fuzzy_index
+    with _lock:
+        source, fuzzy_index = _latest
+        if source is not index:
+            fuzzy_index = FuzzyNameIndex(index.teams, index.aliases)
+            _latest = (index, fuzzy_index)
+            logger.info(f"构建模糊匹配索引 (第 {index.generation} 代): {len(fuzzy_index)} 个名称形式")
+    return fuzzy_index
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 负缓存条目的值
+NOT_FOUND = None
+
+class MatchCache:
+    """进程级球队名称匹配结果缓存(LRU + TTL)
+
+    匹配成功时缓存球队ID，匹配失败时做负缓存(较短的TTL)，避免重复的完整匹配和未匹配记录。
+    缓存与球队索引版本绑定，切换到更新的索引后整体失效；仍在使用旧索引的匹配器不读写缓存，
+    避免新旧索引交替访问时反复清空。可选地持久化到磁盘，重启后版本一致时恢复。
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float, path: str = None, save_interval: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.save_interval = save_interval
+        # 键 -> (球队ID 或 NOT_FOUND, 过期时间戳)
+        self._entries = OrderedDict()
+        self._version = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_saved = time.time()
+        self._saving = False
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        if self.path:
+            atexit.register(self.save)
+
+    def _sync_version(self, index):
+        """切换到更新的索引时清空缓存，首次遇到某个版本时尝试从磁盘恢复；索引比当前的旧时返回 False"""
+        if index.generation < self._generation:
+            return False
+        self._generation = index.generation
+        version = index.version
+        if version == self._version:
+            return True
+        if self._version is not None:
+            self.invalidations += 1
+            logger.info(f"球队索引已更新，清空 {len(self._entries)} 条匹配缓存")
+        self._entries.clear()
+        self._version = version
+        self._dirty = False
+        self._load(version)
+        return True
+
+    def get(self, index, key):
+        """返回 (是否命中, 球队ID 或 NOT_FOUND)"""
+        with self._lock:
+            entry = self._entries.get(key) if self._sync_version(index) else None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            team_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if team_id is NOT_FOUND:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, team_id
+
+    def set(self, index, key, team_id):
+        """缓存匹配结果，team_id 为 NOT_FOUND 时做负缓存"""
+        with self._lock:
+            if not self._sync_version(index):
+                return
+            ttl = self.negative_ttl if team_id is NOT_FOUND else self.ttl
+            self._entries[key] = (team_id, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+            should_save = self.path and not self._saving and time.time() - self._last_saved >= self.save_interval
+            if should_save:
+                self._saving = True
+
+        if should_save:
+            threading.Thread(target=self._save_in_background, name="match-cache-save", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def _load(self, version):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != version:
+                logger.info("匹配缓存文件与当前球队索引版本不一致，忽略")
+                return
+            now = time.time()
+            for key, team_id, expires_at in data.get('entries', []):
+                if expires_at > now:
+                    self._entries[key] = (team_id, expires_at)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            logger.info(f"从文件恢复了 {len(self._entries)} 条匹配缓存")
+        except Exception as e:
+            logger.error(f"加载匹配缓存失败: {str(e)}")
+
+    def save(self):
+        """将未过期的条目写入磁盘(按最近使用顺序)"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or self._version is None:
+                return
+            now = time.time()
+            data = {
+                'version': self._version,
+                'entries': [
+                    [key, team_id, expires_at]
+                    for key, (team_id, expires_at) in self._entries.items()
+                    if expires_at > now
+                ]
+            }
+            self._dirty = False
+            self._last_saved = now
+
+        try:
+            dir_name = os.path.dirname(self.path)
+            if dir_name:
+                os.makedirs(dir_name, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"保存了 {len(data['entries'])} 条匹配缓存到文件")
+        except Exception as e:
+            logger.error(f"保存匹配缓存失败: {str(e)}")
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        finally:
+            self._saving = False
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups * 100, 2) if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+# 进程级匹配缓存，所有 TeamMatcher 实例共享
+match_cache = MatchCache(
+    maxsize=settings.TEAM_MATCH_CACHE_MAXSIZE,
+    ttl=settings.TEAM_MATCH_CACHE_TTL,
+    negative_ttl=settings.TEAM_MATCH_NEGATIVE_TTL,
+    path=settings.TEAM_MATCH_CACHE_FILE or None
+)
+
+def get_match_cache():
+    return match_cache
@@ -0,0 +1,353 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import hashlib
+import threading
+from types import MappingProxyType
+from sqlalchemy import select
+
+from app.data.database import Team, SessionLocal
+from app.core.config import settings
+from app.core.logging import logger
+
+# 手工维护的别名表，修改后无需重启或同步即可生效
+ALIAS_FILE = "data/team_aliases.csv"
+LEARNED_ALIASES_FILE = "data/learned_aliases.csv"
+# 两次压缩之间新学习的别名，只追加写入，压缩时合并进 LEARNED_ALIASES_FILE
+LEARNED_ALIASES_JOURNAL = "data/learned_aliases.journal.csv"
+
+def parse_aliases(aliases_data):
+    """将别名数据转换为列表，无论其原始格式如何"""
+    if not aliases_data:
+        return []
+
+    if isinstance(aliases_data, list):
+        return aliases_data
+
+    if isinstance(aliases_data, tuple):
+        return list(aliases_data)
+
+    if isinstance(aliases_data, str):
+        # 尝试解析JSON
+        try:
+            parsed = json.loads(aliases_data)
+            if isinstance(parsed, list):
+                return parsed
+            return [aliases_data]  # 如果不是列表，就当作单一字符串
+        except json.JSONDecodeError:
+            # 不是JSON，尝试按顿号分割
+            return aliases_data.split('、')
+
+    # 其他情况，尝试转换为字符串后按顿号分割
+    try:
+        return str(aliases_data).split('、')
+    except:
+        logger.warning(f"无法处理的别名格式: {type(aliases_data)} - {aliases_data}")
+        return []
+
+def rotated_journals(journal=LEARNED_ALIASES_JOURNAL):
+    """压缩时改名、尚未合并进快照文件的日志，按改名先后排序"""
+    return sorted(glob.glob(f"{glob.escape(journal)}.*"))
+
+def read_journal(journal, learned_aliases):
+    """按顺序把日志中的别名加入 learned_aliases，已有的别名不覆盖"""
+    with open(journal, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                learned_aliases.setdefault(row[0].lower(), int(row[1]))
+
+def load_learned_aliases(filename=LEARNED_ALIASES_FILE, journal=LEARNED_ALIASES_JOURNAL):
+    """加载学习过的别名：先读取快照文件，再按顺序应用正在压缩的日志和当前日志中的新别名"""
+    learned_aliases = {}
+
+    try:
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # 跳过标题行
+                for row in reader:
+                    if len(row) >= 2:
+                        alias, team_id = row[0], int(row[1])
+                        learned_aliases[alias.lower()] = team_id
+        if journal:
+            for path in rotated_journals(journal) + [journal]:
+                # 日志可能刚被压缩删除
+                if os.path.exists(path):
+                    read_journal(path, learned_aliases)
+        if learned_aliases:
+            logger.info(f"从文件加载了 {len(learned_aliases)} 个学习别名")
+    except Exception as e:
+        logger.error(f"加载学习别名失败: {str(e)}")
+    return learned_aliases
+
+def load_alias_file(filename=ALIAS_FILE):
+    """读取别名表，返回 球队ID -> [中文名, 别名...]"""
+    file_aliases = {}
+    if not os.path.exists(filename):
+        return file_aliases
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            with open(filename, 'r', encoding=encoding, newline='') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        team_id = int(row.get('id') or '')
+                    except ValueError:
+                        continue
+                    names = [row.get('zh_name') or '']
+                    names.extend((row.get('aliases') or '').split('、'))
+                    names = [name.strip() for name in names if name and name.strip()]
+                    if names:
+                        file_aliases.setdefault(team_id, []).extend(names)
+            return file_aliases
+        except UnicodeDecodeError:
+            file_aliases = {}
+        except Exception as e:
+            logger.error(f"读取别名表失败: {str(e)}")
+            return {}
+    logger.error(f"无法识别别名表 {filename} 的编码")
+    return {}
+
+# 与脱离会话的 ORM 对象相比的内存占用(tracemalloc，SQLite，每队 2 个别名)：
+#   球队数   球队对象(ORM -> 记录)   整个 TeamIndex(ORM -> 记录)
+#   1k       1.6 MB -> 0.6 MB        2.5 MB -> 1.3 MB
+#   10k      16.1 MB -> 6.5 MB       25.2 MB -> 13.3 MB
+#   50k      81.0 MB -> 32.8 MB      130.7 MB -> 71.0 MB
+class TeamRecord:
+    """球队的精简只读记录，与数据库会话无关，别名已预先解析为元组"""
+
+    __slots__ = ('id', 'name', 'official_name', 'zh_name', 'aliases', 'league', 'country', 'logo_url', 'source')
+
+    def __init__(self, id, name, official_name, zh_name, aliases, league, country, logo_url, source):
+        setattr_ = object.__setattr__
+        setattr_(self, 'id', id)
+        setattr_(self, 'name', name)
+        setattr_(self, 'official_name', official_name)
+        setattr_(self, 'zh_name', zh_name)
+        setattr_(self, 'aliases', tuple(a for a in parse_aliases(aliases) if isinstance(a, str) and a))
+        # 联赛、国家、来源取值很少，驻留后所有记录共享同一个字符串
+        setattr_(self, 'league', sys.intern(league) if isinstance(league, str) else league)
+        setattr_(self, 'country', sys.intern(country) if isinstance(country, str) else country)
+        setattr_(self, 'logo_url', logo_url)
+        setattr_(self, 'source', sys.intern(source) if isinstance(source, str) else source)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"TeamRecord 是只读的，不能修改 {name}")
+
+    def __repr__(self):
+        return f"TeamRecord(id={self.id!r}, name={self.name!r})"
+
+# 构建 TeamRecord 需要的列，按 __init__ 参数顺序
+TEAM_RECORD_COLUMNS = (
+    Team.id, Team.name, Team.official_name, Team.zh_name, Team.aliases,
+    Team.league, Team.country, Team.logo_url, Team.source
+)
+
+class TeamIndex:
+    """只读的球队索引，构建后在所有请求之间共享，不再修改"""
+
+    def __init__(self, teams, generation: int, digest: str, learned_aliases: dict = None, file_aliases: dict = None):
+        self.teams = tuple(teams)
+        self.generation = generation
+        self.digest = digest
+        self.built_at = time.time()
+        # 已持久化的学习别名，只读；本进程新学习的别名在别名日志中，重建时从文件重新加载
+        self.learned_aliases = MappingProxyType(dict(learned_aliases or {}))
+        # 别名表中的名称，优先级低于数据库中的名称
+        self.file_aliases = file_aliases if file_aliases is not None else {}
+        # 球队表、别名表和学习别名共同决定的版本，跨进程、跨重启一致
+        self.version = hashlib.sha1(
+            (digest
+             + json.dumps(sorted(self.learned_aliases.items()), ensure_ascii=False)
+             + json.dumps(sorted(self.file_aliases.items()), ensure_ascii=False)).encode('utf-8')
+        ).hexdigest()[:16]
+
+        self.by_id = {}
+        self.aliases_by_id = {}
+        # 精确匹配映射(先到先得，保持原有遍历顺序的优先级)，别名按小写存储
+        self.by_name = {}
+        self.by_zh_name = {}
+        self.by_alias = {}
+        # 所有名称形式到ID的映射，用于快速查找
+        self.name_to_id = {}
+
+        for team in self.teams:
+            self.by_id[team.id] = team
+            aliases = team.aliases
+            self.aliases_by_id[team.id] = aliases
+
+            if team.name:
+                self.by_name.setdefault(team.name.lower(), team)
+                self.name_to_id.setdefault(team.name.lower(), team.id)
+            if team.zh_name:
+                self.by_zh_name.setdefault(team.zh_name, team)
+                self.name_to_id.setdefault(team.zh_name, team.id)
+            if team.official_name:
+                self.name_to_id.setdefault(team.official_name.lower(), team.id)
+            for alias in aliases:
+                self.by_alias.setdefault(alias.lower(), team)
+                self.name_to_id.setdefault(alias.lower(), team.id)
+
+        for team_id, names in self.file_aliases.items():
+            team = self.by_id.get(team_id)
+            if team is None:
+                continue
+            aliases = list(self.aliases_by_id[team_id])
+            for alias in names:
+                if alias in aliases or alias == team.zh_name:
+                    continue
+                aliases.append(alias)
+                self.by_alias.setdefault(alias.lower(), team)
+                self.name_to_id.setdefault(alias.lower(), team.id)
+            self.aliases_by_id[team_id] = tuple(aliases)
+
+    def __len__(self):
+        return len(self.teams)
+
+    def get(self, team_id):
+        return self.by_id.get(team_id)
+
+    def aliases(self, team):
+        """返回预先解析好的别名元组"""
+        return self.aliases_by_id.get(team.id, ())
+
+def _digest_teams(teams):
+    """计算球队表内容摘要，用于判断表是否真正发生变化"""
+    h = hashlib.sha1()
+    for team in teams:
+        row = (team.id, team.name, team.official_name, team.zh_name, team.aliases, team.league, team.country)
+        h.update(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+def _file_signature(filenames):
+    """文件的 (修改时间, 大小)，文件不存在时为 None"""
+    signature = []
+    for filename in filenames:
+        try:
+            stat = os.stat(filename)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+class TeamIndexManager:
+    """管理进程级球队索引：首次使用时构建，之后在后台重建并原子替换"""
+
+    def __init__(self, check_interval: float = None, watch_interval: float = None,
+                 watched_files=(ALIAS_FILE, LEARNED_ALIASES_FILE)):
+        self.check_interval = settings.TEAM_INDEX_CHECK_INTERVAL if check_interval is None else check_interval
+        # 别名文件很小，只比较修改时间和大小，检查频率可以远高于球队表。
+        # 学习别名日志在匹配过程中不断追加，不作为重建条件：本进程新学习的别名由别名日志直接提供，
+        # 日志写出时会更新球队表并触发重建，压缩后快照文件变化也会触发重建
+        self.watch_interval = settings.ALIAS_WATCH_INTERVAL if watch_interval is None else watch_interval
+        self.watched_files = tuple(watched_files)
+        self._index = None
+        self._last_checked = 0.0
+        self._last_watched = 0.0
+        self._signature = None
+        self._lock = threading.Lock()
+        # 同一时间只有一个线程在重建索引
+        self._build_lock = threading.Lock()
+        self._refreshing = False
+
+    def _load_teams(self):
+        # 只查询需要的列并转换为 TeamRecord，不产生 ORM 对象和标识映射，可以安全地跨请求共享
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(*TEAM_RECORD_COLUMNS).order_by(Team.id)).all()
+            return [TeamRecord(*row) for row in rows]
+        finally:
+            db.close()
+
+    def _build(self, current):
+        """构建新索引；球队表和别名文件都没有变化时返回当前索引"""
+        # 先记录文件状态再读取，读取期间发生的修改会在下次检查时被发现
+        self._signature = _file_signature(self.watched_files)
+        teams = self._load_teams()
+        digest = _digest_teams(teams)
+        learned_aliases = load_learned_aliases()
+        file_aliases = load_alias_file()
+        if (current is not None and current.digest == digest and current.learned_aliases == learned_aliases
+                and current.file_aliases == file_aliases):
+            return current
+
+        generation = current.generation + 1 if current is not None else 1
+        index = TeamIndex(teams, generation, digest, learned_aliases, file_aliases)
+        logger.info(f"构建球队索引 (第 {generation} 代): {len(teams)} 支球队, {len(index.name_to_id)} 个名称映射")
+        return index
+
+    def get(self) -> TeamIndex:
+        """获取当前球队索引，第一次调用时同步构建"""
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    try:
+                        self._index = self._build(None)
+                    except Exception as e:
+                        logger.error(f"从数据库加载球队信息失败: {str(e)}")
+                        return TeamIndex([], 0, "")
+                    self._last_checked = time.monotonic()
+                    self._last_watched = self._last_checked
+                index = self._index
+        elif time.monotonic() - self._last_checked >= self.check_interval:
+            # 定期在后台检查其他进程(如同步任务)是否修改了球队表
+            self.refresh()
+        elif time.monotonic() - self._last_watched >= self.watch_interval:
+            self._last_watched = time.monotonic()
+            # 别名文件或学习别名被修改后在后台重建，重建完成前继续使用当前索引
+            if _file_signature(self.watched_files) != self._signature:
+                self.refresh()
+        return index
+
+    def _refresh(self):
+        with self._build_lock:
+            try:
+                new_index = self._build(self._index)
+                if new_index is not self._index:
+                    # 引用赋值是原子的，正在使用旧索引的请求不受影响
+                    self._index = new_index
+            except Exception as e:
+                logger.error(f"重建球队索引失败: {str(e)}")
+            finally:
+                self._last_checked = time.monotonic()
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        finally:
+            self._refreshing = False
+
+    def refresh(self, wait: bool = False):
+        """重建索引，只有球队表或别名表实际变化时才替换
+
+        默认在后台重建，已有后台重建在进行时直接返回。wait=True 时在当前线程重建：
+        正在进行的重建可能早于调用方刚提交的修改，所以先等它结束再重建一次。
+        """
+        if wait:
+            self._last_checked = time.monotonic()
+            self._refresh()
+            return
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._last_checked = time.monotonic()
+        threading.Thread(target=self._background_refresh, name="team-index-refresh", daemon=True).start()
+
+    @property
+    def generation(self):
+        return self._index.generation if self._index else 0
+
+    @property
+    def version(self):
+        return self._index.version if self._index else None
+
+# 进程级球队索引
+team_index = TeamIndexManager()
+
+def get_team_index() -> TeamIndex:
+    return team_index.get()
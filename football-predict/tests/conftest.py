@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试在临时目录中运行：app 按相对路径读写 data 下的文件、挂载 static 目录，
+# 两个数据库也放在临时目录，必须在导入 app 之前设置
+WORKDIR = tempfile.mkdtemp()
+os.makedirs(os.path.join(WORKDIR, "static"))
+os.makedirs(os.path.join(WORKDIR, "data"))
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/test.db"
+os.environ["DB_PATH"] = os.path.join(WORKDIR, "football.db")
+sys.path.insert(0, ROOT)
+
+def pytest_configure(config):
+    # testpaths 按启动目录解析，解析完成后再切换目录；app 在收集测试模块时才导入
+    os.chdir(WORKDIR)
+
+@pytest.fixture(scope="session", autouse=True)
+def _stop_background_writers():
+    """测试结束前写出别名日志并等待索引重建完成，避免进程退出时向已关闭的输出写日志"""
+    yield
+    from app.utils.alias_journal import alias_journal
+    from app.utils.team_index import team_index
+    alias_journal.close()
+    team_index.refresh(wait=True)
+
+@pytest.fixture
+def db():
+    """每个测试使用空的数据库表和空的匹配缓存"""
+    from app.data.database import Base, engine, SessionLocal
+    from app.utils.match_cache import match_cache
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    match_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,70 @@
+import os
+import csv
+
+import pytest
+
+from app.data.database import Team
+from app.utils import alias_journal as alias_journal_module
+from app.utils.alias_journal import AliasJournal
+from app.utils.team_index import (
+    load_learned_aliases, rotated_journals, LEARNED_ALIASES_FILE, LEARNED_ALIASES_JOURNAL
+)
+
+@pytest.fixture
+def journal(db):
+    for path in [LEARNED_ALIASES_FILE, LEARNED_ALIASES_JOURNAL] + rotated_journals():
+        if os.path.exists(path):
+            os.remove(path)
+    # 不启动后台写出，测试中手动 flush/compact
+    journal = AliasJournal(flush_interval=3600, compact_interval=3600)
+    journal._ensure_started = lambda: None
+    yield journal
+    journal.close()
+
+def _append(rows):
+    with open(LEARNED_ALIASES_JOURNAL, 'a', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+def test_flush_writes_journal_and_team_aliases(db, journal):
+    db.add(Team(id=1, name="Arsenal FC", aliases=["Gunners"]))
+    db.commit()
+    assert journal.learn("Arsenal London", 1)
+    assert not journal.learn("arsenal london", 1)
+    assert journal.learned_alias("arsenal london") == 1
+
+    journal.flush()
+    assert load_learned_aliases() == {"arsenal london": 1}
+    db.expire_all()
+    assert db.get(Team, 1).aliases == ["Gunners", "Arsenal London"]
+
+def test_compact_keeps_rows_appended_during_compaction(journal, monkeypatch):
+    _append([["arsenal london", 1]])
+    read_journal = alias_journal_module.read_journal
+
+    def read_then_append(path, learned_aliases):
+        read_journal(path, learned_aliases)
+        # 模拟其他进程在合并过程中追加新别名
+        _append([["spurs", 2]])
+
+    monkeypatch.setattr(alias_journal_module, "read_journal", read_then_append)
+    journal.compact()
+
+    assert rotated_journals() == []
+    assert load_learned_aliases(journal=None) == {"arsenal london": 1}
+    assert load_learned_aliases() == {"arsenal london": 1, "spurs": 2}
+
+    monkeypatch.undo()
+    journal.compact()
+    assert load_learned_aliases(journal=None) == {"arsenal london": 1, "spurs": 2}
+    assert not os.path.exists(LEARNED_ALIASES_JOURNAL)
+
+def test_interrupted_compaction_is_merged_later(journal):
+    # 上次压缩改名后中断，留下的日志在加载时可见，下次压缩时合并
+    with open(f"{LEARNED_ALIASES_JOURNAL}.1-1", 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerow(["gunners", 1])
+    _append([["spurs", 2]])
+    assert load_learned_aliases() == {"gunners": 1, "spurs": 2}
+
+    journal.compact()
+    assert rotated_journals() == []
+    assert load_learned_aliases(journal=None) == {"gunners": 1, "spurs": 2}
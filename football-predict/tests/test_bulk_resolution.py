@@ -0,0 +1,54 @@
+import csv
+
+from app.data.database import Team
+from app.utils.team_index import team_index
+from app.utils.bulk_resolution import BulkTeamResolver, resolve_unmatched_names, ALIAS_REVIEW_FILE
+
+ENTRIES = [
+    ("Arsenal FC", "feed", "England", "PL"),
+    ("Arsenal Fc.", "feed", "England", "PL"),
+    ("Borussia Dortmnd", "feed", "Germany", "BL1"),
+    ("Dortmund", "feed", "Germany", "BL1"),
+    ("Zzzz Qqqq", "feed", None, None),
+]
+
+def _add_teams(db):
+    db.add_all([
+        Team(id=1, name="Arsenal FC", league="PL", country="England"),
+        Team(id=2, name="Chelsea FC", league="PL", country="England"),
+        Team(id=3, name="Borussia Dortmund", league="BL1", country="Germany"),
+        Team(id=4, name="Bayern Munich", league="BL1", country="Germany"),
+    ])
+    db.commit()
+    team_index.refresh(wait=True)
+
+def _by_name(results):
+    return {r['name']: (r['status'], r['team_id']) for r in results}
+
+def test_resolve_blocks_and_statuses(db):
+    _add_teams(db)
+    resolver = BulkTeamResolver(db, accept_threshold=90, review_threshold=50, workers=1)
+    assert resolver._block(league="pl")[1] == resolver.by_league["pl"]
+    results = _by_name(resolver.resolve(ENTRIES))
+    assert results["Arsenal FC"] == ('exact', 1)
+    assert results["Arsenal Fc."] == ('accepted', 1)
+    assert results["Borussia Dortmnd"] == ('accepted', 3)
+    assert results["Dortmund"] == ('review', 3)
+    assert results["Zzzz Qqqq"][0] == 'unmatched'
+
+def test_process_pool_gives_same_results(db):
+    _add_teams(db)
+    serial = BulkTeamResolver(db, accept_threshold=90, review_threshold=50, workers=1).resolve(ENTRIES)
+    sharded = BulkTeamResolver(db, accept_threshold=90, review_threshold=50, shard_size=1, workers=2).resolve(ENTRIES)
+    assert sharded == serial
+
+def test_resolve_unmatched_names_writes_aliases_and_review_file(db):
+    _add_teams(db)
+    summary = resolve_unmatched_names(db, ENTRIES)
+    assert summary['aliases_added'] == 2
+    db.expire_all()
+    assert db.get(Team, 3).aliases == ["Borussia Dortmnd"]
+    with open(ALIAS_REVIEW_FILE, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['name'], row['status']) for row in rows] == [("Dortmund", 'review'), ("Zzzz Qqqq", 'unmatched')]
+    assert summary['review_rows'] == 2
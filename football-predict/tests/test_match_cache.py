@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from app.utils.match_cache import MatchCache, NOT_FOUND
+
+def _cache(**kwargs):
+    return MatchCache(maxsize=10, ttl=60, negative_ttl=60, **kwargs)
+
+def test_hit_and_negative_hit():
+    cache = _cache()
+    index = SimpleNamespace(generation=1, version="v1")
+    assert cache.get(index, "a") == (False, None)
+    cache.set(index, "a", 1)
+    cache.set(index, "b", NOT_FOUND)
+    assert cache.get(index, "a") == (True, 1)
+    assert cache.get(index, "b") == (True, NOT_FOUND)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 1)
+
+def test_older_index_does_not_clear_cache():
+    cache = _cache()
+    old = SimpleNamespace(generation=1, version="v1")
+    new = SimpleNamespace(generation=2, version="v2")
+    cache.set(old, "a", 1)
+    cache.set(new, "a", 2)
+    assert cache.get_stats()['invalidations'] == 1
+
+    # 旧索引的匹配器与新索引交替访问：旧版本查询不命中、不写入，也不清空新版本的缓存
+    for _ in range(3):
+        assert cache.get(old, "a") == (False, None)
+        cache.set(old, "b", 1)
+        assert cache.get(new, "a") == (True, 2)
+    assert cache.get(new, "b") == (False, None)
+    assert cache.get_stats()['invalidations'] == 1
+
+def test_same_version_rebuild_keeps_entries():
+    cache = _cache()
+    cache.set(SimpleNamespace(generation=1, version="v1"), "a", 1)
+    assert cache.get(SimpleNamespace(generation=2, version="v1"), "a") == (True, 1)
+    assert cache.get_stats()['invalidations'] == 0
+
+def test_restore_from_file(tmp_path):
+    path = str(tmp_path / "match_cache.json")
+    index = SimpleNamespace(generation=1, version="v1")
+    cache = _cache(path=path)
+    cache.set(index, "a", 1)
+    cache.save()
+
+    assert _cache(path=path).get(index, "a") == (True, 1)
+    assert _cache(path=path).get(SimpleNamespace(generation=1, version="v2"), "a") == (False, None)
@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+
+from sqlalchemy import select, event
+
+from app.data import sync
+from app.data.database import Team, TeamStats, Match, engine
+from app.utils.team_index import team_index
+from app.utils.team_matching import TeamNameResolver
+
+class FakeFootballDataAPI:
+    async def get_matches(self, competition, date_from, date_to):
+        return None
+
+class FakeJuheFootballAPI:
+    async def get_matches(self, league_id=None, date=None):
+        if league_id != sync.LEAGUE_MAPPINGS['PL']['juhe']:
+            return []
+        return [
+            {'id': 1, 'home_team': 'Arsenal', 'away_team': 'Chelsea', 'home_score': 2, 'away_score': 1,
+             'status': 'FINISHED', 'match_date': '2024-03-01'},
+            {'id': 2, 'home_team': 'Chelsea', 'away_team': 'Arsenal', 'home_score': 0, 'away_score': 0,
+             'status': 'FINISHED', 'match_date': '2024-04-01'},
+            {'id': 3, 'home_team': 'Arsenal', 'away_team': 'Nowhere Rovers', 'home_score': None, 'away_score': None,
+             'status': 'SCHEDULED', 'match_date': '2024-05-01'},
+        ]
+
+def test_juhe_matches_resolve_each_name_once(db, monkeypatch):
+    db.add_all([
+        Team(id=1, name="Arsenal FC", aliases=["Arsenal"], league="PL"),
+        Team(id=2, name="Chelsea FC", aliases=["Chelsea"], league="PL"),
+    ])
+    db.commit()
+    team_index.refresh(wait=True)
+    monkeypatch.setattr(sync, 'FootballDataAPI', FakeFootballDataAPI)
+    monkeypatch.setattr(sync, 'JuheFootballAPI', FakeJuheFootballAPI)
+
+    resolver = TeamNameResolver(db)
+    matches = asyncio.run(sync.sync_matches_from_apis(db, resolver))
+
+    assert len(matches) == 3
+    assert resolver.get_stats() == {'distinct_names': 3, 'resolved': 2, 'unresolved': 1}
+    assert resolver.matcher.get_stats()['total_queries'] == 3
+    rows = {m.match_id: (m.home_team_id, m.away_team_id)
+            for m in db.execute(select(Match)).scalars()}
+    assert rows == {'juhe-1': (1, 2), 'juhe-2': (2, 1), 'juhe-3': (1, None)}
+
+def test_scrapers_skipped_when_disabled(db, monkeypatch):
+    monkeypatch.setattr(sync.settings, 'ENABLE_SCRAPING', False)
+    assert asyncio.run(sync.sync_matches_from_scrapers(db)) == []
+
+def test_update_team_stats_writes_all_rows_in_one_statement(db):
+    db.add_all([Team(id=1, name='Home FC'), Team(id=2, name='Away FC')])
+    db.add_all([
+        Match(match_id='m1', home_team_id=1, away_team_id=2, home_goals=3, away_goals=1,
+              status='FINISHED', date=datetime.datetime(2024, 3, 1)),
+        Match(match_id='m2', home_team_id=2, away_team_id=1, home_goals=1, away_goals=1,
+              status='FINISHED', date=datetime.datetime(2024, 4, 1)),
+    ])
+    db.add(TeamStats(team_id=2, total_matches=99))
+    db.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement.split()[0], executemany))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        asyncio.run(sync.update_team_stats(db))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    # 一条统计查询 + 一条写入所有球队的 INSERT ... ON CONFLICT
+    assert statements == [('SELECT', False), ('INSERT', True)]
+    stats = {s.team_id: s for s in db.execute(select(TeamStats)).scalars()}
+    assert set(stats) == {1, 2}
+    assert (stats[1].avg_goals_home, stats[1].win_rate_home, stats[1].total_matches) == (3.0, 1.0, 2)
+    assert (stats[2].avg_goals_home, stats[2].win_rate_away, stats[2].total_matches) == (1.0, 0.0, 2)
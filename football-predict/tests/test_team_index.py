@@ -0,0 +1,21 @@
+from app.data.database import Team
+from app.utils.team_index import TeamIndexManager
+
+def test_index_lookups(db):
+    db.add(Team(id=1, name="Arsenal FC", zh_name="阿森纳", aliases=["Gunners"], league="PL"))
+    db.commit()
+    manager = TeamIndexManager(watched_files=())
+    index = manager.get()
+    assert index.by_name["arsenal fc"].id == 1
+    assert index.by_zh_name["阿森纳"].id == 1
+    assert index.by_alias["gunners"].id == 1
+
+def test_refresh_wait_picks_up_new_teams(db):
+    manager = TeamIndexManager(watched_files=())
+    assert len(manager.get()) == 0
+    db.add(Team(id=2, name="Chelsea FC", aliases=["CFC"]))
+    db.commit()
+    manager.refresh(wait=True)
+    index = manager.get()
+    assert index.name_to_id["cfc"] == 2
+    assert index.generation == 2
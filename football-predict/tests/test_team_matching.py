@@ -0,0 +1,36 @@
+from app.data.database import Team
+from app.utils.team_index import team_index
+from app.utils.team_matching import TeamMatcher, TeamNameResolver, match_team_names
+
+def _add_teams(db):
+    db.add_all([
+        Team(id=1, name="Manchester United FC", zh_name="曼联", aliases=["Man Utd"], league="PL"),
+        Team(id=2, name="Borussia Dortmund", aliases=["BVB"], league="BL1"),
+    ])
+    db.commit()
+    team_index.refresh(wait=True)
+
+def test_match_team_exact_and_fuzzy(db):
+    _add_teams(db)
+    matcher = TeamMatcher(db)
+    assert matcher.match_team("曼联").id == 1
+    assert matcher.match_team("man utd").id == 1
+    assert matcher.match_team("Borussia Dortmund").id == 2
+    assert matcher.match_team("Borusia Dortmnd").id == 2
+    assert matcher.match_team("Real Madrid", threshold=90) is None
+    stats = matcher.get_stats()
+    assert stats['exact_matches'] == 3
+    assert stats['failed_matches'] == 1
+
+def test_resolver_reuses_results(db):
+    _add_teams(db)
+    resolver = TeamNameResolver(db, threshold=80)
+    assert resolver.resolve("BVB", source="test") == 2
+    assert resolver.resolve("BVB", source="test") == 2
+    assert resolver.resolve("Unknown Town", source="test") is None
+    assert resolver.get_stats() == {'distinct_names': 2, 'resolved': 1, 'unresolved': 1}
+
+def test_match_team_names(db):
+    _add_teams(db)
+    assert match_team_names("Man Utd") == "Manchester United FC"
+    assert match_team_names("Unknown Town") == "Unknown Town"
@@ -45,17 +45,21 @@ document.addEventListener('DOMContentLoaded', function() {
             predictBtn.disabled = true;
             predictBtn.innerHTML = '<span class="spinner"></span> 数据分析中...';
             
-            // 发送预测请求
-            const response = await fetch('/api/predict/teams', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    home_team: homeTeam,
-                    away_team: awayTeam
-                })
-            });
+            // 发送预测请求：两队都从建议列表中选择时按ID使用可缓存的 GET 接口
+            const homeTeamId = homeTeamInput.dataset.teamId;
+            const awayTeamId = awayTeamInput.dataset.teamId;
+            const response = homeTeamId && awayTeamId
+                ? await fetch(`/api/predict/teams/${homeTeamId}/${awayTeamId}`)
+                : await fetch('/api/predict/teams', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({
+                        home_team: homeTeam,
+                        away_team: awayTeam
+                    })
+                });
             
             const data = await response.json();
             
@@ -124,6 +128,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         inputElement.addEventListener('input', function() {
             clearTimeout(debounceTimer);
+            // 手动修改名称后不再使用之前选择的球队ID
+            delete this.dataset.teamId;
             const query = this.value.trim();
             
             if (query.length < 2) {
@@ -174,6 +180,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             item.addEventListener('click', function() {
                 inputElement.value = displayName;
+                inputElement.dataset.teamId = team.id;
                 container.style.display = 'none';
             });
             
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试使用临时数据库，必须在导入 app 之前设置
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+sys.path.insert(0, ROOT)
+# app 导入时按相对路径挂载 static 目录、读取 data 下的别名表
+os.chdir(ROOT)
+
+from app.data.database import Base, engine, SessionLocal  # noqa: E402
+
+@pytest.fixture
+def db():
+    """每个测试使用空的数据库表"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
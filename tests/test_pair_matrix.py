@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.data.database import Team, TeamStats
+from app.data.competitions import normalize_competition
+from app.services import prediction
+from app.services.model_registry import ModelRegistry
+from app.services.pair_matrix import PairMatrixStore
+from app.utils.team_index import team_index
+
+def test_normalize_competition():
+    assert normalize_competition("PL") == "PL"
+    assert normalize_competition("39") == "PL"
+    assert normalize_competition(140) == "PD"
+    assert normalize_competition("premier league") == "PL"
+    assert normalize_competition("MLS") == "MLS"
+    assert normalize_competition(None) is None
+
+def test_matrix_hit_for_teams_from_both_sources(db):
+    # football-data 的球队按联赛代码记录，API Football 的球队可能还是旧数据中的联赛ID
+    db.add_all([
+        Team(id=57, name="Arsenal FC", league="PL", source="football-data"),
+        Team(id=61, name="Chelsea FC", league="PL", source="football-data"),
+        Team(id=100042, name="Arsenal", league="39", source="api-football"),
+        Team(id=100049, name="Chelsea", league="PL", source="api-football"),
+        Team(id=100529, name="Barcelona", league="140", source="api-football"),
+        Team(id=1, name="No League FC")
+    ])
+    db.add_all([
+        TeamStats(team_id=57, avg_goals_home=2.1, avg_goals_away=1.4, win_rate_home=0.7, win_rate_away=0.5),
+        TeamStats(team_id=100049, avg_goals_home=1.2, avg_goals_away=0.9, win_rate_home=0.4, win_rate_away=0.3)
+    ])
+    db.commit()
+    team_index.refresh(wait=True)
+
+    registry = ModelRegistry({}, default_factory=lambda path: prediction.create_default_model())
+    store = PairMatrixStore(prediction.score_rows, registry)
+    store.refresh(wait=True)
+
+    assert store.get_stats()["competitions"] == 1
+    assert store.get("39") is store.get("PL")
+    assert store.get("PL").team_ids == [57, 61, 100042, 100049]
+
+    index = team_index.get()
+    home, away = index.get(57), index.get(100049)
+    hit = store.lookup(home, away, registry.get().tag)
+    assert hit is not None
+    label, proba, home_stats, away_stats = hit
+    assert (home_stats["avg_goals"], home_stats["win_rate"], away_stats["avg_goals"]) == (2.1, 0.7, 0.9)
+    labels, expected = prediction.score_rows(registry.get(), np.array([[2.1, 0.9, 0.7]]))
+    assert label == labels[0]
+    np.testing.assert_array_equal(proba, expected[0])
+
+    # 旧数据中的联赛ID与联赛代码视为同一联赛
+    assert store.lookup(index.get(100042), index.get(61)) is not None
+    # 不同联赛或没有联赛信息时回退到逐场预测
+    assert store.lookup(home, index.get(100529)) is None
+    assert store.lookup(home, index.get(1)) is None
@@ -0,0 +1,60 @@
+import time
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.data.database import Team, TeamStats
+from app.services import prediction
+from app.services.batching import MicroBatcher
+from app.services.model_registry import ModelRegistry
+
+@pytest.fixture
+def default_model(monkeypatch):
+    """使用内存中的默认模型，不读写 models 目录"""
+    registry = ModelRegistry({}, default_factory=lambda path: prediction.create_default_model())
+    monkeypatch.setattr(prediction, "model_registry", registry)
+    return registry
+
+def test_micro_batched_predictions_do_not_exhaust_the_pool(db, default_model, monkeypatch):
+    teams = 60
+    db.add_all([Team(id=i, name=f"Team {i}") for i in range(1, teams + 1)])
+    db.add_all([
+        TeamStats(team_id=i, avg_goals_home=i % 3, avg_goals_away=i % 2, win_rate_home=i / teams)
+        for i in range(1, teams + 1)
+    ])
+    db.commit()
+
+    monkeypatch.setattr(prediction, "micro_batcher", MicroBatcher(prediction.score_rows, window_ms=20, max_batch_size=64))
+    prediction.prediction_cache.clear()
+
+    # 连接池 5 + 10，等待连接超过 0.5 秒即失败；并发请求数远超连接池大小
+    engine = create_engine(settings.DATABASE_URL, pool_size=5, max_overflow=10, pool_timeout=0.5)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    callers = 3 * (engine.pool.size() + engine.pool._max_overflow)
+
+    async def predict(home, away):
+        session = Session()
+        try:
+            service = prediction.PredictionService(session)
+            return await service.predict_match_async(home_team_id=home, away_team_id=away)
+        finally:
+            session.close()
+
+    pairs = [(i % teams + 1, (i + 1) % teams + 1) for i in range(callers)]
+
+    async def run():
+        return await asyncio.gather(*[predict(home, away) for home, away in pairs])
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+    engine.dispose()
+    # 等待连接超时时统计数据会退回默认值 0，逐个超时也会让总耗时远超连接池超时
+    assert elapsed < 2
+    assert [(r["features"]["home_avg_goals"], r["features"]["away_avg_goals"]) for r in results] == [
+        (float(home % 3), float(away % 2)) for home, away in pairs
+    ]
+    assert prediction.micro_batcher.get_stats()["batches"] < callers
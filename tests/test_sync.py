@@ -0,0 +1,59 @@
+import json
+import asyncio
+import datetime
+
+from sqlalchemy import select, event
+
+from app.core.http_client import HTTPResponse
+from app.data import sync
+from app.data.database import Team, TeamStats, Match, engine
+
+def test_team_sync_records_competition_codes(db, monkeypatch):
+    async def fake_get(url, headers=None, params=None, timeout=None, provider=None, max_wait=None):
+        if provider == 'football-data':
+            competition = url.rsplit('/', 2)[-2]
+            teams = [{'id': ['PL', 'BL1', 'SA', 'PD', 'FL1'].index(competition) + 1, 'name': f'{competition} FC', 'area': {'name': 'Europe'}}]
+            return HTTPResponse(200, url, json.dumps({'teams': teams}))
+        league = int(params['league'])
+        return HTTPResponse(200, url, json.dumps({'response': [{'team': {'id': league, 'name': f'Club {league}'}}]}))
+
+    monkeypatch.setattr(sync.http_client, 'get', fake_get)
+    asyncio.run(sync.sync_football_data_teams(db))
+    asyncio.run(sync.sync_api_football_teams(db))
+
+    leagues = dict(db.execute(select(Team.name, Team.league)).all())
+    assert leagues['PL FC'] == 'PL'
+    assert leagues['PD FC'] == 'PD'
+    assert leagues['Club 39'] == 'PL'
+    assert leagues['Club 140'] == 'PD'
+    assert set(leagues.values()) == {'PL', 'BL1', 'SA', 'PD', 'FL1'}
+
+def test_update_team_stats_writes_all_rows_in_one_statement(db):
+    db.add_all([Team(id=1, name='Home FC'), Team(id=2, name='Away FC')])
+    db.add_all([
+        Match(match_id='m1', home_team_id=1, away_team_id=2, home_goals=3, away_goals=1,
+              status='FINISHED', date=datetime.datetime(2024, 3, 1)),
+        Match(match_id='m2', home_team_id=2, away_team_id=1, home_goals=1, away_goals=1,
+              status='FINISHED', date=datetime.datetime(2024, 4, 1)),
+    ])
+    db.add(TeamStats(team_id=2, total_matches=99))
+    db.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement.split()[0], executemany))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        asyncio.run(sync.update_team_stats(db))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    # 一条统计查询 + 一条写入所有球队的 INSERT ... ON CONFLICT，之后只有提交后读取统计数据代数的查询
+    assert statements[:2] == [('SELECT', False), ('INSERT', True)]
+    assert all(verb == 'SELECT' for verb, _ in statements[2:])
+    stats = {s.team_id: s for s in db.execute(select(TeamStats)).scalars()}
+    assert set(stats) == {1, 2}
+    assert (stats[1].avg_goals_home, stats[1].win_rate_home, stats[1].total_matches) == (3.0, 1.0, 2)
+    assert (stats[2].avg_goals_home, stats[2].win_rate_away, stats[2].total_matches) == (1.0, 0.0, 2)
@@ -0,0 +1,47 @@
+import threading
+
+from app.data.database import Team
+from app.utils.team_index import TeamIndexManager
+
+def test_refresh_wait_rebuilds_after_running_refresh(db):
+    manager = TeamIndexManager(watched_files=())
+    assert len(manager.get()) == 0
+
+    # 后台重建读完球队表后停住，模拟比调用方提交更早开始的重建
+    built = threading.Event()
+    release = threading.Event()
+    build = manager._build
+
+    def slow_build(current):
+        index = build(current)
+        built.set()
+        release.wait(5)
+        return index
+
+    manager._build = slow_build
+    manager.refresh()
+    assert built.wait(5)
+    manager._build = build
+
+    db.add(Team(id=1, name="Arsenal FC"))
+    db.commit()
+
+    waiter = threading.Thread(target=manager.refresh, kwargs={"wait": True})
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    release.set()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert manager.get().get(1).name == "Arsenal FC"
+
+def test_refresh_wait_without_running_refresh(db):
+    manager = TeamIndexManager(watched_files=())
+    manager.get()
+    db.add(Team(id=2, name="Chelsea FC", aliases=["CFC"]))
+    db.commit()
+    manager.refresh(wait=True)
+    index = manager.get()
+    assert index.name_to_id["cfc"] == 2
+    assert index.generation == 2
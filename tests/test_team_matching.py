@@ -0,0 +1,40 @@
+from app.data.database import Team
+from app.utils.team_index import team_index
+from app.utils.team_matching import TeamMatcher
+
+def _matcher(db):
+    db.add_all([
+        Team(id=1, name="Arsenal FC", league="PL", source="football-data"),
+        Team(id=2, name="Arsenal Tula", league="RPL", source="api-football"),
+        Team(id=3, name="Borussia Dortmund", zh_name="多特蒙德", league="BL1", source="api-football"),
+    ])
+    db.commit()
+    team_index.refresh(wait=True)
+    return TeamMatcher(db)
+
+def _summary(resolved):
+    return {
+        name: (team.id if team else None, matched, match_type)
+        for name, (team, matched, score, match_type) in resolved.items()
+    }
+
+def test_resolve_many_exact_search_and_fuzzy(db):
+    matcher = _matcher(db)
+    resolved = matcher.resolve_many(["多特蒙德", "dortmund", "Borusia Dortmnd", "Nowhere Rovers"])
+    assert _summary(resolved) == {
+        "多特蒙德": (3, "多特蒙德", "exact"),
+        # 包含匹配和模糊匹配都返回球队名称的原始拼写
+        "dortmund": (3, "Borussia Dortmund", "search"),
+        "Borusia Dortmnd": (3, "Borussia Dortmund", "fuzzy"),
+        "Nowhere Rovers": (None, None, None),
+    }
+    assert resolved["dortmund"][2] == 64
+
+def test_resolve_many_league_and_source_hints(db):
+    matcher = _matcher(db)
+    # 联赛提示可以是数据源的联赛ID或联赛名称
+    assert _summary(matcher.resolve_many(["Arsenal"], league="39"))["Arsenal"] == (1, "Arsenal FC", "search")
+    assert _summary(matcher.resolve_many(["Arsenl Tula"], league="RPL"))["Arsenl Tula"] == (2, "Arsenal Tula", "fuzzy")
+    assert _summary(matcher.resolve_many(["Arsenal"], source="api-football"))["Arsenal"] == (2, "Arsenal Tula", "search")
+    # 限定后没有候选时忽略提示
+    assert _summary(matcher.resolve_many(["Dortmund"], league="Serie A"))["Dortmund"] == (3, "Borussia Dortmund", "search")